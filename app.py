@@ -1,54 +1,86 @@
 # app.py
 from flask import Flask, jsonify
 from flask_cors import CORS
+from configuracion import Configuracion
+from controllers import pagos_controller
 from controllers.pagos_controller import pagos_bp
+from servicios.json_proveedor import crear_proveedor
 import logging
 
-# ----------------------------------------
-# Configuración global de la app
-# ----------------------------------------
-app = Flask(__name__)
-CORS(app)  # Habilitar CORS para llamadas desde el frontend
-
 # Configuración del logging
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
-# Registro de blueprints (rutas externas)
-app.register_blueprint(pagos_bp, url_prefix="/api")
-
 
 # ----------------------------------------
-# Ruta principal (Home / Health)
+# Fábrica de la app
 # ----------------------------------------
-@app.get("/")
-def home():
-    return jsonify({
-        "status": "ok",
-        "mensaje": "API de Pagos funcionando 🚀",
-        "version": "1.0.0"
-    }), 200
+def crear_app(config=None):
+    """Crea la app con una Configuracion (por defecto, la de las variables PAGOS_*).
+
+    No abre la base: los servicios se crean por proceso en la primera
+    solicitud (o con pagos_controller.iniciar_servicios()), así la app se
+    puede crear antes de un fork.
+    """
+    config = config or Configuracion.desde_entorno()
+    app = Flask(__name__)
+    app.config['PAGOS'] = config
+    app.json = crear_proveedor(app, config.motor_json)  # orjson si está instalado
+    CORS(app)  # Habilitar CORS para llamadas desde el frontend
+
+    # Registro de blueprints (rutas externas)
+    pagos_controller.configurar(config)
+    app.register_blueprint(pagos_bp, url_prefix="/api")
+
+    # Ruta principal (Home / Health)
+    @app.get("/")
+    def home():
+        return jsonify({
+            "status": "ok",
+            "mensaje": "API de Pagos funcionando 🚀",
+            "version": "1.0.0"
+        }), 200
+
+    return app
+
+
+# Para 'from app import app' y 'gunicorn app:app'; en producción ver servidor.py
+app = crear_app()
 
 
 # ----------------------------------------
 # Punto de arranque
 # ----------------------------------------
 if __name__ == "__main__":
-    logging.info("🚀 Iniciando servidor...")
+    # Servidor de desarrollo: para producción 'python servidor.py' (pre-fork con hilos)
+    logging.info("🚀 Iniciando servidor de desarrollo...")
     logging.info("📍 URL: http://localhost:5000")
     logging.info("➡️  Rutas disponibles:")
     logging.info("   GET  /")
     logging.info("   GET  /api/health")
+    logging.info("   GET  /api/metrics  (Prometheus)")
     logging.info("   GET  /api/pagos")
     logging.info("   POST /api/pagos")
+    logging.info("   POST /api/pagos/lote")
     logging.info("   POST /api/pagos/<id>/procesar")
+    logging.info("   POST /api/pagos/procesar-pendientes")
     logging.info("   GET  /api/pagos/<id>")
     logging.info("   GET  /api/pagos/orden/<orden_id>")
     logging.info("   GET  /api/facturas")
     logging.info("   POST /api/facturas")
     logging.info("   GET  /api/facturas/<numero>")
-    logging.info("   POST /api/pagos/completo")
+    logging.info("   POST /api/pagos/completo  (?async=1 -> 202 + trabajo)")
+    logging.info("   GET  /api/trabajos/<id>")
+    logging.info("   GET  /api/usuarios/<id>/pagos  (?incluir=transacciones)")
+    logging.info("   GET  /api/usuarios/<id>/facturas")
+    logging.info("   GET  /api/exportar/<pagos|facturas|factura_items|transacciones>")
+    logging.info("   GET  /api/reportes/ingresos  (?desde&hasta&agrupacion=dia|mes)")
+    logging.info("   GET  /api/reportes/productos  (?desde&hasta&orden=importe|cantidad)")
+    logging.info("   GET  /api/reportes/items  (?desde&hasta&nombre)")
+    logging.info("   GET  /api/eventos  (SSE)")
+    logging.info("   (POST /api/pagos, /api/facturas y /api/pagos/completo admiten Idempotency-Key)")
 
-    app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
+    debug = app.config['PAGOS'].debug  # PAGOS_DEBUG=1: recarga y depurador
+    app.run(debug=debug, use_reloader=debug, port=5000, host='0.0.0.0')
@@ -0,0 +1,61 @@
+# asgi.py
+"""Variante ASGI de la API (ver controllers/pagos_asgi.py) para picos con
+miles de solicitudes en vuelo, casi todas esperando.
+
+    python asgi.py [--puerto 8000] [--workers N]       # necesita uvicorn
+    python cli.py migrar && PAGOS_MIGRAR=0 PAGOS_CACHE_MAX=0 uvicorn asgi:app --workers N
+
+PAGOS_ASGI_HILOS fija los hilos para SQLite por worker (no más que
+PAGOS_DB_CONEXIONES) y PAGOS_ASGI_MAX_ESPERA cuántas solicitudes pueden
+esperar hilo antes de responder 503. Con más de un worker la caché de
+lecturas se desactiva (sería por proceso y serviría datos viejos).
+"""
+import argparse
+import logging
+import os
+
+from app import crear_app
+from configuracion import Configuracion
+from controllers.pagos_asgi import AppAsgi
+from database.models import Database
+from servicios.ejecutor import EjecutorAcotado
+
+
+def crear_app_asgi(config=None):
+    config = config or Configuracion.desde_entorno()
+    ejecutor = EjecutorAcotado(hilos=config.asgi_hilos, max_espera=config.asgi_max_espera)
+    return AppAsgi(crear_app(config), ejecutor)
+
+
+# Para 'uvicorn asgi:app' (o cualquier servidor ASGI)
+app = crear_app_asgi()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor ASGI del Sistema de Pagos (uvicorn)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--puerto', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--log-accesos', action='store_true')
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("❌ Falta un servidor ASGI: pip install uvicorn (o usar hypercorn asgi:app)")
+
+    config = Configuracion.desde_entorno()
+    if config.migrar:
+        Database(config.db, perfil=config.perfil).cerrar()  # una vez, antes de los workers
+    os.environ['PAGOS_MIGRAR'] = '0'  # los workers importan asgi:app y solo verifican el esquema
+    if args.workers > 1:
+        os.environ['PAGOS_CACHE_MAX'] = '0'  # una caché por proceso no ve las escrituras de los otros
+    logging.info("🚀 %d workers ASGI x %d hilos de BD en http://%s:%d",
+                 args.workers, config.asgi_hilos, args.host, args.puerto)
+    uvicorn.run('asgi:app', host=args.host, port=args.puerto, workers=args.workers,
+                backlog=args.backlog, access_log=args.log_accesos, log_level='warning',
+                app_dir=os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+# benchmarks/bench_concurrencia.py
+"""Concurrencia contra latencia: servidor.py (WSGI, hilos) frente a asgi.py (ASGI).
+
+Para cada pila levanta un worker sobre una base temporal con el mismo
+número de hilos para SQLite (--hilos) y, con N clientes en lazo cerrado
+para cada N de --niveles, mide ops/s, p50/p99, errores (incluye 503 y
+conexiones fallidas) y el máximo de hilos y de memoria del servidor.
+La mezcla es 3 GET /api/pagos/<id> por cada POST /api/pagos.
+
+Los clientes son corrutinas (un solo proceso aguanta miles de conexiones).
+servidor.py cierra la conexión tras cada respuesta (HTTP/1.0) y deja en el
+backlog lo que no cabe en sus hilos; asgi.py mantiene keep-alive y las
+solicitudes esperan hilo en el event loop. asgi.py necesita uvicorn.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_concurrencia --niveles 1,10,100,500,1000 --duracion 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import _puerto_libre, resumir
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGOS_SEMILLA = 2000
+TIMEOUT = 30.0
+
+
+class _Conexion:
+    """Cliente HTTP/1.1 mínimo sobre asyncio; reconecta si el servidor cierra"""
+
+    def __init__(self, puerto):
+        self.puerto = puerto
+        self.lector = self.escritor = None
+
+    async def enviar(self, metodo, ruta, cuerpo=None):
+        if self.escritor is None:
+            self.lector, self.escritor = await asyncio.open_connection('127.0.0.1', self.puerto)
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else b''
+        cabeceras = f'{metodo} {ruta} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(datos)}\r\n'
+        if datos:
+            cabeceras += 'Content-Type: application/json\r\n'
+        self.escritor.write(cabeceras.encode() + b'\r\n' + datos)
+        linea = await self.lector.readline()
+        if not linea:
+            raise ConnectionError("conexión cerrada")
+        estado = int(linea.split()[1])
+        largo, cerrar = None, linea.startswith(b'HTTP/1.0')
+        while True:
+            linea = await self.lector.readline()
+            if linea in (b'\r\n', b''):
+                break
+            nombre, _, valor = linea.partition(b':')
+            nombre = nombre.strip().lower()
+            if nombre == b'content-length':
+                largo = int(valor)
+            elif nombre == b'connection':
+                cerrar = valor.strip().lower() == b'close'
+        if largo is None:
+            await self.lector.read()
+            cerrar = True
+        else:
+            await self.lector.readexactly(largo)
+        if cerrar:
+            self.cerrar()
+        return estado
+
+    def cerrar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+        self.lector = self.escritor = None
+
+
+async def _solicitud(conexion, k, n):
+    if n % 4 == 3:
+        return await conexion.enviar('POST', '/api/pagos', {
+            'orden_id': f'C{k}-{n}-{time.monotonic_ns()}', 'usuario_id': n % 100,
+            'monto_total': 56.0, 'metodo_pago': 'tarjeta'})
+    return await conexion.enviar('GET', f'/api/pagos/{(k * 7919 + n) % PAGOS_SEMILLA + 1}')
+
+
+async def _lazo_cerrado(puerto, clientes, duracion):
+    latencias, errores = [], [0]
+    fin = time.perf_counter() + duracion
+
+    async def cliente(k):
+        conexion, n = _Conexion(puerto), 0
+        while time.perf_counter() < fin:
+            t = time.perf_counter()
+            try:
+                estado = await asyncio.wait_for(_solicitud(conexion, k, n), TIMEOUT)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+                conexion.cerrar()
+                estado = 0
+            latencias.append(time.perf_counter() - t)
+            if not 200 <= estado < 300:
+                errores[0] += 1
+            n += 1
+        conexion.cerrar()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(k) for k in range(clientes)))
+    return resumir(latencias, time.perf_counter() - inicio, errores[0])
+
+
+# ---------- Servidor ----------
+def _procesos(pid):
+    """pid y todos sus descendientes (el worker de servidor.py es hijo del maestro)"""
+    pids, pendientes = [], [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        pids.append(actual)
+        try:
+            with open(f'/proc/{actual}/task/{actual}/children') as f:
+                pendientes.extend(int(p) for p in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def _uso(pid):
+    """(hilos, MB de RSS) sumados sobre el proceso y sus hijos; (0, 0) fuera de Linux"""
+    hilos, rss = 0, 0
+    for actual in _procesos(pid):
+        try:
+            with open(f'/proc/{actual}/status') as f:
+                for linea in f:
+                    if linea.startswith('Threads:'):
+                        hilos += int(linea.split()[1])
+                    elif linea.startswith('VmRSS:'):
+                        rss += int(linea.split()[1])
+        except OSError:
+            pass
+    return hilos, rss / 1024
+
+
+async def _medir_nivel(puerto, pid, clientes, duracion):
+    maximos = [0, 0.0]
+    carga = asyncio.ensure_future(_lazo_cerrado(puerto, clientes, duracion))
+    while not carga.done():
+        hilos, rss = _uso(pid)
+        maximos[0], maximos[1] = max(maximos[0], hilos), max(maximos[1], rss)
+        await asyncio.wait({carga}, timeout=0.2)
+    resultado = carga.result()
+    resultado['hilos_max'], resultado['rss_mb'] = maximos[0], round(maximos[1], 1)
+    return resultado
+
+
+def _comando(pila, puerto, hilos):
+    if pila == 'wsgi':
+        return [sys.executable, os.path.join(RAIZ, 'servidor.py'), '--host', '127.0.0.1',
+                '--puerto', str(puerto), '--workers', '1', '--hilos', str(hilos), '--backlog', '4096']
+    return [sys.executable, os.path.join(RAIZ, 'asgi.py'), '--host', '127.0.0.1',
+            '--puerto', str(puerto), '--workers', '1', '--backlog', '4096']
+
+
+async def _esperar_servidor(puerto, servidor, espera=30.0):
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        if servidor.poll() is not None:
+            raise RuntimeError("El servidor terminó al arrancar (¿falta uvicorn para asgi?)")
+        conexion = _Conexion(puerto)
+        try:
+            if await conexion.enviar('GET', '/api/health') == 200:
+                conexion.cerrar()
+                return
+        except OSError:
+            pass
+        conexion.cerrar()
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"El servidor no respondió en {espera}s")
+
+
+async def correr_pila(pila, niveles, duracion, hilos, perfil):
+    puerto = _puerto_libre()
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        entorno = {**os.environ, 'PYTHONPATH': RAIZ, 'PAGOS_DB_PERFIL': perfil,
+                   'PAGOS_TRABAJOS_CONCURRENCIA': '0', 'PAGOS_ASGI_HILOS': str(hilos),
+                   'PAGOS_DB_CONEXIONES': str(max(8, hilos))}
+        servidor = subprocess.Popen(_comando(pila, puerto, hilos), cwd=tmp, env=entorno,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            await _esperar_servidor(puerto, servidor)
+            conexion = _Conexion(puerto)
+            await conexion.enviar('POST', '/api/pagos/lote', [
+                {'orden_id': f'S{i}', 'usuario_id': i % 100, 'monto_total': 10.0, 'metodo_pago': 'tarjeta'}
+                for i in range(PAGOS_SEMILLA)])
+            conexion.cerrar()
+            await _lazo_cerrado(puerto, 4, min(1.0, duracion))  # calentamiento
+            for clientes in niveles:
+                resultados[clientes] = await _medir_nivel(puerto, servidor.pid, clientes, duracion)
+                print(_fila(pila, clientes, resultados[clientes]), flush=True)
+        finally:
+            servidor.terminate()
+            servidor.wait()
+    return resultados
+
+
+def _fila(pila, clientes, r):
+    return (f"{pila:<5} {clientes:>8} {r['ops_s']:>8.0f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+            f"{r['errores']:>8} {r['hilos_max']:>6} {r['rss_mb']:>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--niveles', default='1,10,100,500,1000', help='clientes concurrentes, separados por coma')
+    parser.add_argument('--duracion', type=float, default=5.0, help='segundos por nivel')
+    parser.add_argument('--hilos', type=int, default=8, help='hilos para SQLite por worker en ambas pilas')
+    parser.add_argument('--pilas', default='wsgi,asgi')
+    parser.add_argument('--perfil', default='seguro')
+    parser.add_argument('--salida', help='guarda los resultados en JSON')
+    args = parser.parse_args()
+    niveles = [int(n) for n in args.niveles.split(',')]
+
+    print(f"{'pila':<5} {'clientes':>8} {'ops/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errores':>8} "
+          f"{'hilos':>6} {'RSS MB':>7}")
+    resultados = {}
+    for pila in args.pilas.split(','):
+        resultados[pila] = asyncio.run(correr_pila(pila, niveles, args.duracion, args.hilos, args.perfil))
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_flujo.py
+"""Flujo completo: tres transacciones separadas vs. una sola transacción.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_flujo --flujos 2000 --perfil seguro
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from database.models import Database, Factura, Pago
+from database.perfiles import PERFILES
+from servicios.flujos import flujo_completo
+
+ITEMS = [{'nombre': 'Producto A', 'cantidad': 2, 'precio': 25.00}]
+
+
+def flujo_separado(pagos, facturas, data):
+    """El camino anterior: cada paso con su conexión, sus SELECT y su commit"""
+    pago = pagos.crear_pago(data['orden_id'], data['usuario_id'], data['monto_total'], data['metodo_pago'])
+    pagos.procesar_pago(pago['id'])
+    facturas.generar_factura(pago['id'], data['items'])
+
+
+def flujo_unico(pagos, facturas, data):
+    flujo_completo(pagos, facturas, data)
+
+
+def _medir(funcion, flujos, perfil):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'), perfil=perfil)
+        pagos, facturas = Pago(db), Factura(db)
+        inicio = time.perf_counter()
+        for i in range(flujos):
+            funcion(pagos, facturas, {'orden_id': f'F{i}', 'usuario_id': i % 50,
+                                      'monto_total': 56.0, 'metodo_pago': 'tarjeta', 'items': ITEMS})
+        segundos = time.perf_counter() - inicio
+        db.cerrar()
+    return flujos / segundos, segundos / flujos * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--flujos', type=int, default=1000)
+    parser.add_argument('--perfil', choices=list(PERFILES), default='seguro')
+    args = parser.parse_args()
+
+    print(f"{'camino':<22} {'flujos/s':>9} {'ms/flujo':>9}")
+    for nombre, funcion in (('3 transacciones', flujo_separado), ('1 transacción', flujo_unico)):
+        por_segundo, ms = _medir(funcion, args.flujos, args.perfil)
+        print(f"{nombre:<22} {por_segundo:>9.0f} {ms:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
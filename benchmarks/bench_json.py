@@ -0,0 +1,102 @@
+# benchmarks/bench_json.py
+"""Serialización de /api/pagos y /api/facturas: json de Flask, orjson y registros.
+
+Por tamaño de página compara, sobre los mismos registros:
+- stdlib: dicts + proveedor por defecto de Flask (json);
+- orjson: dicts + ProveedorOrjson (servicios/json_proveedor.py);
+- registros: JSON escrito desde las tuplas (lista_json), lo que usan los
+  listados con PAGOS_JSON=stdlib; con orjson usan el camino 'orjson'.
+Y un bloque de exportación NDJSON: json.dumps por fila (camino anterior),
+orjson por fila y el formateador generado (exportar_ndjson).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_json --pagos 20000 --paginas 50,200,500
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider
+
+from database.exportacion import TABLAS_EXPORTABLES, _LINEAS_NDJSON, iterar_bloques
+from database.generador import generar
+from database.models import Database, Factura, Pago
+from database.registros import lista_json
+from servicios.json_proveedor import ProveedorOrjson, orjson
+
+
+def _mejor(funcion, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, cuerpo
+
+
+def _caminos_pagina(app, registros):
+    stdlib, rapido = DefaultJSONProvider(app), ProveedorOrjson(app) if orjson else None
+    caminos = {'stdlib': lambda: stdlib.response([r.a_dict() for r in registros]).get_data()}
+    if rapido is not None:
+        caminos['orjson'] = lambda: Response(rapido.registros_json(registros),
+                                             mimetype='application/json').get_data()
+    caminos['registros'] = lambda: Response(lista_json(registros), mimetype='application/json').get_data()
+    return caminos
+
+
+def _caminos_exportacion(tabla, bloque):
+    columnas = TABLAS_EXPORTABLES[tabla][1]
+    linea = _LINEAS_NDJSON[tabla]
+    caminos = {'json.dumps': lambda: ('\n'.join(
+        json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) for fila in bloque) + '\n').encode()}
+    if orjson:
+        caminos['orjson'] = lambda: b'\n'.join(orjson.dumps(dict(zip(columnas, fila))) for fila in bloque) + b'\n'
+    caminos['generado'] = lambda: ('\n'.join(map(linea, bloque)) + '\n').encode()
+    return caminos
+
+
+def _imprimir(titulo, filas, caminos, repeticiones):
+    resultados = {nombre: _mejor(funcion, repeticiones) for nombre, funcion in caminos.items()}
+    base = resultados[next(iter(resultados))][0]
+    referencia = json.loads(resultados[next(iter(resultados))][1].decode().splitlines()[0])
+    for nombre, (segundos, cuerpo) in resultados.items():
+        igual = json.loads(cuerpo.decode().splitlines()[0]) == referencia
+        print(f"{titulo:<22} {nombre:<11} {filas / segundos:>10.0f} {segundos * 1e6:>10.0f} "
+              f"{base / segundos:>6.2f}x {len(cuerpo):>9} {'' if igual else 'JSON DISTINTO'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pagos', type=int, default=20000, help='pagos generados (facturas ~80 %%)')
+    parser.add_argument('--paginas', default='50,200,500', help='tamaños de página (máx. el límite de la API)')
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+    if orjson is None:
+        print("orjson no está instalado: solo stdlib y registros")
+
+    app = Flask(__name__)
+    with tempfile.TemporaryDirectory() as tmp, app.app_context():
+        db = Database(os.path.join(tmp, 'bench.db'), perfil='rendimiento')
+        generar(db, args.pagos)
+        pagos, facturas = Pago(db), Factura(db)
+
+        print(f"{'carga':<22} {'camino':<11} {'filas/s':>10} {'µs':>10} {'vel.':>7} {'bytes':>9}")
+        for tamano in (int(t) for t in args.paginas.split(',')):
+            registros, _ = pagos.listar_pagos(limite=tamano)
+            _imprimir(f'/api/pagos x{len(registros)}', len(registros),
+                      _caminos_pagina(app, registros), args.repeticiones)
+            registros, _ = facturas.listar_facturas(limite=tamano)
+            _imprimir(f'/api/facturas x{len(registros)}', len(registros),
+                      _caminos_pagina(app, registros), args.repeticiones)
+        for tabla in ('pagos', 'factura_items'):
+            bloque = next(iterar_bloques(db, tabla))
+            _imprimir(f'exportar {tabla} x{len(bloque)}', len(bloque),
+                      _caminos_exportacion(tabla, bloque), max(5, args.repeticiones // 5))
+        db.cerrar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_metricas.py
+"""Costo de las métricas: solicitudes/s de la API con PAGOS_METRICAS=0 y =1.
+
+Cada configuración corre en su propio proceso (la app lee el entorno al
+crearse) contra una base temporal, con la caché desactivada para que
+cada solicitud llegue a SQLite. Se alternan las corridas y se toma la mejor.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_metricas --solicitudes 5000 --repeticiones 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGOS_INICIALES = 2000
+
+
+def _medir(solicitudes):
+    """Dentro del proceso hijo: siembra la base y recorre una mezcla de rutas"""
+    from app import app
+    from controllers import pagos_controller
+
+    pagos_controller.iniciar_servicios()
+    pagos_controller._pago_model.crear_pagos_lote(
+        {'orden_id': f'M{i}', 'usuario_id': i % 100, 'monto_total': 10.0, 'metodo_pago': 'tarjeta'}
+        for i in range(PAGOS_INICIALES)
+    )
+    cliente = app.test_client()
+
+    def solicitud(i):
+        tipo = i % 4
+        if tipo == 0:
+            return cliente.get(f'/api/pagos/{i % PAGOS_INICIALES + 1}')
+        if tipo == 1:
+            return cliente.get('/api/pagos?limite=20')
+        if tipo == 2:
+            return cliente.get(f'/api/usuarios/{i % 100}/pagos?limite=20')
+        return cliente.post('/api/pagos', json={'orden_id': f'N{i}', 'usuario_id': 1,
+                                                'monto_total': 5.0, 'metodo_pago': 'tarjeta'})
+
+    for i in range(200):
+        solicitud(-i - 1)
+    inicio = time.perf_counter()
+    for i in range(solicitudes):
+        solicitud(i)
+    segundos = time.perf_counter() - inicio
+
+    micro = None
+    if pagos_controller._metricas is not None:
+        n = 100000
+        inicio = time.perf_counter()
+        for _ in range(n):
+            pagos_controller._metricas.observar_sql('SELECT * FROM pagos WHERE id = ?', 0.0001)
+        micro = (time.perf_counter() - inicio) / n * 1e6
+    print(json.dumps({'por_segundo': solicitudes / segundos, 'observar_sql_us': micro}))
+
+
+def _correr(activas, solicitudes):
+    with tempfile.TemporaryDirectory() as tmp:
+        entorno = {**os.environ, 'PYTHONPATH': RAIZ, 'PAGOS_METRICAS': '1' if activas else '0',
+                   'PAGOS_CACHE_MAX': '0', 'PAGOS_TRABAJOS_CONCURRENCIA': '0',
+                   'PAGOS_DB_PERFIL': 'rendimiento'}
+        salida = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_metricas', '--medir', '--solicitudes', str(solicitudes)],
+            cwd=tmp, env=entorno, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--solicitudes', type=int, default=5000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--medir', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.medir:
+        _medir(args.solicitudes)
+        return
+
+    mejores = {False: None, True: None}
+    micro = None
+    for _ in range(args.repeticiones):
+        for activas in (False, True):
+            resultado = _correr(activas, args.solicitudes)
+            if mejores[activas] is None or resultado['por_segundo'] > mejores[activas]:
+                mejores[activas] = resultado['por_segundo']
+            micro = resultado['observar_sql_us'] or micro
+
+    print(f"{'métricas':<12} {'sol/s':>9} {'ms/sol':>8}")
+    for activas in (False, True):
+        por_segundo = mejores[activas]
+        print(f"{'activas' if activas else 'apagadas':<12} {por_segundo:>9.0f} {1000 / por_segundo:>8.3f}")
+    costo = (1 / mejores[True] - 1 / mejores[False]) * 1e6
+    print(f"costo por solicitud: {costo:.1f} µs ({costo * mejores[False] / 1e4:.1f} %)")
+    print(f"observar_sql: {micro:.2f} µs por sentencia")
+
+
+if __name__ == '__main__':
+    main()
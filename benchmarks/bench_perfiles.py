@@ -0,0 +1,84 @@
+# benchmarks/bench_perfiles.py
+"""Throughput de lectura/escritura por perfil de almacenamiento.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_perfiles --escritores 4 --lectores 4 --segundos 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from database.models import Database, Pago
+from database.perfiles import PERFILES
+
+
+def _medir(perfil, escritores, lectores, segundos):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'), perfil=perfil,
+                      max_conexiones=escritores + lectores)
+        pagos = Pago(db)
+        semilla = pagos.crear_pago('SEMILLA', 1, 10.0, 'tarjeta')
+
+        fin = time.monotonic() + segundos
+        conteo = {'escrituras': 0, 'lecturas': 0, 'errores': 0}
+        lock = threading.Lock()
+
+        def escritor(n):
+            hechas = errores = i = 0
+            while time.monotonic() < fin:
+                try:
+                    pagos.crear_pago(f'W{n}-{i}', n, 10.0 + i, 'tarjeta')
+                    hechas += 1
+                except Exception:
+                    errores += 1
+                i += 1
+            with lock:
+                conteo['escrituras'] += hechas
+                conteo['errores'] += errores
+
+        def lector():
+            hechas = 0
+            while time.monotonic() < fin:
+                pagos.obtener_pago(semilla['id'])
+                hechas += 1
+            with lock:
+                conteo['lecturas'] += hechas
+
+        hilos = [threading.Thread(target=escritor, args=(n,)) for n in range(escritores)]
+        hilos += [threading.Thread(target=lector) for _ in range(lectores)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        metricas = db.metricas_pool()
+        db.cerrar()
+
+    return {
+        'perfil': perfil,
+        'escrituras_s': conteo['escrituras'] / segundos,
+        'lecturas_s': conteo['lecturas'] / segundos,
+        'errores': conteo['errores'],
+        'reintentos': metricas['reintentos_escritura'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escritores', type=int, default=4)
+    parser.add_argument('--lectores', type=int, default=4)
+    parser.add_argument('--segundos', type=float, default=3.0)
+    parser.add_argument('--perfiles', nargs='*', default=list(PERFILES))
+    args = parser.parse_args()
+
+    print(f"{'perfil':<12} {'escrituras/s':>13} {'lecturas/s':>12} {'errores':>8} {'reintentos':>11}")
+    for perfil in args.perfiles:
+        r = _medir(perfil, args.escritores, args.lectores, args.segundos)
+        print(f"{r['perfil']:<12} {r['escrituras_s']:>13.0f} {r['lecturas_s']:>12.0f} "
+              f"{r['errores']:>8} {r['reintentos']:>11}")
+
+
+if __name__ == '__main__':
+    main()
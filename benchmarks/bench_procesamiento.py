@@ -0,0 +1,46 @@
+# benchmarks/bench_procesamiento.py
+"""Pagos procesados por segundo según número de workers.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_procesamiento --pagos 5000 --workers 1 2 4 8 --latencia 0.002
+"""
+import argparse
+import os
+import tempfile
+
+from database.models import Database, Pago
+from servicios.procesador_lotes import MODOS, ProcesadorLotes
+
+
+def _medir(pagos, workers, modo, lote, latencia):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'), perfil='rendimiento')
+        Pago(db).crear_pagos_lote(
+            {'orden_id': f'B{i}', 'usuario_id': i % 100, 'monto_total': 10.0, 'metodo_pago': 'tarjeta'}
+            for i in range(pagos)
+        )
+        procesador = ProcesadorLotes(db, workers=workers, modo=modo, tamano_lote=lote,
+                                     latencia_pasarela=latencia)
+        resumen = procesador.procesar_pendientes()
+        db.cerrar()
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pagos', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4, 8])
+    parser.add_argument('--modo', choices=list(MODOS), default='hilos')
+    parser.add_argument('--lote', type=int, default=200)
+    parser.add_argument('--latencia', type=float, default=0.002,
+                        help="latencia simulada de la pasarela por pago (s)")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'pagos/s':>9} {'segundos':>9} {'lotes':>6}")
+    for workers in args.workers:
+        r = _medir(args.pagos, workers, args.modo, args.lote, args.latencia)
+        print(f"{workers:>7} {r['procesados'] / r['segundos']:>9.0f} {r['segundos']:>9.2f} {r['lotes']:>6}")
+
+
+if __name__ == '__main__':
+    main()
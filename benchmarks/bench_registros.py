@@ -0,0 +1,82 @@
+# benchmarks/bench_registros.py
+"""Filas/s leídas y serializadas a JSON: dicts a mano + jsonify vs. registros.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_registros --filas 100000 --repeticiones 5
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from flask import Flask, jsonify
+
+from database.models import Database, Pago
+from database.registros import RegistroPago, lista_json
+
+COLUMNAS = RegistroPago.SELECT
+
+
+def antes(conn):
+    """El camino anterior: tupla -> dict escrito a mano (centavos a unidades) -> jsonify"""
+    rows = conn.execute(f'SELECT {COLUMNAS} FROM pagos ORDER BY id DESC').fetchall()
+    pagos = []
+    for row in rows:
+        pagos.append({
+            'id': row[0],
+            'orden_id': row[1],
+            'usuario_id': row[2],
+            'monto_total': row[3] / 100,
+            'metodo_pago': row[4],
+            'estado': row[5],
+            'fecha_creacion': row[6],
+            'fecha_actualizacion': row[7]
+        })
+    return jsonify(pagos).get_data()
+
+
+def despues(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = RegistroPago.fabrica
+    pagos = cursor.execute(f'SELECT {COLUMNAS} FROM pagos ORDER BY id DESC').fetchall()
+    return lista_json(pagos).encode()
+
+
+def _medir(funcion, conn, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion(conn)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, cuerpo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=100000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    with tempfile.TemporaryDirectory() as tmp, app.app_context():
+        db = Database(os.path.join(tmp, 'bench.db'), perfil='rendimiento')
+        Pago(db).crear_pagos_lote(
+            {'orden_id': f'R{i}', 'usuario_id': i % 100, 'monto_total': 10.0 + i / 100,
+             'metodo_pago': 'tarjeta'}
+            for i in range(args.filas)
+        )
+        with db.conexion() as conn:
+            resultados = [(nombre, *_medir(funcion, conn, args.repeticiones))
+                          for nombre, funcion in (('dicts + jsonify', antes), ('registros', despues))]
+        db.cerrar()
+
+    print(f"{'camino':<18} {'filas/s':>10} {'ms':>8}")
+    for nombre, segundos, _ in resultados:
+        print(f"{nombre:<18} {args.filas / segundos:>10.0f} {segundos * 1000:>8.1f}")
+    iguales = json.loads(resultados[0][2]) == json.loads(resultados[1][2])
+    print(f"mismo JSON: {'sí' if iguales else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_secuencias.py
+"""Prueba de estrés de la numeración: colisiones y números por segundo.
+
+Varios procesos (y hilos por proceso) piden números a la vez sobre la misma
+base; al final se comprueba que no hay ningún código repetido. La segunda
+parte genera facturas reales con Factura.generar_factura en paralelo.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_secuencias --procesos 4 --hilos 4 --numeros 50000 --facturas 40000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from database.models import Database, Factura, Pago
+from database.secuencias import Secuencia
+
+ITEMS = [{'nombre': 'Producto A', 'cantidad': 1, 'precio': 10.0}]
+
+
+def _pedir_numeros(ruta, hilos, cantidad, bloque):
+    db = Database(ruta, perfil='rendimiento')
+    secuencia = Secuencia(db, 'FAC', bloque=bloque)
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        partes = list(executor.map(lambda _: [secuencia.siguiente() for _ in range(cantidad // hilos)],
+                                   range(hilos)))
+    db.cerrar()
+    return [codigo for parte in partes for codigo in parte]
+
+
+def _generar_facturas(ruta, pago_ids, por_transaccion):
+    db = Database(ruta, perfil='rendimiento')
+    facturas = Factura(db)
+    numeros, fallos = [], 0
+    for i in range(0, len(pago_ids), por_transaccion):
+        with db.transaccion():
+            for pago_id in pago_ids[i:i + por_transaccion]:
+                pago = {'orden_id': f'S{pago_id}', 'usuario_id': 1, 'monto_total': 10.0, 'estado': 'aprobado'}
+                factura = facturas.generar_factura(pago_id, ITEMS, pago=pago)
+                if factura['success']:
+                    numeros.append(factura['numero_factura'])
+                else:
+                    fallos += 1
+    db.cerrar()
+    return numeros, fallos
+
+
+def prueba_numeros(ruta, procesos, hilos, total, bloque):
+    por_proceso = total // procesos
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as executor:
+        partes = list(executor.map(_pedir_numeros, [ruta] * procesos, [hilos] * procesos,
+                                   [por_proceso] * procesos, [bloque] * procesos))
+    segundos = time.perf_counter() - inicio
+    codigos = [codigo for parte in partes for codigo in parte]
+    return len(codigos), len(codigos) - len(set(codigos)), segundos
+
+
+def prueba_facturas(ruta, procesos, total, por_transaccion):
+    db = Database(ruta, perfil='rendimiento')
+    Pago(db).crear_pagos_lote(
+        {'orden_id': f'S{i}', 'usuario_id': 1, 'monto_total': 10.0, 'metodo_pago': 'tarjeta'}
+        for i in range(total)
+    )
+    with db.conexion() as conn:
+        ids = [fila[0] for fila in conn.execute('SELECT id FROM pagos ORDER BY id')]
+    db.cerrar()
+
+    repartos = [ids[i::procesos] for i in range(procesos)]
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as executor:
+        partes = list(executor.map(_generar_facturas, [ruta] * procesos, repartos,
+                                   [por_transaccion] * procesos))
+    segundos = time.perf_counter() - inicio
+    numeros = [numero for parte, _ in partes for numero in parte]
+    fallos = sum(fallos for _, fallos in partes)
+    return len(numeros), len(numeros) - len(set(numeros)), fallos, segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--procesos', type=int, default=4)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--numeros', type=int, default=50000)
+    parser.add_argument('--bloque', type=int, default=1000)
+    parser.add_argument('--facturas', type=int, default=40000)
+    parser.add_argument('--por-transaccion', type=int, default=100,
+                        help="facturas por commit en la segunda prueba")
+    parser.add_argument('--objetivo', type=float, default=10000,
+                        help="facturas/s mínimas para dar la prueba por buena")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, 'bench.db')
+        Database(ruta, perfil='rendimiento').cerrar()
+
+        total, repetidos, segundos = prueba_numeros(ruta, args.procesos, args.hilos, args.numeros, args.bloque)
+        print(f"números:  {total} en {segundos:.2f}s ({total / segundos:.0f}/s), repetidos: {repetidos}")
+
+        total_f, repetidas, fallos, segundos_f = prueba_facturas(
+            ruta, args.procesos, args.facturas, args.por_transaccion)
+        por_segundo = total_f / segundos_f
+        print(f"facturas: {total_f} en {segundos_f:.2f}s ({por_segundo:.0f}/s), "
+              f"repetidas: {repetidas}, fallidas: {fallos}")
+
+    if repetidos or repetidas or fallos or por_segundo < args.objetivo:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+# benchmarks/suite.py
+"""Suite de rendimiento: micro-benchmarks de los modelos y carga HTTP.
+
+- micro: latencia de cada llamada a crear_pago, procesar_pago,
+  generar_factura y obtener_factura sobre una base temporal.
+- carga: generador en lazo cerrado (cada cliente espera su respuesta antes
+  de mandar la siguiente) contra la app servida en otro proceso, con
+  --concurrencia clientes por escenario durante --duracion segundos.
+
+Informa ops/s y p50/p95/p99 en ms y compara con la línea base guardada:
+una caída de ops/s o una subida de p95 mayor que --tolerancia se informa
+como REGRESIÓN y el comando sale con código 1.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.suite                      # corre y compara
+    python -m benchmarks.suite --solo micro
+    python -m benchmarks.suite --guardar-base       # reescribe la línea base
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINEA_BASE = os.path.join(RAIZ, 'benchmarks', 'linea_base.json')
+
+ITEMS = [{'nombre': 'Producto A', 'cantidad': 2, 'precio': 25.00}]
+PAGOS_SEMILLA = 2000
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumir(latencias, segundos, errores=0):
+    ordenados = sorted(latencias)
+    return {
+        'ops_s': round(len(ordenados) / segundos, 1) if segundos else 0.0,
+        'p50_ms': round(percentil(ordenados, 50) * 1000, 3),
+        'p95_ms': round(percentil(ordenados, 95) * 1000, 3),
+        'p99_ms': round(percentil(ordenados, 99) * 1000, 3),
+        'n': len(ordenados),
+        'errores': errores,
+    }
+
+
+# ---------- Micro-benchmarks ----------
+def _cronometrar(funcion, argumentos):
+    latencias = []
+    inicio = time.perf_counter()
+    for args in argumentos:
+        t = time.perf_counter()
+        funcion(*args)
+        latencias.append(time.perf_counter() - t)
+    return resumir(latencias, time.perf_counter() - inicio)
+
+
+def correr_micro(iteraciones, perfil):
+    from database.models import Database, Factura, Pago
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'micro.db'), perfil=perfil)
+        pagos, facturas = Pago(db), Factura(db)
+        creados = []
+
+        def crear(i):
+            creados.append(pagos.crear_pago(f'U{i}', i % 100, 56.0, 'tarjeta')['id'])
+
+        numeros = []
+
+        def generar(pago_id):
+            numeros.append(facturas.generar_factura(pago_id, ITEMS)['numero_factura'])
+
+        resultados['crear_pago'] = _cronometrar(crear, ((i,) for i in range(iteraciones)))
+        resultados['procesar_pago'] = _cronometrar(pagos.procesar_pago, ((i,) for i in creados))
+        resultados['generar_factura'] = _cronometrar(generar, ((i,) for i in creados))
+        resultados['obtener_factura'] = _cronometrar(facturas.obtener_factura, ((n,) for n in numeros))
+        db.cerrar()
+    return resultados
+
+
+# ---------- Carga HTTP ----------
+def _servir(puerto):
+    """En el proceso servidor: la app con un servidor HTTP/1.1 con hilos"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    from app import app
+
+    WSGIRequestHandler.protocol_version = 'HTTP/1.1'  # keep-alive
+    make_server('127.0.0.1', puerto, app, threaded=True).serve_forever()
+
+
+def _puerto_libre():
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class _Cliente:
+    def __init__(self, puerto):
+        self.puerto = puerto
+        self.conn = http.client.HTTPConnection('127.0.0.1', puerto, timeout=30)
+
+    def enviar(self, metodo, ruta, cuerpo=None):
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+        cabeceras = {'Content-Type': 'application/json'} if datos is not None else {}
+        try:
+            self.conn.request(metodo, ruta, body=datos, headers=cabeceras)
+            resp = self.conn.getresponse()
+            resp.read()
+            return resp.status
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.puerto, timeout=30)
+            return 0
+
+
+def _escenarios():
+    """nombre -> funcion(cliente, cliente_id, n) que envía una solicitud"""
+    return {
+        'GET /api/pagos/<id>': lambda c, k, n: c.enviar('GET', f'/api/pagos/{(k * 7919 + n) % PAGOS_SEMILLA + 1}'),
+        'GET /api/pagos': lambda c, k, n: c.enviar('GET', '/api/pagos?limite=50'),
+        'POST /api/pagos': lambda c, k, n: c.enviar('POST', '/api/pagos', {
+            'orden_id': f'C{k}-{n}-{time.monotonic_ns()}', 'usuario_id': n % 100,
+            'monto_total': 56.0, 'metodo_pago': 'tarjeta'}),
+        'POST /api/pagos/completo': lambda c, k, n: c.enviar('POST', '/api/pagos/completo', {
+            'orden_id': f'F{k}-{n}-{time.monotonic_ns()}', 'usuario_id': n % 100,
+            'monto_total': 56.0, 'metodo_pago': 'tarjeta', 'items': ITEMS}),
+    }
+
+
+def _lazo_cerrado(puerto, enviar, concurrencia, duracion):
+    latencias = [[] for _ in range(concurrencia)]
+    errores = [0] * concurrencia
+    fin = time.perf_counter() + duracion
+
+    def cliente(k):
+        c = _Cliente(puerto)
+        n = 0
+        while time.perf_counter() < fin:
+            t = time.perf_counter()
+            estado = enviar(c, k, n)
+            latencias[k].append(time.perf_counter() - t)
+            if not 200 <= estado < 300:
+                errores[k] += 1
+            n += 1
+        c.conn.close()
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=cliente, args=(k,)) for k in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+    return resumir([x for lista in latencias for x in lista], segundos, sum(errores))
+
+
+def correr_carga(concurrencia, duracion, perfil):
+    puerto = _puerto_libre()
+    with tempfile.TemporaryDirectory() as tmp:
+        entorno = {**os.environ, 'PYTHONPATH': RAIZ, 'PAGOS_DB_PERFIL': perfil,
+                   'PAGOS_TRABAJOS_CONCURRENCIA': '0'}
+        servidor = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.suite', '--servidor', str(puerto)],
+            cwd=tmp, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            cliente = _esperar_servidor(puerto, servidor)
+            lote = [{'orden_id': f'S{i}', 'usuario_id': i % 100, 'monto_total': 10.0,
+                     'metodo_pago': 'tarjeta'} for i in range(PAGOS_SEMILLA)]
+            cliente.enviar('POST', '/api/pagos/lote', lote)
+            resultados = {}
+            for nombre, enviar in _escenarios().items():
+                _lazo_cerrado(puerto, enviar, concurrencia, min(1.0, duracion))  # calentamiento
+                resultados[nombre] = _lazo_cerrado(puerto, enviar, concurrencia, duracion)
+        finally:
+            servidor.terminate()
+            servidor.wait()
+    return resultados
+
+
+def _esperar_servidor(puerto, servidor, espera=30.0):
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        if servidor.poll() is not None:
+            raise RuntimeError("El servidor de la app terminó al arrancar")
+        cliente = _Cliente(puerto)
+        if cliente.enviar('GET', '/api/health') == 200:
+            return cliente
+        time.sleep(0.1)
+    raise RuntimeError(f"El servidor no respondió en {espera}s")
+
+
+# ---------- Línea base ----------
+def comparar(resultados, base, tolerancia):
+    """Devuelve (filas de la tabla, regresiones)"""
+    filas, regresiones = [], []
+    for grupo, medidas in resultados.items():
+        for nombre, actual in medidas.items():
+            previo = base.get(grupo, {}).get(nombre)
+            if previo is None:
+                filas.append((grupo, nombre, actual, None, None, ''))
+                continue
+            d_ops = actual['ops_s'] / previo['ops_s'] - 1 if previo['ops_s'] else 0.0
+            d_p95 = actual['p95_ms'] / previo['p95_ms'] - 1 if previo['p95_ms'] else 0.0
+            motivo = []
+            if d_ops < -tolerancia:
+                motivo.append(f'ops/s {d_ops:+.0%}')
+            if d_p95 > tolerancia:
+                motivo.append(f'p95 {d_p95:+.0%}')
+            if actual.get('errores'):
+                motivo.append(f"{actual['errores']} errores")
+            if motivo:
+                regresiones.append(f"{grupo} {nombre}: {', '.join(motivo)}")
+            filas.append((grupo, nombre, actual, d_ops, d_p95, 'REGRESIÓN' if motivo else 'ok'))
+    return filas, regresiones
+
+
+def _imprimir(filas):
+    print(f"{'grupo':<6} {'medida':<26} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'Δops/s':>7} {'Δp95':>7}")
+    for grupo, nombre, r, d_ops, d_p95, estado in filas:
+        deltas = (f'{d_ops:>+7.0%} {d_p95:>+7.0%}' if d_ops is not None else f"{'-':>7} {'-':>7}")
+        print(f"{grupo:<6} {nombre:<26} {r['ops_s']:>9.0f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {deltas} {estado}")
+
+
+def _entorno(args):
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'sistema': f'{platform.system()} {platform.machine()}',
+        'cpus': os.cpu_count(),
+        'perfil': args.perfil,
+        'iteraciones': args.iteraciones,
+        'concurrencia': args.concurrencia,
+        'duracion': args.duracion,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--solo', choices=('micro', 'carga'))
+    parser.add_argument('--iteraciones', type=int, default=2000, help='llamadas por micro-benchmark')
+    parser.add_argument('--concurrencia', type=int, default=8, help='clientes de la carga')
+    parser.add_argument('--duracion', type=float, default=5.0, help='segundos por escenario de carga')
+    parser.add_argument('--perfil', default='seguro')
+    parser.add_argument('--base', default=LINEA_BASE)
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='variación admitida (0.25 = 25 %%)')
+    parser.add_argument('--guardar-base', action='store_true')
+    parser.add_argument('--salida', help='escribe también los resultados en este JSON')
+    parser.add_argument('--servidor', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.servidor:
+        _servir(args.servidor)
+        return
+
+    resultados = {}
+    if args.solo in (None, 'micro'):
+        resultados['micro'] = correr_micro(args.iteraciones, args.perfil)
+    if args.solo in (None, 'carga'):
+        resultados['carga'] = correr_carga(args.concurrencia, args.duracion, args.perfil)
+
+    documento = {'entorno': _entorno(args), **resultados}
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(documento, f, indent=2, ensure_ascii=False)
+
+    if args.guardar_base:
+        base = {}
+        if os.path.exists(args.base):
+            with open(args.base) as f:
+                base = json.load(f)
+        base.update(documento)  # con --solo se conserva el otro grupo
+        with open(args.base, 'w') as f:
+            json.dump(base, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        _imprimir(comparar(resultados, {}, args.tolerancia)[0])
+        print(f"Línea base guardada en {args.base}")
+        return
+
+    base = {}
+    if os.path.exists(args.base):
+        with open(args.base) as f:
+            base = json.load(f)
+    else:
+        print(f"Sin línea base en {args.base} (crearla con --guardar-base)")
+    distintos = [k for k, v in documento['entorno'].items() if k in base.get('entorno', {})
+                 and base['entorno'][k] != v]
+    if distintos:
+        print(f"Aviso: el entorno difiere de la línea base en {', '.join(distintos)}")
+    filas, regresiones = comparar(resultados, base, args.tolerancia)
+    _imprimir(filas)
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} REGRESIÓN(ES) respecto de la línea base:")
+        for regresion in regresiones:
+            print(f"   {regresion}")
+        sys.exit(1)
+    print(f"\n✅ Sin regresiones (tolerancia {args.tolerancia:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# cli.py
+"""Comandos de mantenimiento del Sistema de Pagos.
+
+Uso:
+    python cli.py migrar [--db pagos.db] [--verificar]
+    python cli.py procesar-pendientes [--workers 4] [--modo hilos|procesos] [--lote 200]
+    python cli.py trabajos [--concurrencia 4]
+    python cli.py reconstruir-resumenes [--db pagos.db]
+    python cli.py generar --db fixture.db --pagos 1000000 [--semilla 42] [--desde 2024-01-01] [--dias 365]
+"""
+import argparse
+import time
+
+from database.generador import generar
+from database.models import Database
+from database.migraciones import CONSULTAS_CRITICAS, verificar_planes, version_actual
+from database.resumenes import reconstruir
+from servicios.procesador_lotes import MODOS, ProcesadorLotes
+
+
+# ----------------------------------------
+# Comandos
+# ----------------------------------------
+def cmd_migrar(args):
+    db = Database(args.db)  # init_db aplica las migraciones pendientes
+    with db.conexion() as conn:
+        print(f"Esquema en versión {version_actual(conn)}")
+        if args.verificar:
+            fallos = verificar_planes(conn)
+            for sql, indice, plan in fallos:
+                print(f"❌ {sql}\n   esperaba {indice}, plan: {plan}")
+            if fallos:
+                raise SystemExit(1)
+            print(f"✅ {len(CONSULTAS_CRITICAS)} consultas usan su índice")
+    db.cerrar()
+
+
+def cmd_procesar_pendientes(args):
+    db = Database(args.db)
+    procesador = ProcesadorLotes(db, workers=args.workers, modo=args.modo, tamano_lote=args.lote)
+    resumen = procesador.procesar_pendientes(limite=args.limite)
+    db.cerrar()
+    velocidad = resumen['procesados'] / resumen['segundos'] if resumen['segundos'] else 0
+    print(f"✅ {resumen['procesados']} pagos en {resumen['lotes']} lotes, "
+          f"{resumen['segundos']}s ({velocidad:.0f} pagos/s)")
+
+
+def cmd_trabajos(args):
+    from dataclasses import replace
+
+    from configuracion import Configuracion
+    from controllers import pagos_controller
+
+    config = Configuracion.desde_entorno()
+    pagos_controller.configurar(replace(config, trabajos_concurrencia=args.concurrencia))
+    pagos_controller.iniciar_servicios()
+    cola = pagos_controller._cola
+    print(f"👷 {args.concurrencia} workers atendiendo la cola de trabajos (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        cola.detener()
+
+
+def cmd_reconstruir_resumenes(args):
+    db = Database(args.db)
+    reconstruir(db)
+    with db.conexion() as conn:
+        dias = conn.execute('SELECT COUNT(DISTINCT dia) FROM resumen_pagos_diario').fetchone()[0]
+    db.cerrar()
+    print(f"✅ Resúmenes de ingresos reconstruidos ({dias} días)")
+
+
+def cmd_generar(args):
+    db = Database(args.db, perfil='rendimiento')
+    inicio = time.perf_counter()
+
+    def progreso(hechos, total):
+        segundos = time.perf_counter() - inicio
+        print(f"   {hechos}/{total} pagos ({hechos / segundos:.0f} pagos/s)", flush=True)
+
+    try:
+        filas = generar(db, args.pagos, semilla=args.semilla, desde=args.desde, dias=args.dias,
+                        usuarios=args.usuarios, bloque=args.bloque, progreso=progreso)
+    except ValueError as exc:
+        raise SystemExit(f"❌ {exc}")
+    finally:
+        db.cerrar()
+    detalle = ', '.join(f'{cantidad} {tabla}' for tabla, cantidad in filas.items())
+    print(f"✅ {detalle} en {time.perf_counter() - inicio:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comandos del Sistema de Pagos")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p = sub.add_parser('migrar', help="aplica las migraciones pendientes")
+    p.add_argument('--db', default='pagos.db')
+    p.add_argument('--verificar', action='store_true',
+                   help="comprueba con EXPLAIN QUERY PLAN que las consultas críticas usan índice")
+    p.set_defaults(func=cmd_migrar)
+
+    p = sub.add_parser('procesar-pendientes', help="procesa los pagos pendientes por lotes")
+    p.add_argument('--db', default='pagos.db')
+    p.add_argument('--workers', type=int, default=4)
+    p.add_argument('--modo', choices=list(MODOS), default='hilos')
+    p.add_argument('--lote', type=int, default=200, help="pagos reclamados por vuelta")
+    p.add_argument('--limite', type=int, default=None, help="máximo de pagos a procesar")
+    p.set_defaults(func=cmd_procesar_pendientes)
+
+    p = sub.add_parser('trabajos', help="ejecuta workers de la cola de trabajos asíncronos")
+    p.add_argument('--concurrencia', type=int, default=4)
+    p.set_defaults(func=cmd_trabajos)
+
+    p = sub.add_parser('reconstruir-resumenes', help="recalcula los resúmenes de ingresos desde cero")
+    p.add_argument('--db', default='pagos.db')
+    p.set_defaults(func=cmd_reconstruir_resumenes)
+
+    p = sub.add_parser('generar', help="llena una base nueva con datos sintéticos deterministas")
+    p.add_argument('--db', required=True)
+    p.add_argument('--pagos', type=int, required=True)
+    p.add_argument('--semilla', type=int, default=42)
+    p.add_argument('--desde', default='2024-01-01', help="primer día (AAAA-MM-DD)")
+    p.add_argument('--dias', type=int, default=365, help="días que cubren las fechas")
+    p.add_argument('--usuarios', type=int, default=None, help="por defecto pagos / 20")
+    p.add_argument('--bloque', type=int, default=50000, help="pagos por transacción")
+    p.set_defaults(func=cmd_generar)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
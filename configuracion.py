@@ -0,0 +1,54 @@
+# configuracion.py
+"""Configuración explícita de la app (la recibe crear_app).
+
+desde_entorno() lee las variables PAGOS_* de siempre, así los despliegues
+existentes no cambian; el servidor y los tests pueden construirla a mano.
+"""
+import os
+from dataclasses import dataclass, fields
+
+
+@dataclass(frozen=True)
+class Configuracion:
+    db: str = 'pagos.db'
+    perfil: str = 'seguro'               # ver database/perfiles.py
+    max_conexiones: int = 8              # pool por proceso
+    migrar: bool = True                  # False: solo verifica la versión del esquema
+    cache_max: int = 10000               # 0 desactiva la caché (obligatorio con varios procesos)
+    cache_ttl: float = 30.0
+    trabajos_concurrencia: int = 2       # 0: solo encola (workers con 'python cli.py trabajos')
+    trabajos_max_intentos: int = 3
+    idempotencia_ttl: float = 86400.0
+    metricas: bool = True
+    redondeo: str = 'mitad_arriba'
+    debug: bool = False
+    motor_json: str = 'auto'             # auto | orjson | stdlib (servicios/json_proveedor.py)
+    asgi_hilos: int = 8                  # asgi.py: hilos para SQLite por worker
+    asgi_max_espera: int = 2000          # asgi.py: solicitudes esperando hilo antes de responder 503
+
+    @classmethod
+    def desde_entorno(cls, entorno=None):
+        """PAGOS_<CAMPO> (p. ej. PAGOS_CACHE_MAX); PAGOS_DB_PERFIL para perfil"""
+        entorno = os.environ if entorno is None else entorno
+        valores = {}
+        for campo in fields(cls):
+            variable = _VARIABLES.get(campo.name, f'PAGOS_{campo.name.upper()}')
+            if variable not in entorno:
+                continue
+            texto = entorno[variable]
+            if campo.type is bool:
+                valores[campo.name] = texto.lower() not in ('0', 'false', 'no', '')
+            elif campo.type is int:
+                valores[campo.name] = int(texto)
+            elif campo.type is float:
+                valores[campo.name] = float(texto)
+            else:
+                valores[campo.name] = texto
+        return cls(**valores)
+
+
+_VARIABLES = {
+    'perfil': 'PAGOS_DB_PERFIL',
+    'max_conexiones': 'PAGOS_DB_CONEXIONES',
+    'motor_json': 'PAGOS_JSON',
+}
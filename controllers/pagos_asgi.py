@@ -0,0 +1,305 @@
+# controllers/pagos_asgi.py
+"""Variante ASGI de la API: las mismas rutas sin un hilo por solicitud.
+
+El servidor ASGI mantiene las conexiones en el event loop y cada solicitud
+pasa a la app Flask (mismas rutas, validaciones, Idempotency-Key, ETags y
+métricas) en un hilo del EjecutorAcotado: el trabajo sobre SQLite nunca
+pasa de 'hilos' a la vez y el resto espera sin ocupar hilo. Con la espera
+llena responde 503 con Retry-After. Ningún cuerpo se junta entero: los de
+solicitud en varios mensajes (NDJSON de /api/pagos/lote) se leen desde el
+hilo a medida que la vista los consume, y las respuestas salen un bloque
+por vuelta al ejecutor (exportación).
+
+/api/eventos (SSE) es nativo: la espera entre eventos la hace el event loop
+(despierta con BusEventos.escuchar) y solo las lecturas de la tabla van al
+ejecutor, así miles de suscriptores no retienen hilos.
+"""
+import asyncio
+import contextvars
+import io
+import json
+import sys
+from urllib.parse import parse_qsl
+
+from controllers import pagos_controller
+from servicios.ejecutor import Saturado
+from servicios.eventos import formatear_sse
+from servicios.metricas import colector_ejecutor
+
+RUTA_EVENTOS = '/api/eventos'
+ESPERA_EVENTOS = 2.0
+PING_EVENTOS = 15.0
+
+
+class AppAsgi:
+    def __init__(self, app, ejecutor):
+        self.app = app  # app Flask de crear_app
+        self.ejecutor = ejecutor
+        self._loop = None
+        self._aviso = None  # futuro que se resuelve con cada evento confirmado
+        self._preparada = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._preparar()
+            if scope['method'] == 'GET' and _ruta(scope) == RUTA_EVENTOS:
+                await self._eventos(scope, receive, send)
+            else:
+                await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+
+    # ---------- Ciclo de vida ----------
+    async def _preparar(self):
+        """Servicios del proceso (una vez, en el ejecutor) y enganche de eventos y métricas"""
+        if self._preparada:
+            return
+        await self.ejecutor.ejecutar(pagos_controller.iniciar_servicios)
+        if self._preparada:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._aviso = self._loop.create_future()
+        pagos_controller._eventos.escuchar(self._avisar)
+        if pagos_controller._metricas is not None:
+            pagos_controller._metricas.registrar_colector(colector_ejecutor(self.ejecutor))
+        self._preparada = True
+
+    async def _lifespan(self, receive, send):
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'lifespan.startup':
+                try:
+                    await self._preparar()
+                except Exception as exc:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(exc)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensaje['type'] == 'lifespan.shutdown':
+                if pagos_controller._db is not None:
+                    await self.ejecutor.ejecutar(pagos_controller._cola.detener)
+                    await self.ejecutor.ejecutar(pagos_controller._db.cerrar)
+                self.ejecutor.cerrar()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # ---------- Rutas del blueprint (app Flask en el ejecutor) ----------
+    async def _http(self, scope, receive, send):
+        entorno = _entorno_wsgi(scope, await _entrada(receive))
+        contexto = contextvars.Context()  # el mismo en cada vuelta de un streaming
+        try:
+            estado, cabeceras, cuerpo, resto = await self.ejecutor.ejecutar(
+                self._llamar, entorno, contexto=contexto)
+        except Saturado:
+            await _responder_json(send, 503, {"error": "Servidor saturado, reintentar"},
+                                  [(b'retry-after', b'1')])
+            return
+        await send({'type': 'http.response.start', 'status': estado, 'headers': cabeceras})
+        if resto is None:
+            await send({'type': 'http.response.body', 'body': cuerpo})
+            return
+        iterador, cerrar = resto
+        try:
+            await send({'type': 'http.response.body', 'body': cuerpo, 'more_body': True})
+            # Cada bloque se envía en cuanto sale de la app, sin juntarlos
+            while True:
+                bloque = await self.ejecutor.ejecutar(next, iterador, None, contexto=contexto)
+                if bloque is None:
+                    break
+                if bloque:
+                    await send({'type': 'http.response.body', 'body': bloque, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if cerrar is not None:
+                await self.ejecutor.ejecutar(cerrar, contexto=contexto)
+
+    def _llamar(self, entorno):
+        """En un hilo: llama a la app WSGI y devuelve el primer bloque; si
+        queda más, también el iterador (que _http recorre en el ejecutor)"""
+        respuesta = {}
+
+        def start_response(estado, cabeceras, exc_info=None):
+            respuesta['estado'] = int(estado.split(' ', 1)[0])
+            respuesta['cabeceras'] = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                                      for k, v in cabeceras]
+
+        iterable = self.app(entorno, start_response)
+        cerrar = getattr(iterable, 'close', None)
+        iterador = iter(iterable)
+        try:
+            primero = next(iterador, b'')
+        except BaseException:
+            if cerrar is not None:
+                cerrar()
+            raise
+        cabeceras = respuesta['cabeceras']
+        largo = next((valor for nombre, valor in cabeceras if nombre == b'content-length'), None)
+        if largo is None or int(largo) != len(primero):
+            return respuesta['estado'], cabeceras, primero, (iterador, cerrar)
+        # Caso común (jsonify): todo el cuerpo en el primer bloque, sin otra vuelta
+        if cerrar is not None:
+            cerrar()
+        return respuesta['estado'], cabeceras, primero, None
+
+    # ---------- GET /api/eventos (SSE nativo) ----------
+    def _avisar(self):
+        """Desde el hilo que confirmó un evento: despierta a los suscriptores"""
+        try:
+            self._loop.call_soon_threadsafe(self._despertar)
+        except RuntimeError:
+            pass  # loop cerrado
+
+    def _despertar(self):
+        aviso, self._aviso = self._aviso, self._loop.create_future()
+        aviso.set_result(None)
+
+    async def _eventos(self, scope, receive, send):
+        """Mismo protocolo que pagos_controller.eventos (Last-Event-ID, resync, ping)"""
+        metricas = pagos_controller._metricas
+        inicio = metricas.iniciar_solicitud() if metricas is not None else None
+        eventos = pagos_controller._eventos
+        cabeceras = {k.lower(): v.decode('latin-1') for k, v in scope['headers']}
+        consulta = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+        try:
+            ultimo_id = cabeceras.get(b'last-event-id') or consulta.get('ultimo_id')
+            if ultimo_id is None:
+                ultimo_id = await self.ejecutor.ejecutar(eventos.ultimo_id)
+            ultimo_id = int(ultimo_id)
+        except ValueError:
+            await _responder_json(send, 400, {"error": "Last-Event-ID inválido"})
+            return
+        except Saturado:
+            await _responder_json(send, 503, {"error": "Servidor saturado, reintentar"},
+                                  [(b'retry-after', b'1')])
+            return
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+        desconexion = asyncio.ensure_future(_esperar_desconexion(receive))
+
+        async def enviar(texto):
+            await send({'type': 'http.response.body', 'body': texto.encode(), 'more_body': True})
+
+        try:
+            await enviar("retry: 3000\n\n")
+            if inicio is not None:
+                metricas.terminar_solicitud(inicio, RUTA_EVENTOS, 'GET', 200)
+            sin_enviar = 0.0
+            while not desconexion.done():
+                version = eventos.version()
+                try:
+                    filas = await self.ejecutor.ejecutar(eventos.leer_desde, ultimo_id)
+                    if filas is None:
+                        ultimo_id = await self.ejecutor.ejecutar(eventos.ultimo_id)
+                        await enviar(formatear_sse(ultimo_id, 'resync', '{}'))
+                        continue
+                except Saturado:
+                    await asyncio.wait({desconexion}, timeout=1.0)
+                    continue
+                for evento_id, tipo, datos in filas:
+                    await enviar(formatear_sse(evento_id, tipo, datos))
+                    ultimo_id = evento_id
+                if filas:
+                    sin_enviar = 0.0
+                    continue
+                # Avisos del propio proceso al instante; otros procesos, al sondear
+                if eventos.version() != version:
+                    continue
+                hechos, _ = await asyncio.wait({self._aviso, desconexion}, timeout=ESPERA_EVENTOS,
+                                               return_when=asyncio.FIRST_COMPLETED)
+                if not hechos:
+                    sin_enviar += ESPERA_EVENTOS
+                    if sin_enviar >= PING_EVENTOS:
+                        sin_enviar = 0.0
+                        await enviar(": ping\n\n")
+        finally:
+            desconexion.cancel()
+
+
+# ---------- Traducción ASGI <-> WSGI ----------
+def _ruta(scope):
+    ruta, raiz = scope['path'], scope.get('root_path', '')
+    return ruta[len(raiz):] if raiz and ruta.startswith(raiz) else ruta
+
+
+async def _entrada(receive):
+    """wsgi.input: BytesIO si el cuerpo llegó en un mensaje; si no, un
+    lector que pide el resto al event loop desde el hilo de la vista"""
+    mensaje = await receive()
+    if mensaje['type'] == 'http.disconnect':
+        return io.BytesIO()
+    if not mensaje.get('more_body'):
+        return io.BytesIO(mensaje.get('body', b''))
+    return io.BufferedReader(_EntradaAsgi(receive, asyncio.get_running_loop(), mensaje.get('body', b'')))
+
+
+class _EntradaAsgi(io.RawIOBase):
+    """Cuerpo de la solicitud leído mensaje a mensaje (bloquea el hilo, no el loop)"""
+
+    def __init__(self, receive, loop, inicial):
+        self._receive = receive
+        self._loop = loop
+        self._pendiente = inicial
+        self._fin = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        while not self._pendiente and not self._fin:
+            mensaje = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if mensaje['type'] == 'http.disconnect':
+                self._fin = True
+            else:
+                self._pendiente = mensaje.get('body', b'')
+                self._fin = not mensaje.get('more_body')
+        n = min(len(destino), len(self._pendiente))
+        destino[:n] = self._pendiente[:n]
+        self._pendiente = self._pendiente[n:]
+        return n
+
+
+async def _esperar_desconexion(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _entorno_wsgi(scope, entrada):
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    entorno = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': _ruta(scope).encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': cliente[0],
+        'REMOTE_PORT': str(cliente[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': entrada,
+        'wsgi.input_terminated': True,  # leer hasta el final aunque no haya Content-Length
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for nombre, valor in scope['headers']:
+        nombre = nombre.decode('latin-1').upper().replace('-', '_')
+        valor = valor.decode('latin-1')
+        if nombre in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            entorno[nombre] = valor
+        else:
+            clave = f'HTTP_{nombre}'
+            entorno[clave] = f'{entorno[clave]},{valor}' if clave in entorno else valor
+    return entorno
+
+
+async def _responder_json(send, estado, datos, cabeceras=()):
+    cuerpo = json.dumps(datos).encode()
+    await send({'type': 'http.response.start', 'status': estado, 'headers': [
+        (b'content-type', b'application/json'), (b'content-length', str(len(cuerpo)).encode()),
+        *cabeceras]})
+    await send({'type': 'http.response.body', 'body': cuerpo})
@@ -1,13 +1,118 @@
 # controllers/pagos_controller.py
-from flask import Blueprint, request, jsonify
-from database.models import Database, Pago, Factura 
+import functools
+import json
+import os
+import threading
+
+from configuracion import Configuracion
+from flask import Blueprint, Response, current_app, make_response, request, jsonify, stream_with_context, url_for
+from database.models import (Database, Pago, Factura, etag_de_factura, etag_de_pago, validar_items,
+                             validar_pago, validar_tasa)
+from database.cache import CacheLRU
+from database.exportacion import FORMATOS, TABLAS_EXPORTABLES, exportar
+from database.registros import es_registro
+from database.resumenes import consultar_ingresos, items_por_dia, productos_mas_vendidos
+from servicios.eventos import BusEventos, formatear_sse
+from servicios.flujos import flujo_completo as _flujo_completo, reanudar_flujo as _reanudar_flujo
+from servicios.idempotencia import (AlmacenIdempotencia, ConflictoIdempotencia, SolicitudEnCurso,
+                                    calcular_huella)
+from servicios.metricas import (TIPO_CONTENIDO, Metricas, colector_cache, colector_pool,
+                                instrumentar_blueprint)
+from servicios.procesador_lotes import ProcesadorLotes
+from servicios.trabajos import ColaTrabajos, TrabajoFallido
 
 pagos_bp = Blueprint('pagos_bp', __name__)
 
-# Inicializar DB y modelos (singleton por proceso)
-_db = Database()
-_pago_model = Pago(_db)
-_factura_model = Factura(_db)
+# Servicios del proceso (BD, caché, métricas, cola...). Se crean con la
+# Configuracion de configurar() en la primera solicitud de cada proceso, o
+# antes con iniciar_servicios(); nada toca la base al importar el módulo.
+# Tras un fork el hijo los vuelve a crear (conexiones e hilos no se heredan).
+_config = None
+_lock_servicios = threading.Lock()
+_metricas = _db = _cache = _eventos = _pago_model = _factura_model = _cola = _idempotencia = None
+_heredados = []  # servicios del padre tras un fork: no cerrarlos desde el hijo
+CABECERAS_IDEMPOTENTES = ('Location',)
+# Tope de workers para procesar-pendientes desde la API (hilos o procesos por solicitud)
+MAX_WORKERS_LOTES = max(4, os.cpu_count() or 1)
+
+
+def configurar(config):
+    """Fija la configuración del proceso (la llama crear_app)"""
+    global _config
+    with _lock_servicios:
+        if _db is not None and config != _config:
+            raise RuntimeError("Los servicios ya se iniciaron con otra configuración")
+        _config = config
+
+
+def iniciar_servicios():
+    """Crea los servicios del proceso una sola vez (idempotente y seguro entre hilos)"""
+    global _metricas, _db, _cache, _eventos, _pago_model, _factura_model, _cola, _idempotencia
+    if _db is not None:
+        return
+    with _lock_servicios:
+        if _db is not None:
+            return
+        config = _config or Configuracion.desde_entorno()
+        # Métricas Prometheus en /api/metrics (PAGOS_METRICAS=0 las desactiva)
+        metricas = Metricas() if config.metricas else None
+        db = Database(config.db, max_conexiones=config.max_conexiones, perfil=config.perfil,
+                      metricas=metricas, migrar=config.migrar)
+        # Caché de lecturas en memoria (PAGOS_CACHE_MAX=0 la desactiva). Es del
+        # proceso: solo la invalidan sus propias escrituras, así que con varios
+        # procesos sobre la misma base hay que desactivarla (servidor.py y
+        # asgi.py lo hacen con más de un worker)
+        cache = CacheLRU(max_entradas=config.cache_max, ttl=config.cache_ttl) if config.cache_max > 0 else None
+        eventos = BusEventos(db)
+        if metricas is not None:
+            metricas.registrar_colector(colector_pool(db))
+            if cache is not None:
+                metricas.registrar_colector(colector_cache(cache))
+        _pago_model = Pago(db, cache=cache, eventos=eventos)
+        # PAGOS_REDONDEO: mitad_arriba | mitad_par | truncar (impuesto por línea)
+        _factura_model = Factura(db, cache=cache, eventos=eventos, redondeo=config.redondeo)
+        # Cola de trabajos para el modo asíncrono (PAGOS_TRABAJOS_CONCURRENCIA=0
+        # deja solo la cola, p. ej. si los workers corren con 'python cli.py trabajos')
+        _cola = ColaTrabajos(db, concurrencia=config.trabajos_concurrencia,
+                             max_intentos=config.trabajos_max_intentos)
+        _cola.registrar('flujo_completo', _trabajo_flujo_completo)
+        _cola.iniciar()
+        # Respuestas guardadas por Idempotency-Key (PAGOS_IDEMPOTENCIA_TTL en segundos)
+        _idempotencia = AlmacenIdempotencia(db, ttl=config.idempotencia_ttl)
+        _metricas, _cache, _eventos = metricas, cache, eventos
+        _db = db  # el último: marca los servicios como listos
+
+
+def _tras_fork():
+    """En el hijo: olvida los servicios del padre para crearlos de nuevo"""
+    global _lock_servicios, _metricas, _db, _cache, _eventos, _pago_model, _factura_model, _cola, _idempotencia
+    if _db is not None:
+        _heredados.append((_db, _cola))
+    _lock_servicios = threading.Lock()
+    _metricas = _db = _cache = _eventos = _pago_model = _factura_model = _cola = _idempotencia = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_tras_fork)
+
+
+def _trabajo_flujo_completo(data):
+    cuerpo, codigo = _flujo_completo(_pago_model, _factura_model, data)
+    if codigo == 409:
+        # Reintento de un intento que confirmó antes de morir: seguir desde el pago guardado
+        reanudado = _reanudar_flujo(_pago_model, _factura_model, data)
+        if reanudado is None:
+            raise TrabajoFallido(cuerpo['error'], cuerpo)
+        cuerpo, codigo = reanudado
+    if codigo >= 400:
+        raise RuntimeError(cuerpo.get('error'))
+    return cuerpo
+
+
+@pagos_bp.before_request
+def _asegurar_servicios():
+    iniciar_servicios()
+
+instrumentar_blueprint(pagos_bp, lambda: _metricas)
 
 
 # ---------- Helpers ----------
@@ -17,18 +122,117 @@ def _bad_request(msg="Campos inválidos"):
 def _not_found(msg="No encontrado"):
     return jsonify({"error": msg}), 404
 
+def _arg_entero(nombre):
+    """Parámetro entero opcional de la query; ValueError si no es entero.
+    (request.args.get(type=int) devolvería None en silencio)"""
+    valor = request.args.get(nombre)
+    if valor is None:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError(f"'{nombre}' debe ser un entero") from None
+
+def _no_modificado(etag):
+    """304 si If-None-Match coincide con etag; si no, None"""
+    if etag and request.if_none_match.contains(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+    return None
+
+def _con_etag(datos, etag):
+    resp = jsonify(datos)
+    resp.set_etag(etag)
+    return resp
+
+def _consulta_canonica():
+    return '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+
+def _lineas_ndjson(stream):
+    """Itera un cuerpo NDJSON sin cargarlo entero; las líneas inválidas llegan como None"""
+    for linea in stream:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            yield json.loads(linea)
+        except ValueError:
+            yield None
+
+def _idempotente(vista):
+    """Con cabecera Idempotency-Key, ejecuta la vista una sola vez por clave y
+    devuelve la misma respuesta a los reintentos (Idempotent-Replayed: true)"""
+    @functools.wraps(vista)
+    def envoltura(*args, **kwargs):
+        clave = request.headers.get('Idempotency-Key')
+        if clave is None:
+            return vista(*args, **kwargs)
+        if not clave or len(clave) > 255:
+            return _bad_request("Idempotency-Key inválida (1 a 255 caracteres)")
+
+        def ejecutar():
+            resp = make_response(vista(*args, **kwargs))
+            cabeceras = {k: resp.headers[k] for k in CABECERAS_IDEMPOTENTES if k in resp.headers}
+            return resp.status_code, resp.get_data(), resp.mimetype, cabeceras
+
+        huella = calcular_huella(request.method, request.full_path, request.get_data())
+        try:
+            codigo, cuerpo, tipo, cabeceras, repetida = _idempotencia.ejecutar(clave, huella, ejecutar)
+        except ConflictoIdempotencia:
+            return jsonify({"error": "Idempotency-Key ya usada con otra solicitud"}), 422
+        except SolicitudEnCurso:
+            return jsonify({"error": "Hay una solicitud en curso con esta Idempotency-Key"}), 409
+        resp = Response(cuerpo, status=codigo, mimetype=tipo, headers=cabeceras)
+        if repetida:
+            resp.headers['Idempotent-Replayed'] = 'true'
+        return resp
+
+    return envoltura
+
+def _pagina(datos, siguiente_cursor, etag=None):
+    """Lista JSON + cursor de la página siguiente en cabeceras (X-Siguiente-Cursor y Link).
+    Las listas de registros salen ya codificadas desde las filas (registros_json)."""
+    if datos and es_registro(datos[0]):
+        resp = Response(current_app.json.registros_json(datos), mimetype='application/json')
+    else:
+        resp = jsonify(datos)
+    if etag:
+        resp.set_etag(etag)
+    if siguiente_cursor:
+        resp.headers['X-Siguiente-Cursor'] = siguiente_cursor
+        args = {**(request.view_args or {}), **request.args.to_dict()}
+        args['cursor'] = siguiente_cursor
+        resp.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return resp, 200
+
 
 # ---------- Rutas (documentadas / listadas) ----------
 
 @pagos_bp.get('/health')
 def health():
     """GET /api/health"""
-    return jsonify({"status": "ok", "servicio": "Sistema de Pagos"}), 200
+    return jsonify({
+        "status": "ok",
+        "servicio": "Sistema de Pagos",
+        "pool": _db.metricas_pool(),
+        "cache": _cache.metricas() if _cache is not None else None
+    }), 200
+
+
+@pagos_bp.get('/metrics')
+def metricas():
+    """GET /api/metrics - Latencias por ruta y por sentencia SQL, códigos de
+    estado, pool y caché (formato de texto de Prometheus)"""
+    if _metricas is None:
+        return _not_found("Métricas desactivadas (PAGOS_METRICAS=0)")
+    return Response(_metricas.exponer(), content_type=TIPO_CONTENIDO), 200
 
 
 @pagos_bp.post('/pagos')
+@_idempotente
 def crear_pago():
-    """POST /api/pagos
+    """POST /api/pagos (admite Idempotency-Key)
     Body JSON:
     {
       "orden_id": "ORD-001",
@@ -43,6 +247,9 @@ def crear_pago():
     required = ['orden_id', 'usuario_id', 'monto_total', 'metodo_pago']
     if not all(k in data for k in required):
         return _bad_request(f"Faltan campos: {', '.join(required)}")
+    error = validar_pago(data)
+    if error:
+        return _bad_request(error)
 
     pago = _pago_model.crear_pago(
         orden_id=data['orden_id'],
@@ -57,10 +264,62 @@ def crear_pago():
     return jsonify(pago), 201
 
 
+@pagos_bp.post('/pagos/lote')
+def crear_pagos_lote():
+    """POST /api/pagos/lote
+    Body JSON: [ {orden_id, usuario_id, monto_total, metodo_pago}, ... ]
+    (o {"pagos": [...]}), o bien NDJSON con Content-Type application/x-ndjson.
+    Responde un resultado por elemento; los duplicados no abortan el lote.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        pagos = _lineas_ndjson(request.stream)
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('pagos')
+        if not isinstance(data, list):
+            return _bad_request("Se esperaba una lista de pagos")
+        pagos = data
+
+    resultados = _pago_model.crear_pagos_lote(pagos)
+    resumen = {'creados': 0, 'duplicados': 0, 'invalidos': 0}
+    for r in resultados:
+        resumen[r['estado'] + 's'] += 1
+    return jsonify({**resumen, 'resultados': resultados}), 200
+
+
+@pagos_bp.post('/pagos/procesar-pendientes')
+def procesar_pendientes():
+    """POST /api/pagos/procesar-pendientes
+    Body JSON (opcional): { "limite": 1000, "workers": 4, "modo": "hilos", "tamano_lote": 200 }
+    workers va de 1 a MAX_WORKERS_LOTES
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        workers = int(data.get('workers', 4))
+        if workers > MAX_WORKERS_LOTES:
+            return _bad_request(f"workers no puede superar {MAX_WORKERS_LOTES}")
+        procesador = ProcesadorLotes(
+            _db,
+            workers=workers,
+            modo=data.get('modo', 'hilos'),
+            tamano_lote=int(data.get('tamano_lote', 200)),
+            pago_model=_pago_model
+        )
+        limite = data.get('limite')
+        limite = int(limite) if limite is not None else None
+    except (TypeError, ValueError) as exc:
+        return _bad_request(str(exc))
+
+    return jsonify(procesador.procesar_pendientes(limite=limite)), 200
+
+
 @pagos_bp.post('/pagos/<int:pago_id>/procesar')
 def procesar_pago(pago_id: int):
     """POST /api/pagos/<id>/procesar"""
     resultado = _pago_model.procesar_pago(pago_id)
+    if resultado.get('en_proceso'):
+        return jsonify({"error": resultado['mensaje']}), 409
     if not resultado.get('success'):
         return _not_found(resultado.get('mensaje', 'Error procesando pago'))
     return jsonify(resultado), 200
@@ -68,44 +327,39 @@ def procesar_pago(pago_id: int):
 
 @pagos_bp.get('/pagos/<int:pago_id>')
 def obtener_pago(pago_id: int):
-    """GET /api/pagos/<id>"""
+    """GET /api/pagos/<id> (ETag + If-None-Match -> 304)"""
+    if request.if_none_match:
+        # Solo fecha_actualizacion (o la caché): no se construye el pago
+        etag = _pago_model.etag_pago(pago_id)
+        if etag is None:
+            return _not_found("Pago no encontrado")
+        no_modificado = _no_modificado(etag)
+        if no_modificado:
+            return no_modificado
     pago = _pago_model.obtener_pago(pago_id)
     if not pago:
         return _not_found("Pago no encontrado")
-    return jsonify(pago), 200
+    return _con_etag(pago, etag_de_pago(pago)), 200
 
 
 @pagos_bp.get('/pagos/orden/<string:orden_id>')
 def obtener_por_orden(orden_id: str):
     """GET /api/pagos/orden/<orden_id>"""
-    conn = _db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM pagos WHERE orden_id = ?', (orden_id,))
-    row = cursor.fetchone()
-    conn.close()
-    if not row:
+    pago = _pago_model.obtener_por_orden(orden_id)
+    if not pago:
         return _not_found("Pago no encontrado para esta orden")
-    pago = {
-        'id': row[0],
-        'orden_id': row[1],
-        'usuario_id': row[2],
-        'monto_total': row[3],
-        'metodo_pago': row[4],
-        'estado': row[5],
-        'fecha_creacion': row[6],
-        'fecha_actualizacion': row[7]
-    }
     return jsonify(pago), 200
 
 
 @pagos_bp.post('/facturas')
+@_idempotente
 def generar_factura():
-    """POST /api/facturas
+    """POST /api/facturas (admite Idempotency-Key)
     Body JSON:
     {
       "pago_id": 1,
-      "items": [ { "nombre": "...", "cantidad": 1, "precio": 10.0 } ],
-      "tasa_impuesto": 0.12  # opcional
+      "items": [ { "nombre": "...", "cantidad": 1, "precio": 10.0, "tasa_impuesto": 0.12 } ],
+      "tasa_impuesto": 0.12  # opcional: la de los items que no traen la suya
     }
     """
     data = request.get_json(silent=True)
@@ -113,8 +367,11 @@ def generar_factura():
         return _bad_request("JSON inválido")
     if 'pago_id' not in data or 'items' not in data:
         return _bad_request("Faltan 'pago_id' o 'items'")
-
     tasa = data.get('tasa_impuesto', 0.12)
+    error = validar_items(data['items']) or validar_tasa(tasa)
+    if error:
+        return _bad_request(error)
+
     resultado = _factura_model.generar_factura(data['pago_id'], data['items'], tasa_impuesto=tasa)
     if not resultado.get('success'):
         return jsonify(resultado), 400
@@ -123,16 +380,24 @@ def generar_factura():
 
 @pagos_bp.get('/facturas/<string:numero>')
 def obtener_factura(numero: str):
-    """GET /api/facturas/<numero>"""
+    """GET /api/facturas/<numero> (ETag + If-None-Match -> 304)"""
+    if request.if_none_match:
+        etag = _factura_model.etag_factura(numero)
+        if etag is None:
+            return _not_found("Factura no encontrada")
+        no_modificado = _no_modificado(etag)
+        if no_modificado:
+            return no_modificado
     factura = _factura_model.obtener_factura(numero)
     if not factura:
         return _not_found("Factura no encontrada")
-    return jsonify(factura), 200
+    return _con_etag(factura, etag_de_factura(factura)), 200
 
 
 @pagos_bp.post('/pagos/completo')
+@_idempotente
 def flujo_completo():
-    """POST /api/pagos/completo
+    """POST /api/pagos/completo (admite Idempotency-Key)
     Body JSON:
     {
       "orden_id": "...",
@@ -141,6 +406,8 @@ def flujo_completo():
       "metodo_pago": "tarjeta",
       "items": [...]
     }
+    Con ?async=1 (o Prefer: respond-async) responde 202 con el id de un
+    trabajo en cola; consultar GET /api/trabajos/<id>.
     """
     data = request.get_json(silent=True)
     if not data:
@@ -148,80 +415,252 @@ def flujo_completo():
     required = ['orden_id', 'usuario_id', 'monto_total', 'metodo_pago']
     if not all(k in data for k in required):
         return _bad_request(f"Faltan campos: {', '.join(required)}")
-
-    # 1) Crear pago
-    pago = _pago_model.crear_pago(
-        orden_id=data['orden_id'],
-        usuario_id=data['usuario_id'],
-        monto_total=data['monto_total'],
-        metodo_pago=data['metodo_pago']
-    )
-    if pago is None:
-        return jsonify({"error": "Ya existe un pago para esta orden"}), 409
-
-    # 2) Procesar pago
-    resultado = _pago_model.procesar_pago(pago['id'])
-    if not resultado.get('success'):
-        return jsonify({"error": "Error al procesar pago"}), 500
-
-    # 3) Generar factura
-    factura = _factura_model.generar_factura(pago['id'], data.get('items', []))
-    if not factura.get('success'):
-        return jsonify({"error": "Error al generar factura", "detalle": factura}), 500
-
-    return jsonify({
-        'pago': pago,
-        'transaccion': resultado,
-        'factura': factura
-    }), 201
+    error = validar_pago(data) or validar_items(data.get('items', []))
+    if error:
+        return _bad_request(error)
+
+    if request.args.get('async') == '1' or 'respond-async' in request.headers.get('Prefer', ''):
+        trabajo_id = _cola.encolar('flujo_completo', data)
+        url = url_for('pagos_bp.obtener_trabajo', trabajo_id=trabajo_id)
+        resp = jsonify({"trabajo_id": trabajo_id, "estado": "pendiente", "url": url})
+        resp.headers['Location'] = url
+        return resp, 202
+
+    cuerpo, codigo = _flujo_completo(_pago_model, _factura_model, data)
+    return jsonify(cuerpo), codigo
+
+
+@pagos_bp.get('/trabajos/<int:trabajo_id>')
+def obtener_trabajo(trabajo_id: int):
+    """GET /api/trabajos/<id> - Estado de un trabajo asíncrono
+    estado: pendiente | en_curso | completado | fallido; 'resultado' trae la
+    respuesta del flujo cuando termina.
+    """
+    trabajo = _cola.obtener(trabajo_id)
+    if not trabajo:
+        return _not_found("Trabajo no encontrado")
+    return jsonify(trabajo), 200
 
 
 @pagos_bp.get('/pagos')
 def listar_pagos():
-    """GET /api/pagos - Lista todos los pagos"""
-    conn = _db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM pagos ORDER BY id DESC LIMIT 50')
-    rows = cursor.fetchall()
-    conn.close()
-    
-    pagos = []
-    for row in rows:
-        pagos.append({
-            'id': row[0],
-            'orden_id': row[1],
-            'usuario_id': row[2],
-            'monto_total': row[3],
-            'metodo_pago': row[4],
-            'estado': row[5],
-            'fecha_creacion': row[6],
-            'fecha_actualizacion': row[7]
-        })
-    
-    return jsonify(pagos), 200
+    """GET /api/pagos - Lista paginada de pagos (más recientes primero)
+    Query: limite, cursor, estado, usuario_id, metodo_pago, desde, hasta
+    El cursor de la página siguiente viene en la cabecera X-Siguiente-Cursor.
+    ETag según el id más reciente y la última actualización (If-None-Match -> 304).
+    """
+    etag = _pago_model.etag_listado(_consulta_canonica())
+    no_modificado = _no_modificado(etag)
+    if no_modificado:
+        return no_modificado
+    try:
+        pagos, siguiente = _pago_model.listar_pagos(
+            limite=_arg_entero('limite'),
+            cursor=request.args.get('cursor'),
+            estado=request.args.get('estado'),
+            usuario_id=_arg_entero('usuario_id'),
+            metodo_pago=request.args.get('metodo_pago'),
+            desde=request.args.get('desde'),
+            hasta=request.args.get('hasta')
+        )
+    except ValueError as exc:
+        return _bad_request(str(exc))
+
+    return _pagina(pagos, siguiente, etag)
 
 
 @pagos_bp.get('/facturas')
 def listar_facturas():
-    """GET /api/facturas - Lista todas las facturas"""
-    conn = _db.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM facturas ORDER BY id DESC LIMIT 50')
-    rows = cursor.fetchall()
-    conn.close()
-    
-    facturas = []
-    for row in rows:
-        facturas.append({
-            'id': row[0],
-            'numero_factura': row[1],
-            'pago_id': row[2],
-            'orden_id': row[3],
-            'usuario_id': row[4],
-            'monto_total': row[5],
-            'impuesto': row[6],
-            'subtotal': row[7],
-            'fecha_emision': row[9]
-        })
-    
-    return jsonify(facturas), 200
\ No newline at end of file
+    """GET /api/facturas - Lista paginada de facturas (más recientes primero)
+    Query: limite, cursor, usuario_id, pago_id, desde, hasta
+    ETag según el id más reciente (If-None-Match -> 304).
+    """
+    etag = _factura_model.etag_listado(_consulta_canonica())
+    no_modificado = _no_modificado(etag)
+    if no_modificado:
+        return no_modificado
+    try:
+        facturas, siguiente = _factura_model.listar_facturas(
+            limite=_arg_entero('limite'),
+            cursor=request.args.get('cursor'),
+            usuario_id=_arg_entero('usuario_id'),
+            pago_id=_arg_entero('pago_id'),
+            desde=request.args.get('desde'),
+            hasta=request.args.get('hasta')
+        )
+    except ValueError as exc:
+        return _bad_request(str(exc))
+
+    return _pagina(facturas, siguiente, etag)
+
+
+@pagos_bp.get('/usuarios/<int:usuario_id>/pagos')
+def pagos_de_usuario(usuario_id: int):
+    """GET /api/usuarios/<id>/pagos - Historial de pagos del usuario (paginado)
+    Query: limite, cursor, estado, incluir=transacciones
+    Sale del índice cubriente (usuario_id, id, ...); con incluir=transacciones
+    las de toda la página se traen en una sola consulta.
+    """
+    incluir = request.args.get('incluir')
+    if incluir not in (None, 'transacciones'):
+        return _bad_request("'incluir' solo admite 'transacciones'")
+    etag = _pago_model.etag_listado(f'{request.path}?{_consulta_canonica()}')
+    no_modificado = _no_modificado(etag)
+    if no_modificado:
+        return no_modificado
+    try:
+        pagos, siguiente = _pago_model.listar_pagos(
+            limite=_arg_entero('limite'),
+            cursor=request.args.get('cursor'),
+            estado=request.args.get('estado'),
+            usuario_id=usuario_id
+        )
+    except ValueError as exc:
+        return _bad_request(str(exc))
+
+    if incluir == 'transacciones':
+        transacciones = _pago_model.transacciones_de([pago.id for pago in pagos])
+        pagos = [{**pago.a_dict(), 'transacciones': [t.a_dict() for t in transacciones[pago.id]]}
+                 for pago in pagos]
+    return _pagina(pagos, siguiente, etag)
+
+
+@pagos_bp.get('/usuarios/<int:usuario_id>/facturas')
+def facturas_de_usuario(usuario_id: int):
+    """GET /api/usuarios/<id>/facturas - Facturas del usuario (paginado)
+    Query: limite, cursor
+    """
+    etag = _factura_model.etag_listado(f'{request.path}?{_consulta_canonica()}')
+    no_modificado = _no_modificado(etag)
+    if no_modificado:
+        return no_modificado
+    try:
+        facturas, siguiente = _factura_model.listar_facturas(
+            limite=_arg_entero('limite'),
+            cursor=request.args.get('cursor'),
+            usuario_id=usuario_id
+        )
+    except ValueError as exc:
+        return _bad_request(str(exc))
+
+    return _pagina(facturas, siguiente, etag)
+
+
+@pagos_bp.get('/exportar/<string:tabla>')
+def exportar_tabla(tabla: str):
+    """GET /api/exportar/<pagos|facturas|factura_items|transacciones>
+    Query: formato=ndjson|csv (por defecto ndjson), desde_id (exclusivo), desde (fecha ISO)
+    Respuesta en streaming ordenada por id; para exportaciones incrementales
+    pasar como desde_id el último id recibido.
+    """
+    if tabla not in TABLAS_EXPORTABLES:
+        return _not_found(f"Tabla no exportable: {tabla}")
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in FORMATOS:
+        return _bad_request(f"Formato no soportado: {formato}")
+    try:
+        desde_id = _arg_entero('desde_id')
+    except ValueError as exc:
+        return _bad_request(str(exc))
+
+    generador = exportar(_db, tabla, formato, desde_id=desde_id, desde=request.args.get('desde'))
+    resp = Response(stream_with_context(generador), mimetype=FORMATOS[formato])
+    resp.headers['Content-Disposition'] = f'attachment; filename={tabla}.{formato}'
+    return resp
+
+
+@pagos_bp.get('/reportes/ingresos')
+def reporte_ingresos():
+    """GET /api/reportes/ingresos - Totales desde los resúmenes diarios
+    Query: desde, hasta (AAAA-MM-DD, hasta exclusivo), agrupacion=dia|mes,
+    metodo_pago, estado (solo pagos)
+    """
+    try:
+        reporte = consultar_ingresos(
+            _db,
+            desde=request.args.get('desde'),
+            hasta=request.args.get('hasta'),
+            agrupacion=request.args.get('agrupacion', 'dia'),
+            metodo_pago=request.args.get('metodo_pago'),
+            estado=request.args.get('estado')
+        )
+    except ValueError as exc:
+        return _bad_request(str(exc))
+    return jsonify(reporte), 200
+
+
+@pagos_bp.get('/reportes/productos')
+def reporte_productos():
+    """GET /api/reportes/productos - Productos más vendidos (desde factura_items)
+    Query: desde, hasta (AAAA-MM-DD, hasta exclusivo), orden=importe|cantidad, limite
+    """
+    try:
+        productos = productos_mas_vendidos(
+            _db,
+            desde=request.args.get('desde'),
+            hasta=request.args.get('hasta'),
+            orden=request.args.get('orden', 'importe'),
+            limite=_arg_entero('limite') or 10
+        )
+    except ValueError as exc:
+        return _bad_request(str(exc))
+    return jsonify(productos), 200
+
+
+@pagos_bp.get('/reportes/items')
+def reporte_items():
+    """GET /api/reportes/items - Unidades e importe facturados por día
+    Query: desde, hasta (AAAA-MM-DD, hasta exclusivo), nombre (producto)
+    """
+    try:
+        dias = items_por_dia(
+            _db,
+            desde=request.args.get('desde'),
+            hasta=request.args.get('hasta'),
+            nombre=request.args.get('nombre')
+        )
+    except ValueError as exc:
+        return _bad_request(str(exc))
+    return jsonify(dias), 200
+
+
+@pagos_bp.get('/eventos')
+def eventos():
+    """GET /api/eventos - Stream SSE de cambios (pago.creado, pago.actualizado, factura.generada)
+    Reanuda desde la cabecera Last-Event-ID (o ?ultimo_id=); sin ella empieza
+    por los eventos nuevos. Si el id pedido ya se compactó se envía 'resync'
+    y el cliente debe recargar los listados.
+    """
+    try:
+        ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('ultimo_id')
+        ultimo_id = int(ultimo_id) if ultimo_id is not None else _eventos.ultimo_id()
+    except ValueError:
+        return _bad_request("Last-Event-ID inválido")
+
+    def stream(ultimo_id):
+        yield "retry: 3000\n\n"
+        sin_enviar = 0.0
+        while True:
+            version = _eventos.version()
+            filas = _eventos.leer_desde(ultimo_id)
+            if filas is None:
+                ultimo_id = _eventos.ultimo_id()
+                yield formatear_sse(ultimo_id, 'resync', '{}')
+                continue
+            for evento_id, tipo, datos in filas:
+                yield formatear_sse(evento_id, tipo, datos)
+                ultimo_id = evento_id
+            if filas:
+                sin_enviar = 0.0
+                continue
+            # Avisos del propio proceso al instante; otros procesos, al sondear
+            if not _eventos.esperar(version, timeout=2.0):
+                sin_enviar += 2.0
+                if sin_enviar >= 15.0:
+                    sin_enviar = 0.0
+                    yield ": ping\n\n"
+
+    resp = Response(stream(ultimo_id), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
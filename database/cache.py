@@ -0,0 +1,104 @@
+# database/cache.py
+"""Caché de lectura para pagos y facturas.
+
+BackendCache es la interfaz que usan los modelos; CacheLRU es el backend
+en memoria del proceso (LRU acotado + TTL). Un backend compartido (Redis,
+memcached...) solo tiene que implementar la misma interfaz.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+AUSENTE = object()
+
+
+class BackendCache:
+    """Interfaz de caché. Los valores se tratan como de solo lectura."""
+
+    def obtener(self, clave):
+        """Devuelve el valor o AUSENTE"""
+        raise NotImplementedError
+
+    def marca(self):
+        """Marca opaca a tomar ANTES de leer de la base; ver guardar()"""
+        raise NotImplementedError
+
+    def guardar(self, clave, valor, marca=None):
+        """Guarda el valor salvo que haya habido invalidaciones desde 'marca'
+        (evita cachear una lectura que quedó vieja por una escritura concurrente)"""
+        raise NotImplementedError
+
+    def invalidar(self, *claves):
+        raise NotImplementedError
+
+    def limpiar(self):
+        raise NotImplementedError
+
+    def metricas(self):
+        return {}
+
+
+class CacheLRU(BackendCache):
+    def __init__(self, max_entradas=10000, ttl=30.0):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self._invalidaciones = 0
+        self._metricas = {
+            'aciertos': 0,
+            'fallos': 0,
+            'expulsiones': 0,
+            'expirados': 0,
+            'invalidaciones': 0,
+        }
+
+    def obtener(self, clave):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self._metricas['fallos'] += 1
+                return AUSENTE
+            expira_en, valor = entrada
+            if expira_en <= ahora:
+                del self._datos[clave]
+                self._metricas['expirados'] += 1
+                self._metricas['fallos'] += 1
+                return AUSENTE
+            self._datos.move_to_end(clave)
+            self._metricas['aciertos'] += 1
+            return valor
+
+    def marca(self):
+        return self._invalidaciones
+
+    def guardar(self, clave, valor, marca=None):
+        with self._lock:
+            if marca is not None and marca != self._invalidaciones:
+                return
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self._metricas['expulsiones'] += 1
+
+    def invalidar(self, *claves):
+        with self._lock:
+            self._invalidaciones += 1
+            for clave in claves:
+                if self._datos.pop(clave, None) is not None:
+                    self._metricas['invalidaciones'] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._invalidaciones += 1
+            self._datos.clear()
+
+    def metricas(self):
+        with self._lock:
+            datos = dict(self._metricas)
+            datos['entradas'] = len(self._datos)
+            datos['max_entradas'] = self.max_entradas
+            datos['ttl'] = self.ttl
+        return datos
@@ -0,0 +1,99 @@
+# database/dinero.py
+"""Importes en unidades mínimas (centavos) y cálculo de impuestos.
+
+En la base todos los importes son INTEGER en centavos (migración 12): las
+sumas de SQLite son exactas y no hace falta corregirlas en Python. La API
+sigue hablando en unidades (100.5); la conversión se hace en el borde con
+a_centavos() al entrar y a_monto() al salir.
+
+calcular_factura() reparte el total cobrado en subtotal e impuesto a
+partir de las líneas: cada línea redondea su base y su impuesto con la
+política elegida. Siempre subtotal + impuesto == total cobrado; solo si las
+líneas suman ese total la factura es además la suma exacta de sus líneas.
+Si no, el impuesto sale de la tasa efectiva de las líneas y puede diferir
+de la suma de los impuestos de línea.
+"""
+from decimal import ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal, InvalidOperation
+
+CENTAVOS = 100
+# Rango de INTEGER en SQLite: un importe en centavos debe cumplir |x| < LIMITE_CENTAVOS
+LIMITE_CENTAVOS = 2 ** 63
+
+POLITICAS_REDONDEO = {
+    'mitad_arriba': ROUND_HALF_UP,
+    'mitad_par': ROUND_HALF_EVEN,  # redondeo bancario
+    'truncar': ROUND_DOWN,
+}
+
+_UNIDAD = Decimal(1)
+
+
+def a_decimal(valor):
+    """int/float/str -> Decimal exacto del literal (0.1 -> Decimal('0.1'))"""
+    try:
+        numero = Decimal(str(valor))
+    except InvalidOperation:
+        raise ValueError(f"Importe inválido: {valor!r}") from None
+    if not numero.is_finite():
+        raise ValueError(f"Importe inválido: {valor!r}")
+    return numero
+
+
+def redondear(valor, politica='mitad_arriba'):
+    """Decimal -> int según la política de redondeo"""
+    if politica not in POLITICAS_REDONDEO:
+        raise ValueError(f"Política de redondeo desconocida: {politica} "
+                         f"(usar {', '.join(POLITICAS_REDONDEO)})")
+    try:
+        return int(valor.quantize(_UNIDAD, rounding=POLITICAS_REDONDEO[politica]))
+    except InvalidOperation:
+        # quantize falla si el entero no cabe en la precisión del contexto (1e300)
+        raise ValueError(f"Importe fuera de rango: {valor}") from None
+
+
+def a_centavos(monto, politica='mitad_arriba'):
+    """Importe en unidades (100.5) -> centavos (10050); ValueError si no cabe
+    en un INTEGER de SQLite"""
+    centavos = redondear(a_decimal(monto) * CENTAVOS, politica)
+    if abs(centavos) >= LIMITE_CENTAVOS:
+        raise ValueError(f"Importe fuera de rango: {monto!r}")
+    return centavos
+
+
+def a_monto(centavos):
+    """Centavos -> unidades para la API; float exacto a 2 decimales al serializar"""
+    return centavos / CENTAVOS
+
+
+def calcular_factura(total_centavos, items, tasa_impuesto=0.12, politica='mitad_arriba'):
+    """Reparte total_centavos (impuesto incluido) en subtotal e impuesto.
+
+    items: [{'cantidad', 'precio', 'tasa_impuesto'?}] con precio sin impuesto
+    en unidades; la tasa de cada línea es la suya o tasa_impuesto. Devuelve
+    (subtotal, impuesto, lineas) en centavos, con lineas = [(base, tasa, impuesto)].
+
+    Si las líneas suman exactamente el total, el impuesto es la suma de los
+    impuestos de línea; si no (total cobrado con otro redondeo), se aplica al
+    total la tasa efectiva de las líneas. Sin items se usa tasa_impuesto.
+    Siempre se cumple subtotal + impuesto == total_centavos.
+    """
+    tasa_defecto = a_decimal(tasa_impuesto)
+    lineas = []
+    base_total = impuesto_lineas = 0
+    for item in items:
+        tasa = a_decimal(item['tasa_impuesto']) if 'tasa_impuesto' in item else tasa_defecto
+        base_exacta = a_decimal(item['cantidad']) * a_decimal(item['precio']) * CENTAVOS
+        base = redondear(base_exacta, politica)
+        impuesto = redondear(base_exacta * tasa, politica)
+        lineas.append((base, float(tasa), impuesto))
+        base_total += base
+        impuesto_lineas += impuesto
+
+    total_lineas = base_total + impuesto_lineas
+    if total_lineas == total_centavos:
+        impuesto = impuesto_lineas
+    elif total_lineas > 0:
+        impuesto = redondear(Decimal(total_centavos) * impuesto_lineas / total_lineas, politica)
+    else:
+        impuesto = total_centavos - redondear(Decimal(total_centavos) / (1 + tasa_defecto), politica)
+    return total_centavos - impuesto, impuesto, lineas
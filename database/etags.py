@@ -0,0 +1,17 @@
+# database/etags.py
+"""ETags fuertes para recursos y listados.
+
+Se derivan de datos baratos de obtener (fecha_actualizacion del recurso,
+versión de la tabla, id máximo) sin construir el recurso, para poder
+contestar 304 con una búsqueda por índice.
+"""
+import hashlib
+
+# Cambiar si cambia la representación JSON de los recursos
+# (v2: importes en centavos e impuesto por línea)
+REPRESENTACION = 'v2'
+
+
+def calcular_etag(*partes):
+    crudo = '|'.join(str(p) for p in (REPRESENTACION,) + partes)
+    return hashlib.blake2b(crudo.encode(), digest_size=10).hexdigest()
@@ -0,0 +1,121 @@
+# database/exportacion.py
+"""Exportación en streaming (NDJSON / CSV) de tablas completas.
+
+Se recorre la tabla por id ascendente en bloques keyset; cada bloque usa
+su propia consulta y se lee con fetchmany, y la conexión vuelve al pool
+antes de entregar el bloque. La memoria queda acotada por el tamaño de
+bloque y un cliente lento no retiene conexiones.
+
+Los importes (centavos en la base) se exportan en unidades, como en la API.
+Las líneas NDJSON se escriben directo desde las tuplas con un formateador
+generado por tabla (registros.compilar_json) y salen ya en bytes.
+"""
+import csv
+import io
+
+from database.dinero import CENTAVOS
+from database.registros import compilar_json
+
+# tabla -> (columna de fecha para 'desde', columnas exportadas)
+TABLAS_EXPORTABLES = {
+    'pagos': ('fecha_creacion', (
+        'id', 'orden_id', 'usuario_id', 'monto_total', 'metodo_pago',
+        'estado', 'fecha_creacion', 'fecha_actualizacion',
+    )),
+    'facturas': ('fecha_emision', (
+        'id', 'numero_factura', 'pago_id', 'orden_id', 'usuario_id',
+        'monto_total', 'impuesto', 'subtotal', 'fecha_emision',
+    )),
+    'factura_items': ('fecha_emision', (
+        'id', 'factura_id', 'posicion', 'nombre', 'cantidad', 'precio',
+        'subtotal', 'tasa_impuesto', 'impuesto', 'fecha_emision',
+    )),
+    'transacciones': ('fecha', (
+        'id', 'pago_id', 'codigo_transaccion', 'estado', 'mensaje', 'fecha',
+    )),
+}
+
+# Columnas guardadas en centavos: se dividen en el propio SELECT
+COLUMNAS_CENTAVOS = {'monto_total', 'impuesto', 'subtotal', 'precio'}
+
+# Tipo de las columnas exportadas para el formateador NDJSON (el resto, 'text');
+# los importes ya llegan en unidades desde el SELECT
+TIPOS_COLUMNAS = {
+    'id': 'int', 'usuario_id': 'int', 'pago_id': 'int', 'factura_id': 'int', 'posicion': 'int',
+    'monto_total': 'real', 'impuesto': 'real', 'subtotal': 'real', 'precio': 'real',
+    'cantidad': 'real', 'tasa_impuesto': 'real', 'mensaje': 'text?',
+}
+
+# tabla -> fila -> línea JSON (igual que json.dumps(dict(...), ensure_ascii=False))
+_LINEAS_NDJSON = {
+    tabla: compilar_json(columnas, {c: TIPOS_COLUMNAS.get(c, 'text') for c in columnas},
+                         ordenar=False, ascii=False, separadores=(', ', ': '))
+    for tabla, (_, columnas) in TABLAS_EXPORTABLES.items()
+}
+
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+TAMANO_BLOQUE = 1000
+
+
+def iterar_bloques(db, tabla, desde_id=None, desde=None, tamano_bloque=TAMANO_BLOQUE):
+    """Genera listas de filas (tuplas) con id > desde_id y fecha >= desde"""
+    if tabla not in TABLAS_EXPORTABLES:
+        raise ValueError(f"Tabla no exportable: {tabla}")
+    columna_fecha, columnas = TABLAS_EXPORTABLES[tabla]
+
+    filtro_fecha = ''
+    parametros_fecha = []
+    if desde is not None:
+        # '+' evita que el planificador use el índice de fecha y ordene cada
+        # bloque en memoria: se recorre la PK y la fecha es un filtro residual
+        filtro_fecha = f' AND +{columna_fecha} >= ?'
+        parametros_fecha.append(desde)
+
+    seleccion = ', '.join(f'{columna} / {CENTAVOS}.0' if columna in COLUMNAS_CENTAVOS else columna
+                          for columna in columnas)
+    sql = (f"SELECT {seleccion} FROM {tabla} "
+           f"WHERE id > ?{filtro_fecha} ORDER BY id LIMIT ?")
+    ultimo_id = desde_id or 0
+    while True:
+        with db.conexion() as conn:
+            cursor = conn.execute(sql, [ultimo_id] + parametros_fecha + [tamano_bloque])
+            bloque = cursor.fetchmany(tamano_bloque)
+        if not bloque:
+            return
+        ultimo_id = bloque[-1][0]
+        yield bloque
+        if len(bloque) < tamano_bloque:
+            return
+
+
+def exportar_ndjson(db, tabla, **filtros):
+    linea = _LINEAS_NDJSON[tabla]
+    for bloque in iterar_bloques(db, tabla, **filtros):
+        yield ('\n'.join(map(linea, bloque)) + '\n').encode()
+
+
+def exportar_csv(db, tabla, **filtros):
+    _, columnas = TABLAS_EXPORTABLES[tabla]
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    for bloque in iterar_bloques(db, tabla, **filtros):
+        escritor.writerows(bloque)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Tabla vacía: solo la cabecera
+        yield buffer.getvalue()
+
+
+def exportar(db, tabla, formato, **filtros):
+    if formato == 'ndjson':
+        return exportar_ndjson(db, tabla, **filtros)
+    if formato == 'csv':
+        return exportar_csv(db, tabla, **filtros)
+    raise ValueError(f"Formato no soportado: {formato} (usar {', '.join(FORMATOS)})")
@@ -0,0 +1,200 @@
+# database/generador.py
+"""Datos sintéticos para probar a escala (pagos, transacciones, facturas e items).
+
+El resultado depende solo de los parámetros y de la semilla: misma semilla,
+misma base fila por fila (las fechas salen de 'desde', no del reloj).
+
+Distribuciones:
+- usuarios sesgados (pocos usuarios con muchos pagos), métodos y estados
+  con pesos fijos (85 % aprobados, 5 % rechazados, 10 % pendientes);
+- 1 a 5 items de un catálogo con precios log-normales y popularidad
+  sesgada; el monto es la suma de las líneas más su impuesto (12 % o
+  exento), redondeado por línea como Factura.generar_factura;
+- fechas crecientes con el id repartidas en 'dias' días; los pagos
+  procesados tienen una transacción y los aprobados, casi todos, factura.
+
+Para cargar millones de filas en minutos se insertan bloques con
+executemany, una transacción por bloque, con ids explícitos y sin índices
+ni triggers; al final se recrean, se ajustan los contadores de secuencias
+y se reconstruyen los resúmenes.
+"""
+import math
+import random
+from datetime import datetime, timedelta
+
+from database.resumenes import reconstruir_en
+
+METODOS = ('tarjeta_credito', 'tarjeta_debito', 'transferencia', 'efectivo', 'billetera')
+PESOS_METODOS = (55, 25, 12, 5, 3)
+ESTADOS = ('aprobado', 'rechazado', 'pendiente')
+PESOS_ESTADOS = (85, 5, 10)
+MENSAJES = {'aprobado': 'Pago procesado exitosamente', 'rechazado': 'Fondos insuficientes'}
+PROPORCION_FACTURADOS = 0.95
+TABLAS = ('pagos', 'transacciones', 'facturas', 'factura_items')
+
+
+def _catalogo(rng, productos):
+    """[(nombre, precio_centavos, tasa_puntos_basicos)]"""
+    catalogo = []
+    for k in range(productos):
+        precio = max(50, int(round(math.exp(rng.gauss(math.log(1500), 0.8)))))
+        tasa = 0 if rng.random() < 0.1 else 1200
+        catalogo.append((f'Producto {k:04d}', precio, tasa))
+    return catalogo
+
+
+def _acumulados(pesos):
+    total, acumulados = 0, []
+    for peso in pesos:
+        total += peso
+        acumulados.append(total)
+    return acumulados
+
+
+def generar(db, pagos, semilla=42, desde='2024-01-01', dias=365, usuarios=None,
+            productos=500, bloque=50000, progreso=None):
+    """Llena una base sin pagos con 'pagos' pagos y sus filas relacionadas.
+
+    progreso(hechos, total) se llama tras cada bloque. Devuelve el número de
+    filas insertadas por tabla.
+    """
+    if pagos < 1 or bloque < 1 or dias < 1:
+        raise ValueError("pagos, bloque y dias deben ser mayores que 0")
+    with db.conexion() as conn:
+        if conn.execute('SELECT 1 FROM pagos LIMIT 1').fetchone():
+            raise ValueError("La tabla pagos no está vacía: generar sobre una base nueva")
+
+    rng = random.Random(semilla)
+    catalogo = _catalogo(rng, productos)
+    usuarios = usuarios or max(1, pagos // 20)
+    inicio = datetime.fromisoformat(desde)
+    paso = dias * 86400 / pagos
+    estado = {'pago_id': 0, 'transaccion_id': 0, 'factura_id': 0, 'item_id': 0,
+              'numeros': {}, 'filas': dict.fromkeys(TABLAS, 0)}
+
+    with db.conexion(escritura=True) as conn:
+        indices, triggers = _quitar_indices_y_triggers(conn)
+    try:
+        while estado['pago_id'] < pagos:
+            cantidad = min(bloque, pagos - estado['pago_id'])
+            filas = _bloque(rng, catalogo, usuarios, inicio, paso, cantidad, estado)
+            with db.conexion(escritura=True) as conn:
+                _insertar(conn, filas)
+            if progreso:
+                progreso(estado['pago_id'], pagos)
+    finally:
+        with db.conexion(escritura=True) as conn:
+            for sql in indices + triggers:
+                conn.execute(sql)
+            _ajustar_secuencias(conn, estado['numeros'])
+            # Sin triggers durante la carga: una sola subida de versión (ETags)
+            conn.execute("UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'pagos'")
+            reconstruir_en(conn)
+    return estado['filas']
+
+
+# ---------- Internos ----------
+def _bloque(rng, catalogo, usuarios, inicio, paso, cantidad, estado):
+    acumulado_metodos = _acumulados(PESOS_METODOS)
+    acumulado_estados = _acumulados(PESOS_ESTADOS)
+    filas = {tabla: [] for tabla in TABLAS}
+    numeros = estado['numeros']
+
+    def codigo(prefijo, momento):
+        dia = momento.strftime('%Y%m%d')
+        clave = f'{prefijo}:{dia}'
+        numeros[clave] = numeros.get(clave, 0) + 1
+        return f'{prefijo}-{dia}-{numeros[clave]:08d}'
+
+    for _ in range(cantidad):
+        estado['pago_id'] += 1
+        pago_id = estado['pago_id']
+        creado = inicio + timedelta(seconds=(pago_id - 1 + rng.random()) * paso)
+        usuario_id = int(usuarios * rng.random() ** 2) + 1
+        metodo = rng.choices(METODOS, cum_weights=acumulado_metodos)[0]
+        estado_pago = rng.choices(ESTADOS, cum_weights=acumulado_estados)[0]
+
+        lineas, base_total, impuesto_total = [], 0, 0
+        for _ in range(rng.choices((1, 2, 3, 4, 5), cum_weights=(40, 65, 82, 93, 100))[0]):
+            nombre, precio, tasa = catalogo[int(len(catalogo) * rng.random() ** 2)]
+            cantidad_item = rng.choices((1, 2, 3), cum_weights=(70, 90, 100))[0]
+            base = cantidad_item * precio
+            impuesto = (base * tasa + 5000) // 10000  # mitad_arriba
+            lineas.append((nombre, cantidad_item, precio, base, tasa / 10000, impuesto))
+            base_total += base
+            impuesto_total += impuesto
+        monto = base_total + impuesto_total
+
+        actualizado = creado
+        if estado_pago != 'pendiente':
+            actualizado = creado + timedelta(seconds=0.5 + rng.random() * 30)
+            estado['transaccion_id'] += 1
+            filas['transacciones'].append((
+                estado['transaccion_id'], pago_id, codigo('TXN', actualizado), estado_pago,
+                MENSAJES[estado_pago], actualizado.isoformat()
+            ))
+        filas['pagos'].append((pago_id, f'GEN-{pago_id:09d}', usuario_id, monto, metodo, estado_pago,
+                               creado.isoformat(), actualizado.isoformat()))
+
+        if estado_pago == 'aprobado' and rng.random() < PROPORCION_FACTURADOS:
+            estado['factura_id'] += 1
+            factura_id = estado['factura_id']
+            emitida = actualizado + timedelta(seconds=rng.random() * 5)
+            fecha_emision = emitida.isoformat()
+            filas['facturas'].append((factura_id, codigo('FAC', emitida), pago_id, f'GEN-{pago_id:09d}',
+                                      usuario_id, monto, impuesto_total, base_total, fecha_emision))
+            for posicion, linea in enumerate(lineas):
+                estado['item_id'] += 1
+                filas['factura_items'].append((estado['item_id'], factura_id, posicion, *linea, fecha_emision))
+
+    for tabla in TABLAS:
+        estado['filas'][tabla] += len(filas[tabla])
+    return filas
+
+
+def _insertar(conn, filas):
+    conn.executemany('''
+        INSERT INTO pagos (id, orden_id, usuario_id, monto_total, metodo_pago, estado,
+                           fecha_creacion, fecha_actualizacion)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', filas['pagos'])
+    conn.executemany('''
+        INSERT INTO transacciones (id, pago_id, codigo_transaccion, estado, mensaje, fecha)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', filas['transacciones'])
+    conn.executemany('''
+        INSERT INTO facturas (id, numero_factura, pago_id, orden_id, usuario_id, monto_total,
+                              impuesto, subtotal, fecha_emision)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', filas['facturas'])
+    conn.executemany('''
+        INSERT INTO factura_items (id, factura_id, posicion, nombre, cantidad, precio,
+                                   subtotal, tasa_impuesto, impuesto, fecha_emision)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', filas['factura_items'])
+
+
+def _quitar_indices_y_triggers(conn):
+    """Borra los índices secundarios y los triggers de las tablas a cargar;
+    devuelve su SQL para recrearlos (primero índices, luego triggers)"""
+    marcadores = ', '.join('?' * len(TABLAS))
+    indices = conn.execute(f'''
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({marcadores})
+    ''', TABLAS).fetchall()
+    triggers = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND sql IS NOT NULL"
+    ).fetchall()
+    for nombre, _ in indices:
+        conn.execute(f'DROP INDEX {nombre}')
+    for nombre, _ in triggers:
+        conn.execute(f'DROP TRIGGER {nombre}')
+    return [sql for _, sql in indices], [sql for _, sql in triggers]
+
+
+def _ajustar_secuencias(conn, numeros):
+    """Deja los contadores por día por encima de los códigos generados"""
+    conn.executemany('''
+        INSERT INTO secuencias (nombre, valor) VALUES (?, ?)
+        ON CONFLICT (nombre) DO UPDATE SET valor = MAX(valor, excluded.valor)
+    ''', list(numeros.items()))
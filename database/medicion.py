@@ -0,0 +1,53 @@
+# database/medicion.py
+"""Conexiones SQLite que miden cada sentencia.
+
+Database(metricas=...) abre las conexiones con ConexionMedida: execute,
+executemany, commit y rollback (de la conexión y de sus cursores) llaman a
+metricas.observar_sql(sql, segundos). Es el tiempo de la llamada: para un
+SELECT incluye el primer paso, no los fetch posteriores.
+"""
+import sqlite3
+from time import perf_counter
+
+
+class CursorMedido(sqlite3.Cursor):
+    def execute(self, sql, parametros=()):
+        inicio = perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self.connection.metricas.observar_sql(sql, perf_counter() - inicio)
+
+    def executemany(self, sql, parametros):
+        inicio = perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            self.connection.metricas.observar_sql(sql, perf_counter() - inicio)
+
+
+class ConexionMedida(sqlite3.Connection):
+    metricas = None  # se asigna al abrirla (ver Database.get_connection)
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+    def commit(self):
+        inicio = perf_counter()
+        try:
+            super().commit()
+        finally:
+            self.metricas.observar_sql('COMMIT', perf_counter() - inicio)
+
+    def rollback(self):
+        inicio = perf_counter()
+        try:
+            super().rollback()
+        finally:
+            self.metricas.observar_sql('ROLLBACK', perf_counter() - inicio)
@@ -0,0 +1,537 @@
+# database/migraciones.py
+"""Migraciones versionadas del esquema.
+
+Cada migración es (version, descripcion, pasos); un paso es una sentencia
+SQL o una función que recibe la conexión. La versión aplicada se registra
+en la tabla esquema_versiones.
+
+Se aplican en Database.init_db o con: python cli.py migrar [--verificar]
+"""
+import json
+import math
+from datetime import datetime
+
+from database.dinero import CENTAVOS
+from database.resumenes import reconstruir_en as _rellenar_resumenes
+
+
+def _verificar_facturas_unicas(conn):
+    """Antes del índice único: no se borran facturas, hay que resolverlas a mano"""
+    duplicados = [fila[0] for fila in conn.execute(
+        'SELECT pago_id FROM facturas GROUP BY pago_id HAVING COUNT(*) > 1 LIMIT 20'
+    )]
+    if duplicados:
+        raise RuntimeError(f"Hay pagos con más de una factura: {duplicados}")
+
+
+def _numero_legado(valor):
+    """cantidad/precio de un item JSON viejo como número que SQLite acepta;
+    0 si no lo es (listas, dicts, textos no numéricos, NaN...)"""
+    if isinstance(valor, bool):
+        return 0
+    if isinstance(valor, int) and abs(valor) < 2 ** 63:
+        return valor
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError, OverflowError):
+        return 0
+    return numero if math.isfinite(numero) else 0
+
+
+def _rellenar_factura_items(conn):
+    """Pasa los items JSON de cada factura a filas de factura_items"""
+    ultimo_id = 0
+    while True:
+        bloque = conn.execute(
+            'SELECT id, items, fecha_emision FROM facturas WHERE id > ? ORDER BY id LIMIT 1000',
+            (ultimo_id,)
+        ).fetchall()
+        if not bloque:
+            return
+        filas = []
+        for factura_id, items, fecha_emision in bloque:
+            try:
+                items = json.loads(items)
+            except ValueError:
+                items = []
+            for posicion, item in enumerate(items if isinstance(items, list) else []):
+                if not isinstance(item, dict):
+                    continue
+                filas.append((factura_id, posicion, str(item.get('nombre', '')),
+                              _numero_legado(item.get('cantidad')), _numero_legado(item.get('precio')),
+                              fecha_emision))
+        conn.executemany('''
+            INSERT INTO factura_items (factura_id, posicion, nombre, cantidad, precio, fecha_emision)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', filas)
+        ultimo_id = bloque[-1][0]
+
+
+# Migración 12: tablas con importes en centavos y su SELECT desde la tabla
+# vieja (REAL en unidades). factura_items va primero: su tasa sale de la
+# cabecera de la factura todavía en unidades.
+_TABLAS_CENTAVOS = [
+    ('factura_items', '''
+        CREATE TABLE factura_items_nueva (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            factura_id INTEGER NOT NULL,
+            posicion INTEGER NOT NULL,
+            nombre TEXT NOT NULL,
+            cantidad NUMERIC NOT NULL,
+            precio INTEGER NOT NULL,
+            subtotal INTEGER NOT NULL,
+            tasa_impuesto REAL NOT NULL,
+            impuesto INTEGER NOT NULL,
+            fecha_emision TEXT NOT NULL,
+            FOREIGN KEY (factura_id) REFERENCES facturas (id)
+        )
+        ''', f'''
+        SELECT id, factura_id, posicion, nombre, cantidad, precio, base, tasa,
+               CAST(ROUND(base * tasa) AS INTEGER), fecha_emision
+        FROM (
+            SELECT i.id, i.factura_id, i.posicion, i.nombre, i.cantidad, i.fecha_emision,
+                   CAST(ROUND(i.precio * {CENTAVOS}) AS INTEGER) AS precio,
+                   CAST(ROUND(i.cantidad * i.precio * {CENTAVOS}) AS INTEGER) AS base,
+                   COALESCE(ROUND(f.impuesto / NULLIF(f.subtotal, 0), 6), 0) AS tasa
+            FROM factura_items i LEFT JOIN facturas f ON f.id = i.factura_id
+        )
+        '''),
+    ('pagos', '''
+        CREATE TABLE pagos_nueva (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            orden_id TEXT NOT NULL UNIQUE,
+            usuario_id INTEGER NOT NULL,
+            monto_total INTEGER NOT NULL,
+            metodo_pago TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            fecha_creacion TEXT NOT NULL,
+            fecha_actualizacion TEXT NOT NULL
+        )
+        ''', f'''
+        SELECT id, orden_id, usuario_id, CAST(ROUND(monto_total * {CENTAVOS}) AS INTEGER),
+               metodo_pago, estado, fecha_creacion, fecha_actualizacion
+        FROM pagos
+        '''),
+    # El impuesto se deriva del total para que subtotal + impuesto == monto_total
+    ('facturas', '''
+        CREATE TABLE facturas_nueva (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            numero_factura TEXT NOT NULL UNIQUE,
+            pago_id INTEGER NOT NULL,
+            orden_id TEXT NOT NULL,
+            usuario_id INTEGER NOT NULL,
+            monto_total INTEGER NOT NULL,
+            impuesto INTEGER NOT NULL,
+            subtotal INTEGER NOT NULL,
+            fecha_emision TEXT NOT NULL,
+            FOREIGN KEY (pago_id) REFERENCES pagos (id)
+        )
+        ''', f'''
+        SELECT id, numero_factura, pago_id, orden_id, usuario_id,
+               CAST(ROUND(monto_total * {CENTAVOS}) AS INTEGER),
+               CAST(ROUND(monto_total * {CENTAVOS}) AS INTEGER) - CAST(ROUND(subtotal * {CENTAVOS}) AS INTEGER),
+               CAST(ROUND(subtotal * {CENTAVOS}) AS INTEGER),
+               fecha_emision
+        FROM facturas
+        '''),
+]
+
+
+def _importes_a_centavos(conn):
+    """Reconstruye pagos, facturas y factura_items con importes INTEGER.
+
+    SQLite no cambia el tipo de una columna: se crea la tabla nueva, se
+    copian las filas, se borra la vieja y se renombra; índices, triggers y
+    el contador AUTOINCREMENT se recrean igual que estaban.
+    """
+    triggers = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND sql IS NOT NULL"
+    ).fetchall()
+    for nombre, _ in triggers:
+        conn.execute(f'DROP TRIGGER {nombre}')
+
+    for tabla, crear, seleccionar in _TABLAS_CENTAVOS:
+        indices = [fila[0] for fila in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (tabla,)
+        )]
+        secuencia = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (tabla,)).fetchone()
+        conn.execute(crear)
+        conn.execute(f'INSERT INTO {tabla}_nueva {seleccionar}')
+        conn.execute(f'DROP TABLE {tabla}')
+        conn.execute(f'ALTER TABLE {tabla}_nueva RENAME TO {tabla}')
+        for sql in indices:
+            conn.execute(sql)
+        if secuencia is not None:
+            conn.execute('DELETE FROM sqlite_sequence WHERE name = ?', (tabla,))
+            conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (tabla, secuencia[0]))
+
+    for tabla in ('resumen_pagos_diario', 'resumen_facturas_diario'):
+        conn.execute(f'DROP TABLE {tabla}')
+    conn.execute('''
+        CREATE TABLE resumen_pagos_diario (
+            dia TEXT NOT NULL,
+            metodo_pago TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            cantidad INTEGER NOT NULL,
+            monto_total INTEGER NOT NULL,
+            PRIMARY KEY (dia, metodo_pago, estado)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE resumen_facturas_diario (
+            dia TEXT NOT NULL,
+            metodo_pago TEXT NOT NULL,
+            cantidad INTEGER NOT NULL,
+            monto_total INTEGER NOT NULL,
+            impuesto INTEGER NOT NULL,
+            subtotal INTEGER NOT NULL,
+            PRIMARY KEY (dia, metodo_pago)
+        ) WITHOUT ROWID
+    ''')
+    for _, sql in triggers:
+        conn.execute(sql)
+    _rellenar_resumenes(conn)
+
+
+MIGRACIONES = [
+    (1, 'Tablas base: pagos, facturas, transacciones', [
+        '''
+        CREATE TABLE IF NOT EXISTS pagos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            orden_id TEXT NOT NULL UNIQUE,
+            usuario_id INTEGER NOT NULL,
+            monto_total REAL NOT NULL,
+            metodo_pago TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            fecha_creacion TEXT NOT NULL,
+            fecha_actualizacion TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS facturas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            numero_factura TEXT NOT NULL UNIQUE,
+            pago_id INTEGER NOT NULL,
+            orden_id TEXT NOT NULL,
+            usuario_id INTEGER NOT NULL,
+            monto_total REAL NOT NULL,
+            impuesto REAL NOT NULL,
+            subtotal REAL NOT NULL,
+            items TEXT NOT NULL,
+            fecha_emision TEXT NOT NULL,
+            FOREIGN KEY (pago_id) REFERENCES pagos (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS transacciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pago_id INTEGER NOT NULL,
+            codigo_transaccion TEXT NOT NULL UNIQUE,
+            estado TEXT NOT NULL,
+            mensaje TEXT,
+            fecha TEXT NOT NULL,
+            FOREIGN KEY (pago_id) REFERENCES pagos (id)
+        )
+        ''',
+    ]),
+    (2, 'Índices secundarios para consultas por usuario, estado, pago y fecha', [
+        'CREATE INDEX IF NOT EXISTS idx_pagos_usuario ON pagos (usuario_id, id)',
+        'CREATE INDEX IF NOT EXISTS idx_pagos_estado ON pagos (estado, id)',
+        'CREATE INDEX IF NOT EXISTS idx_pagos_fecha_creacion ON pagos (fecha_creacion)',
+        'CREATE INDEX IF NOT EXISTS idx_facturas_pago ON facturas (pago_id)',
+        'CREATE INDEX IF NOT EXISTS idx_facturas_usuario ON facturas (usuario_id, id)',
+        'CREATE INDEX IF NOT EXISTS idx_facturas_fecha_emision ON facturas (fecha_emision)',
+        'CREATE INDEX IF NOT EXISTS idx_transacciones_pago ON transacciones (pago_id)',
+        'CREATE INDEX IF NOT EXISTS idx_transacciones_fecha ON transacciones (fecha)',
+    ]),
+    (3, 'Índice por método de pago para el listado filtrado', [
+        'CREATE INDEX IF NOT EXISTS idx_pagos_metodo ON pagos (metodo_pago, id)',
+    ]),
+    (4, 'Cola de trabajos asíncronos', [
+        '''
+        CREATE TABLE IF NOT EXISTS trabajos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            resultado TEXT,
+            error TEXT,
+            intentos INTEGER NOT NULL DEFAULT 0,
+            max_intentos INTEGER NOT NULL,
+            disponible_en TEXT NOT NULL,
+            fecha_creacion TEXT NOT NULL,
+            fecha_actualizacion TEXT NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_trabajos_cola ON trabajos (estado, disponible_en, id)',
+    ]),
+    (5, 'Índice de fecha_actualizacion para ETags de listados', [
+        'CREATE INDEX IF NOT EXISTS idx_pagos_fecha_actualizacion ON pagos (fecha_actualizacion)',
+    ]),
+    (6, 'Registro de eventos para el stream SSE', [
+        '''
+        CREATE TABLE IF NOT EXISTS eventos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            entidad_id INTEGER NOT NULL,
+            datos TEXT NOT NULL,
+            fecha TEXT NOT NULL
+        )
+        ''',
+    ]),
+    (7, 'Contadores por día para numerar facturas y transacciones', [
+        '''
+        CREATE TABLE IF NOT EXISTS secuencias (
+            nombre TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+    ]),
+    (8, 'Claves de idempotencia y una sola factura por pago', [
+        '''
+        CREATE TABLE IF NOT EXISTS idempotencia (
+            clave TEXT PRIMARY KEY,
+            huella TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            codigo INTEGER,
+            cuerpo BLOB,
+            tipo TEXT,
+            cabeceras TEXT,
+            fecha_creacion TEXT NOT NULL,
+            expira_en TEXT NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_idempotencia_expira ON idempotencia (expira_en)',
+        _verificar_facturas_unicas,
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_facturas_pago_unica ON facturas (pago_id)',
+        'DROP INDEX IF EXISTS idx_facturas_pago',
+    ]),
+    (9, 'Resúmenes diarios de ingresos mantenidos por triggers', [
+        '''
+        CREATE TABLE IF NOT EXISTS resumen_pagos_diario (
+            dia TEXT NOT NULL,
+            metodo_pago TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            cantidad INTEGER NOT NULL,
+            monto_total REAL NOT NULL,
+            PRIMARY KEY (dia, metodo_pago, estado)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS resumen_facturas_diario (
+            dia TEXT NOT NULL,
+            metodo_pago TEXT NOT NULL,
+            cantidad INTEGER NOT NULL,
+            monto_total REAL NOT NULL,
+            impuesto REAL NOT NULL,
+            subtotal REAL NOT NULL,
+            PRIMARY KEY (dia, metodo_pago)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_pagos_alta AFTER INSERT ON pagos
+        BEGIN
+            INSERT INTO resumen_pagos_diario (dia, metodo_pago, estado, cantidad, monto_total)
+            VALUES (substr(NEW.fecha_creacion, 1, 10), NEW.metodo_pago, NEW.estado, 1, NEW.monto_total)
+            ON CONFLICT (dia, metodo_pago, estado) DO UPDATE
+            SET cantidad = cantidad + 1, monto_total = monto_total + excluded.monto_total;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_pagos_estado AFTER UPDATE OF estado ON pagos
+        WHEN OLD.estado IS NOT NEW.estado
+        BEGIN
+            UPDATE resumen_pagos_diario
+            SET cantidad = cantidad - 1, monto_total = monto_total - OLD.monto_total
+            WHERE dia = substr(OLD.fecha_creacion, 1, 10) AND metodo_pago = OLD.metodo_pago
+              AND estado = OLD.estado;
+            INSERT INTO resumen_pagos_diario (dia, metodo_pago, estado, cantidad, monto_total)
+            VALUES (substr(NEW.fecha_creacion, 1, 10), NEW.metodo_pago, NEW.estado, 1, NEW.monto_total)
+            ON CONFLICT (dia, metodo_pago, estado) DO UPDATE
+            SET cantidad = cantidad + 1, monto_total = monto_total + excluded.monto_total;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_facturas_alta AFTER INSERT ON facturas
+        BEGIN
+            INSERT INTO resumen_facturas_diario (dia, metodo_pago, cantidad, monto_total, impuesto, subtotal)
+            VALUES (substr(NEW.fecha_emision, 1, 10),
+                    COALESCE((SELECT metodo_pago FROM pagos WHERE id = NEW.pago_id), ''),
+                    1, NEW.monto_total, NEW.impuesto, NEW.subtotal)
+            ON CONFLICT (dia, metodo_pago) DO UPDATE
+            SET cantidad = cantidad + 1, monto_total = monto_total + excluded.monto_total,
+                impuesto = impuesto + excluded.impuesto, subtotal = subtotal + excluded.subtotal;
+        END
+        ''',
+        _rellenar_resumenes,
+    ]),
+    (10, 'Índices cubrientes por usuario para el historial de pagos y facturas', [
+        '''
+        CREATE INDEX IF NOT EXISTS idx_pagos_usuario_cubriente ON pagos (
+            usuario_id, id, orden_id, monto_total, metodo_pago, estado, fecha_creacion, fecha_actualizacion
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_facturas_usuario_cubriente ON facturas (
+            usuario_id, id, numero_factura, pago_id, orden_id, monto_total, impuesto, subtotal, fecha_emision
+        )
+        ''',
+        # (usuario_id, id) es prefijo de los cubrientes: los índices viejos sobran
+        'DROP INDEX IF EXISTS idx_pagos_usuario',
+        'DROP INDEX IF EXISTS idx_facturas_usuario',
+    ]),
+    (11, 'Items de factura normalizados en factura_items', [
+        '''
+        CREATE TABLE IF NOT EXISTS factura_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            factura_id INTEGER NOT NULL,
+            posicion INTEGER NOT NULL,
+            nombre TEXT NOT NULL,
+            cantidad NUMERIC NOT NULL,
+            precio REAL NOT NULL,
+            fecha_emision TEXT NOT NULL,
+            FOREIGN KEY (factura_id) REFERENCES facturas (id)
+        )
+        ''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_factura_items_factura ON factura_items (factura_id, posicion)',
+        'CREATE INDEX IF NOT EXISTS idx_factura_items_fecha ON factura_items (fecha_emision)',
+        _rellenar_factura_items,
+        'ALTER TABLE facturas DROP COLUMN items',
+    ]),
+    (12, 'Importes en centavos enteros e impuesto por línea de factura', [
+        _importes_a_centavos,
+    ]),
+    # fecha_actualizacion no sirve de versión: se calcula antes de tomar el
+    # lock de escritura y los relojes de los procesos difieren. El contador
+    # lo suben los triggers dentro de la misma transacción que el cambio.
+    (13, 'Versión de la tabla pagos para los ETags de listados', [
+        '''
+        CREATE TABLE IF NOT EXISTS versiones_tablas (
+            tabla TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        "INSERT OR IGNORE INTO versiones_tablas (tabla, version) VALUES ('pagos', 0)",
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_version_pagos_alta AFTER INSERT ON pagos
+        BEGIN
+            UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'pagos';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_version_pagos_cambio AFTER UPDATE ON pagos
+        BEGIN
+            UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'pagos';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_version_pagos_baja AFTER DELETE ON pagos
+        BEGIN
+            UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'pagos';
+        END
+        ''',
+        'DROP INDEX IF EXISTS idx_pagos_fecha_actualizacion',
+    ]),
+]
+
+
+# Consultas frecuentes y el índice que debe usar cada una (EXPLAIN QUERY PLAN)
+CONSULTAS_CRITICAS = [
+    ('SELECT * FROM pagos WHERE orden_id = ?', ('X',),
+     'sqlite_autoindex_pagos_1'),
+    ('SELECT id, orden_id, usuario_id, monto_total, metodo_pago, estado, fecha_creacion, fecha_actualizacion '
+     'FROM pagos WHERE usuario_id = ? AND id < ? ORDER BY id DESC LIMIT 50', (1, 1000),
+     'COVERING INDEX idx_pagos_usuario_cubriente'),
+    ('SELECT * FROM pagos WHERE estado = ? ORDER BY id DESC LIMIT 50', ('pendiente',),
+     'idx_pagos_estado'),
+    ('SELECT * FROM pagos WHERE metodo_pago = ? AND id < ? ORDER BY id DESC LIMIT 50', ('tarjeta', 1000),
+     'idx_pagos_metodo'),
+    ('SELECT * FROM pagos WHERE fecha_creacion >= ? AND fecha_creacion < ?', ('2024', '2025'),
+     'idx_pagos_fecha_creacion'),
+    ('SELECT * FROM facturas WHERE numero_factura = ?', ('X',),
+     'sqlite_autoindex_facturas_1'),
+    ('SELECT * FROM facturas WHERE pago_id = ?', (1,),
+     'idx_facturas_pago_unica'),
+    ('SELECT id, numero_factura, pago_id, orden_id, usuario_id, monto_total, impuesto, subtotal, fecha_emision '
+     'FROM facturas WHERE usuario_id = ? AND id < ? ORDER BY id DESC LIMIT 50', (1, 1000),
+     'COVERING INDEX idx_facturas_usuario_cubriente'),
+    ('SELECT * FROM facturas WHERE fecha_emision >= ? AND fecha_emision < ?', ('2024', '2025'),
+     'idx_facturas_fecha_emision'),
+    ('SELECT nombre, cantidad, precio FROM factura_items WHERE factura_id = ? ORDER BY posicion', (1,),
+     'idx_factura_items_factura'),
+    ('SELECT nombre, SUM(cantidad) FROM factura_items WHERE fecha_emision >= ? AND fecha_emision < ? '
+     'GROUP BY nombre', ('2024', '2025'),
+     'idx_factura_items_fecha'),
+    ('SELECT * FROM transacciones WHERE pago_id = ?', (1,),
+     'idx_transacciones_pago'),
+    ('SELECT * FROM transacciones WHERE pago_id IN (?, ?, ?) ORDER BY pago_id, id', (1, 2, 3),
+     'idx_transacciones_pago'),
+    ('SELECT * FROM transacciones WHERE fecha >= ? AND fecha < ?', ('2024', '2025'),
+     'idx_transacciones_fecha'),
+    ("SELECT version FROM versiones_tablas WHERE tabla = 'pagos'", (),
+     'USING PRIMARY KEY'),
+    ("SELECT id FROM trabajos WHERE estado = 'pendiente' AND disponible_en <= ? "
+     "ORDER BY disponible_en, id LIMIT 1", ('2025',),
+     'idx_trabajos_cola'),
+    ('SELECT * FROM idempotencia WHERE clave = ?', ('X',),
+     'USING PRIMARY KEY'),
+    ('DELETE FROM idempotencia WHERE expira_en <= ?', ('2025',),
+     'idx_idempotencia_expira'),
+    ('SELECT * FROM resumen_pagos_diario WHERE dia >= ? AND dia < ?', ('2024-01-01', '2024-02-01'),
+     'USING PRIMARY KEY'),
+    ('SELECT * FROM resumen_facturas_diario WHERE dia >= ? AND dia < ?', ('2024-01-01', '2024-02-01'),
+     'USING PRIMARY KEY'),
+]
+
+
+def version_actual(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS esquema_versiones (
+            version INTEGER PRIMARY KEY,
+            descripcion TEXT NOT NULL,
+            aplicada_en TEXT NOT NULL
+        )
+    ''')
+    fila = conn.execute('SELECT MAX(version) FROM esquema_versiones').fetchone()
+    return fila[0] or 0
+
+
+def aplicar_migraciones(conn, hasta=None):
+    """Aplica las migraciones pendientes dentro de la transacción de conn.
+
+    Devuelve la lista de versiones aplicadas. Llamar con la transacción de
+    escritura ya abierta (BEGIN IMMEDIATE) para que dos procesos no migren
+    a la vez.
+    """
+    actual = version_actual(conn)
+    aplicadas = []
+    for version, descripcion, pasos in MIGRACIONES:
+        if version <= actual or (hasta is not None and version > hasta):
+            continue
+        for paso in pasos:
+            if callable(paso):
+                paso(conn)
+            else:
+                conn.execute(paso)
+        conn.execute(
+            'INSERT INTO esquema_versiones (version, descripcion, aplicada_en) VALUES (?, ?, ?)',
+            (version, descripcion, datetime.now().isoformat())
+        )
+        aplicadas.append(version)
+    return aplicadas
+
+
+def explicar(conn, sql, parametros=()):
+    """Devuelve el detalle de EXPLAIN QUERY PLAN como lista de strings"""
+    return [fila[3] for fila in conn.execute(f'EXPLAIN QUERY PLAN {sql}', parametros)]
+
+
+def verificar_planes(conn):
+    """Comprueba que cada consulta crítica usa su índice; devuelve los fallos"""
+    fallos = []
+    for sql, parametros, indice in CONSULTAS_CRITICAS:
+        plan = explicar(conn, sql, parametros)
+        if not any(indice in paso for paso in plan):
+            fallos.append((sql, indice, plan))
+    return fallos
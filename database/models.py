@@ -1,94 +1,269 @@
 # database/models.py
 import sqlite3
+from contextlib import contextmanager
 from datetime import datetime
-import json
+from itertools import islice
+import threading
+import time
+
+from database.cache import AUSENTE
+from database.dinero import POLITICAS_REDONDEO, a_centavos, a_decimal, a_monto, calcular_factura
+from database.etags import calcular_etag
+from database.medicion import ConexionMedida
+from database.migraciones import MIGRACIONES, aplicar_migraciones, version_actual
+from database.paginacion import pagina_keyset
+from database.perfiles import obtener_perfil
+from database.pool import PoolConexiones
+from database.registros import RegistroFactura, RegistroItemFactura, RegistroPago, RegistroTransaccion
+from database.reintentos import con_reintentos
+from database.secuencias import Secuencia
 
 class Database:
-    def __init__(self, db_name='pagos.db'):
+    def __init__(self, db_name='pagos.db', max_conexiones=8, timeout_pool=5.0,
+                 perfil='seguro', max_reintentos=5, espera_reintento=0.02, metricas=None,
+                 migrar=True):
         self.db_name = db_name
-        self.init_db()
+        self.metricas = metricas  # Metricas opcional: mide cada sentencia (ver servicios/metricas.py)
+        self.perfil = obtener_perfil(perfil)
+        self.max_reintentos = max_reintentos
+        self.espera_reintento = espera_reintento
+        self._reintentos = 0
+        self._local = threading.local()
+        self.pool = PoolConexiones(
+            self.get_connection,
+            max_conexiones=max_conexiones,
+            timeout_espera=timeout_pool
+        )
+        if migrar:
+            self.init_db()
+        else:
+            self.verificar_esquema()
     
     def get_connection(self):
-        # Habilitar row factory si quieres dict-like rows (no usado aquí)
-        conn = sqlite3.connect(self.db_name)
+        """Abre una conexión nueva (la usa el pool; preferir conexion())"""
+        # check_same_thread=False: el pool la presta a distintos hilos, nunca a la vez
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.perfil.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            factory=ConexionMedida if self.metricas is not None else sqlite3.Connection
+        )
+        if self.metricas is not None:
+            conn.metricas = self.metricas
+        self.perfil.aplicar(conn)
         return conn
+
+    @contextmanager
+    def conexion(self, escritura=False):
+        """Presta una conexión del pool.
+
+        El bloque más externo confirma al salir sin errores y revierte si
+        hay una excepción; los bloques anidados del mismo hilo comparten
+        la conexión y la transacción. Con escritura=True la transacción
+        externa empieza con BEGIN IMMEDIATE para tomar el lock de escritura
+        de entrada (evita el SQLITE_BUSY al promover un lock de lectura).
+        """
+        externo = not self.pool.en_uso_por_hilo()
+        if not externo:
+            with self.pool.conexion() as conn:
+                yield conn
+            return
+
+        self._local.al_confirmar = []
+        try:
+            with self.pool.conexion() as conn:
+                if escritura and not conn.in_transaction:
+                    conn.execute('BEGIN IMMEDIATE')
+                try:
+                    yield conn
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+                else:
+                    if conn.in_transaction:
+                        conn.commit()
+            callbacks = self._local.al_confirmar
+        finally:
+            self._local.al_confirmar = []
+        for callback in callbacks:
+            callback()
+
+    def al_confirmar(self, callback):
+        """Ejecuta callback tras el commit de la transacción en curso del hilo
+        (se descarta si se revierte); sin transacción en curso, lo ejecuta ya"""
+        if self.pool.en_uso_por_hilo():
+            self._local.al_confirmar.append(callback)
+        else:
+            callback()
+
+    def transaccion(self):
+        """Unidad de trabajo: una conexión y un solo commit para varias operaciones.
+
+        Los métodos de los modelos llamados dentro del bloque (en el mismo
+        hilo) usan esta conexión y no confirman por su cuenta; una excepción
+        revierte todo.
+        """
+        return self.conexion(escritura=True)
+
+    def metricas_pool(self):
+        metricas = self.pool.metricas()
+        metricas['perfil'] = self.perfil.nombre
+        metricas['reintentos_escritura'] = self._reintentos
+        return metricas
+
+    def registrar_reintento(self):
+        self._reintentos += 1
+
+    def cerrar(self):
+        self.pool.cerrar()
     
     def init_db(self):
-        """Inicializa las tablas de la base de datos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Tabla de pagos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS pagos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                orden_id TEXT NOT NULL UNIQUE,
-                usuario_id INTEGER NOT NULL,
-                monto_total REAL NOT NULL,
-                metodo_pago TEXT NOT NULL,
-                estado TEXT NOT NULL,
-                fecha_creacion TEXT NOT NULL,
-                fecha_actualizacion TEXT NOT NULL
-            )
-        ''')
-        
-        # Tabla de facturas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS facturas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                numero_factura TEXT NOT NULL UNIQUE,
-                pago_id INTEGER NOT NULL,
-                orden_id TEXT NOT NULL,
-                usuario_id INTEGER NOT NULL,
-                monto_total REAL NOT NULL,
-                impuesto REAL NOT NULL,
-                subtotal REAL NOT NULL,
-                items TEXT NOT NULL,
-                fecha_emision TEXT NOT NULL,
-                FOREIGN KEY (pago_id) REFERENCES pagos (id)
-            )
-        ''')
-        
-        # Tabla de transacciones
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transacciones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pago_id INTEGER NOT NULL,
-                codigo_transaccion TEXT NOT NULL UNIQUE,
-                estado TEXT NOT NULL,
-                mensaje TEXT,
-                fecha TEXT NOT NULL,
-                FOREIGN KEY (pago_id) REFERENCES pagos (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        # print("✅ Base de datos inicializada correctamente")
+        """Lleva el esquema a la última versión (ver database/migraciones.py)"""
+        with self.conexion(escritura=True) as conn:
+            aplicar_migraciones(conn)
+
+    def verificar_esquema(self):
+        """Sin migrar: falla si el esquema no está en la última versión
+        (los workers del servidor dejan las migraciones al proceso maestro)"""
+        with self.conexion() as conn:
+            actual = version_actual(conn)
+        if actual < MIGRACIONES[-1][0]:
+            raise RuntimeError(f"Esquema de {self.db_name} en versión {actual} "
+                               f"(última {MIGRACIONES[-1][0]}): ejecutar 'python cli.py migrar'")
+
+
+CAMPOS_PAGO = ('orden_id', 'usuario_id', 'monto_total', 'metodo_pago')
+
+
+def validar_pago(data):
+    """Devuelve un mensaje de error o None si el pago es válido"""
+    if not isinstance(data, dict):
+        return "Cada pago debe ser un objeto JSON"
+    faltan = [k for k in CAMPOS_PAGO if k not in data]
+    if faltan:
+        return f"Faltan campos: {', '.join(faltan)}"
+    if not isinstance(data['orden_id'], str) or not data['orden_id']:
+        return "'orden_id' debe ser un texto no vacío"
+    if not isinstance(data['usuario_id'], int) or isinstance(data['usuario_id'], bool):
+        return "'usuario_id' debe ser un entero"
+    if not isinstance(data['monto_total'], (int, float)) or isinstance(data['monto_total'], bool):
+        return "'monto_total' debe ser numérico"
+    if not _es_numero(data['monto_total']):
+        return "'monto_total' debe ser un número finito"
+    try:
+        if a_centavos(data['monto_total']) < 0:
+            return "'monto_total' no puede ser negativo"
+    except ValueError:
+        return "'monto_total' fuera de rango"
+    if not isinstance(data['metodo_pago'], str) or not data['metodo_pago']:
+        return "'metodo_pago' debe ser un texto no vacío"
+    return None
+
+
+def validar_items(items):
+    """Devuelve un mensaje de error o None si los items de factura son válidos"""
+    if not isinstance(items, list):
+        return "'items' debe ser una lista"
+    for posicion, item in enumerate(items):
+        if not isinstance(item, dict):
+            return f"items[{posicion}] debe ser un objeto"
+        if not isinstance(item.get('nombre'), str) or not item['nombre']:
+            return f"items[{posicion}].nombre debe ser un texto no vacío"
+        for campo in ('cantidad', 'precio'):
+            valor = item.get(campo)
+            if not _es_numero(valor) or valor < 0:
+                return f"items[{posicion}].{campo} debe ser un número no negativo"
+        try:
+            # Precio y base de la línea se guardan en centavos (INTEGER)
+            a_centavos(item['precio'])
+            a_centavos(a_decimal(item['cantidad']) * a_decimal(item['precio']))
+        except ValueError:
+            return f"items[{posicion}]: precio o cantidad x precio fuera de rango"
+        if 'tasa_impuesto' in item:
+            error = validar_tasa(item['tasa_impuesto'])
+            if error:
+                return f"items[{posicion}].{error}"
+    return None
+
+
+def validar_tasa(tasa):
+    if not _es_numero(tasa) or not 0 <= tasa < 1:
+        return "tasa_impuesto debe ser un número entre 0 y 1"
+    return None
+
+
+def _es_numero(valor):
+    # inf y nan no son importes válidos (nan < 0 es False)
+    return (isinstance(valor, (int, float)) and not isinstance(valor, bool)
+            and valor == valor and abs(valor) != float('inf'))
+
+
+def autorizar_pago(pago_id, monto_centavos, metodo_pago, latencia_pasarela=0.0):
+    """Simula la autorización en la pasarela: (estado, mensaje).
+
+    Función pura a nivel de módulo para poder ejecutarse en un pool de
+    hilos o de procesos. latencia_pasarela simula la espera de red. El
+    codigo_transaccion lo asigna quien escribe la transacción (Secuencia).
+    """
+    if latencia_pasarela:
+        time.sleep(latencia_pasarela)
+    # Simular procesamiento (siempre exitoso para esta demo; podría ser 'rechazado')
+    return 'aprobado', 'Pago procesado exitosamente'
+
+
+def etag_de_pago(pago):
+    return calcular_etag('pago', pago['id'], pago['fecha_actualizacion'])
+
+
+def etag_de_factura(factura):
+    # Las facturas no se modifican: basta con el id
+    return calcular_etag('factura', factura['id'])
+
+
+def _orden_de(data):
+    return data.get('orden_id') if isinstance(data, dict) else None
 
 
 class Pago:
-    def __init__(self, db):
+    TAMANO_LOTE = 500
+
+    def __init__(self, db, cache=None, eventos=None):
         self.db = db
+        self.cache = cache  # BackendCache opcional (ver database/cache.py)
+        self.eventos = eventos  # BusEventos opcional (ver servicios/eventos.py)
+        self.secuencia = Secuencia(db, 'TXN')
+
+    def invalidar(self, *pago_ids):
+        """Saca de la caché los pagos indicados cuando se confirme la transacción"""
+        if self.cache is not None and pago_ids:
+            claves = [f'pago:{pago_id}' for pago_id in pago_ids]
+            self.db.al_confirmar(lambda: self.cache.invalidar(*claves))
+
+    def publicar(self, tipo, eventos):
+        """Publica [(pago_id, datos)] en el bus dentro de la transacción en curso"""
+        if self.eventos is not None:
+            self.eventos.publicar_varios(tipo, eventos)
     
+    @con_reintentos
     def crear_pago(self, orden_id, usuario_id, monto_total, metodo_pago):
-        """Crea un nuevo registro de pago"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        fecha_actual = datetime.now().isoformat()
+        """Crea un nuevo registro de pago (monto_total en unidades; se guarda en centavos)"""
+        monto_centavos = a_centavos(monto_total)
+        monto_total = a_monto(monto_centavos)
         
-        try:
-            cursor.execute('''
-                INSERT INTO pagos (orden_id, usuario_id, monto_total, metodo_pago, estado, fecha_creacion, fecha_actualizacion)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (orden_id, usuario_id, monto_total, metodo_pago, 'pendiente', fecha_actual, fecha_actual))
-            
+        with self.db.conexion(escritura=True) as conn:
+            fecha_actual = datetime.now().isoformat()  # con el lock tomado
+            cursor = conn.cursor()
+            try:
+                cursor.execute('''
+                    INSERT INTO pagos (orden_id, usuario_id, monto_total, metodo_pago, estado, fecha_creacion, fecha_actualizacion)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (orden_id, usuario_id, monto_centavos, metodo_pago, 'pendiente', fecha_actual, fecha_actual))
+            except sqlite3.IntegrityError:
+                return None
             pago_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            
-            return {
+        
+            pago = {
                 'id': pago_id,
                 'orden_id': orden_id,
                 'usuario_id': usuario_id,
@@ -97,150 +272,395 @@ class Pago:
                 'estado': 'pendiente',
                 'fecha_creacion': fecha_actual
             }
-        except sqlite3.IntegrityError:
-            conn.close()
-            return None
-    
-    def procesar_pago(self, pago_id):
-        """Simula el procesamiento de un pago"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+            self.publicar('pago.creado', [(pago_id, {**pago, 'fecha_actualizacion': fecha_actual})])
         
-        # Obtener información del pago
-        cursor.execute('SELECT * FROM pagos WHERE id = ?', (pago_id,))
-        pago = cursor.fetchone()
-        
-        if not pago:
-            conn.close()
-            return {'success': False, 'mensaje': 'Pago no encontrado'}
-        
-        # Simular procesamiento (siempre exitoso para esta demo)
-        import random
-        codigo_transaccion = f"TXN-{random.randint(100000, 999999)}"
-        estado = 'aprobado'  # Podría ser 'rechazado' en casos reales
-        
-        fecha_actual = datetime.now().isoformat()
-        
-        # Actualizar estado del pago
-        cursor.execute('''
-            UPDATE pagos 
-            SET estado = ?, fecha_actualizacion = ?
-            WHERE id = ?
-        ''', (estado, fecha_actual, pago_id))
-        
-        # Registrar transacción
-        cursor.execute('''
-            INSERT INTO transacciones (pago_id, codigo_transaccion, estado, mensaje, fecha)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (pago_id, codigo_transaccion, estado, 'Pago procesado exitosamente', fecha_actual))
-        
-        conn.commit()
-        conn.close()
+        return pago
+    
+    def crear_pagos_lote(self, pagos, tamano_lote=None):
+        """Crea muchos pagos con executemany, en una transacción por bloque.
+
+        pagos puede ser cualquier iterable (se consume por bloques). Devuelve
+        un resultado por elemento, en el mismo orden:
+        {'indice', 'orden_id', 'estado': creado|duplicado|invalido, 'id' | 'error'}
+        Un orden_id repetido (en la base o dentro del propio lote) se informa
+        como duplicado sin abortar el resto.
+        """
+        tamano_lote = tamano_lote or self.TAMANO_LOTE
+        resultados = []
+        iterador = enumerate(pagos)
+        while True:
+            bloque = list(islice(iterador, tamano_lote))
+            if not bloque:
+                break
+            resultados.extend(self._crear_bloque(bloque))
+        return resultados
+
+    @con_reintentos
+    def _crear_bloque(self, bloque):
+        resultados = {}
+        validos = {}  # orden_id -> (indice, data); el primero gana
+        for indice, data in bloque:
+            error = validar_pago(data)
+            if error:
+                resultados[indice] = {'indice': indice, 'orden_id': _orden_de(data),
+                                      'estado': 'invalido', 'error': error}
+            elif data['orden_id'] in validos:
+                resultados[indice] = {'indice': indice, 'orden_id': data['orden_id'],
+                                      'estado': 'duplicado', 'error': 'orden_id repetido en el lote'}
+            else:
+                validos[data['orden_id']] = (indice, data)
+
+        with self.db.conexion(escritura=True) as conn:
+            fecha_actual = datetime.now().isoformat()
+            marcadores = ', '.join('?' * len(validos))
+            existentes = set()
+            if validos:
+                existentes = {fila[0] for fila in conn.execute(
+                    f'SELECT orden_id FROM pagos WHERE orden_id IN ({marcadores})', list(validos)
+                )}
+
+            nuevos = []
+            for orden_id, (indice, data) in validos.items():
+                if orden_id in existentes:
+                    resultados[indice] = {'indice': indice, 'orden_id': orden_id,
+                                          'estado': 'duplicado', 'error': 'Ya existe un pago para esta orden'}
+                else:
+                    nuevos.append((orden_id, data['usuario_id'], a_centavos(data['monto_total']), data['metodo_pago'],
+                                   'pendiente', fecha_actual, fecha_actual))
+
+            if nuevos:
+                conn.executemany('''
+                    INSERT INTO pagos (orden_id, usuario_id, monto_total, metodo_pago, estado, fecha_creacion, fecha_actualizacion)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', nuevos)
+                marcadores = ', '.join('?' * len(nuevos))
+                ids = dict(conn.execute(
+                    f'SELECT orden_id, id FROM pagos WHERE orden_id IN ({marcadores})',
+                    [fila[0] for fila in nuevos]
+                ))
+                eventos = []
+                for orden_id, usuario_id, monto_centavos, metodo_pago, *_ in nuevos:
+                    indice = validos[orden_id][0]
+                    resultados[indice] = {'indice': indice, 'orden_id': orden_id,
+                                          'estado': 'creado', 'id': ids[orden_id]}
+                    eventos.append((ids[orden_id], {
+                        'id': ids[orden_id], 'orden_id': orden_id, 'usuario_id': usuario_id,
+                        'monto_total': a_monto(monto_centavos), 'metodo_pago': metodo_pago, 'estado': 'pendiente',
+                        'fecha_creacion': fecha_actual, 'fecha_actualizacion': fecha_actual
+                    }))
+                self.publicar('pago.creado', eventos)
+
+        return [resultados[indice] for indice, _ in bloque]
+
+    @con_reintentos
+    def procesar_pago(self, pago_id, pago=None):
+        """Simula el procesamiento de un pago
+
+        pago: dict del pago ya leído/creado en la misma transacción (evita
+        volver a consultarlo; ver Database.transaccion).
+        """
+        with self.db.conexion(escritura=True) as conn:
+            cursor = conn.cursor()
+            
+            if pago is not None:
+                monto_centavos, metodo_pago = a_centavos(pago['monto_total']), pago['metodo_pago']
+                estado_actual = pago['estado']
+            else:
+                # Obtener información del pago
+                cursor.execute('SELECT monto_total, metodo_pago, estado FROM pagos WHERE id = ?', (pago_id,))
+                fila = cursor.fetchone()
+                if not fila:
+                    return {'success': False, 'mensaje': 'Pago no encontrado'}
+                monto_centavos, metodo_pago, estado_actual = fila
+            if estado_actual == 'procesando':
+                # Lo tiene reclamado el procesador por lotes: lo confirma él
+                return {'success': False, 'en_proceso': True,
+                        'mensaje': 'El pago se está procesando en un lote'}
+            
+            estado, mensaje = autorizar_pago(pago_id, monto_centavos, metodo_pago)
+            codigo_transaccion = self.secuencia.siguiente()
+            fecha_actual = datetime.now().isoformat()
+            
+            # Actualizar estado del pago
+            cursor.execute('''
+                UPDATE pagos 
+                SET estado = ?, fecha_actualizacion = ?
+                WHERE id = ?
+            ''', (estado, fecha_actual, pago_id))
+            
+            # Registrar transacción
+            cursor.execute('''
+                INSERT INTO transacciones (pago_id, codigo_transaccion, estado, mensaje, fecha)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (pago_id, codigo_transaccion, estado, mensaje, fecha_actual))
+            self.invalidar(pago_id)
+            self.publicar('pago.actualizado', [(pago_id, {
+                'id': pago_id, 'estado': estado, 'fecha_actualizacion': fecha_actual,
+                'codigo_transaccion': codigo_transaccion
+            })])
         
         return {
             'success': True,
             'pago_id': pago_id,
             'codigo_transaccion': codigo_transaccion,
             'estado': estado,
-            'mensaje': 'Pago procesado exitosamente'
+            'mensaje': mensaje
         }
     
     def obtener_pago(self, pago_id):
-        """Obtiene información de un pago"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM pagos WHERE id = ?', (pago_id,))
-        pago = cursor.fetchone()
-        conn.close()
+        """Obtiene información de un pago (lectura a través de la caché)"""
+        clave = f'pago:{pago_id}'
+        marca = None
+        if self.cache is not None:
+            pago = self.cache.obtener(clave)
+            if pago is not AUSENTE:
+                return pago
+            marca = self.cache.marca()
+
+        with self.db.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = RegistroPago.fabrica
+            pago = cursor.execute(f'SELECT {RegistroPago.SELECT} FROM pagos WHERE id = ?', (pago_id,)).fetchone()
         
         if pago:
-            return {
-                'id': pago[0],
-                'orden_id': pago[1],
-                'usuario_id': pago[2],
-                'monto_total': pago[3],
-                'metodo_pago': pago[4],
-                'estado': pago[5],
-                'fecha_creacion': pago[6],
-                'fecha_actualizacion': pago[7]
-            }
+            pago = pago.a_dict()
+            if self.cache is not None:
+                self.cache.guardar(clave, pago, marca)
+            return pago
         return None
 
+    def etag_pago(self, pago_id):
+        """ETag del pago sin construirlo: desde la caché o leyendo solo
+        fecha_actualizacion por rowid. None si el pago no existe."""
+        if self.cache is not None:
+            pago = self.cache.obtener(f'pago:{pago_id}')
+            if pago is not AUSENTE:
+                return etag_de_pago(pago)
+        with self.db.conexion() as conn:
+            fila = conn.execute('SELECT fecha_actualizacion FROM pagos WHERE id = ?', (pago_id,)).fetchone()
+        return calcular_etag('pago', pago_id, fila[0]) if fila else None
+
+    def etag_listado(self, consulta=''):
+        """ETag de un listado: la versión de la tabla pagos, que los triggers
+        suben en la misma transacción que cada alta, cambio o baja"""
+        with self.db.conexion() as conn:
+            version = conn.execute(
+                "SELECT version FROM versiones_tablas WHERE tabla = 'pagos'"
+            ).fetchone()[0]
+        return calcular_etag('pagos', consulta, version)
+
+    def transacciones_de(self, pago_ids):
+        """{pago_id: [RegistroTransaccion]} de varios pagos en una sola consulta (sin N+1)"""
+        resultado = {pago_id: [] for pago_id in pago_ids}
+        if not resultado:
+            return resultado
+        marcadores = ', '.join('?' * len(resultado))
+        with self.db.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = RegistroTransaccion.fabrica
+            filas = cursor.execute(f'''
+                SELECT {RegistroTransaccion.SELECT}
+                FROM transacciones WHERE pago_id IN ({marcadores})
+                ORDER BY pago_id, id
+            ''', list(resultado)).fetchall()
+        for transaccion in filas:
+            resultado[transaccion.pago_id].append(transaccion)
+        return resultado
+
+    def obtener_por_orden(self, orden_id):
+        """Obtiene el pago de una orden; orden_id -> id es inmutable, así que
+        la caché solo guarda el id y el pago sale de obtener_pago"""
+        clave = f'orden:{orden_id}'
+        if self.cache is not None:
+            pago_id = self.cache.obtener(clave)
+            if pago_id is not AUSENTE:
+                return self.obtener_pago(pago_id)
+
+        with self.db.conexion() as conn:
+            fila = conn.execute('SELECT id FROM pagos WHERE orden_id = ?', (orden_id,)).fetchone()
+        if not fila:
+            return None
+        if self.cache is not None:
+            self.cache.guardar(clave, fila[0])
+        return self.obtener_pago(fila[0])
+
+    def listar_pagos(self, limite=None, cursor=None, estado=None, usuario_id=None,
+                     metodo_pago=None, desde=None, hasta=None):
+        """Página de pagos (más recientes primero) con filtros opcionales.
+
+        Devuelve (pagos, siguiente_cursor): una lista de RegistroPago y None
+        en la última página. desde/hasta filtran fecha_creacion (ISO, hasta
+        exclusivo).
+        """
+        filtros = []
+        if estado is not None:
+            filtros.append(('estado = ?', estado))
+        if usuario_id is not None:
+            filtros.append(('usuario_id = ?', usuario_id))
+        if metodo_pago is not None:
+            filtros.append(('metodo_pago = ?', metodo_pago))
+        if desde is not None:
+            filtros.append(('fecha_creacion >= ?', desde))
+        if hasta is not None:
+            filtros.append(('fecha_creacion < ?', hasta))
+
+        with self.db.conexion() as conn:
+            return pagina_keyset(
+                conn, 'pagos', RegistroPago.SELECT, filtros,
+                cursor=cursor, limite=limite, fabrica=RegistroPago.fabrica
+            )
+
 
 class Factura:
-    def __init__(self, db):
+    def __init__(self, db, cache=None, eventos=None, redondeo='mitad_arriba'):
+        if redondeo not in POLITICAS_REDONDEO:
+            raise ValueError(f"Política de redondeo desconocida: {redondeo} "
+                             f"(usar {', '.join(POLITICAS_REDONDEO)})")
         self.db = db
+        self.cache = cache
+        self.eventos = eventos
+        self.redondeo = redondeo  # política para la base y el impuesto de cada línea
+        self.secuencia = Secuencia(db, 'FAC')
     
-    def generar_factura(self, pago_id, items, tasa_impuesto=0.12):
-        """Genera una factura para un pago aprobado"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        # Verificar que el pago existe y está aprobado
-        cursor.execute('SELECT * FROM pagos WHERE id = ? AND estado = ?', (pago_id, 'aprobado'))
-        pago = cursor.fetchone()
-        
-        if not pago:
-            conn.close()
-            return {'success': False, 'mensaje': 'Pago no encontrado o no aprobado'}
-        
-        # Calcular montos
-        subtotal = pago[3] / (1 + tasa_impuesto)
-        impuesto = pago[3] - subtotal
-        
-        # Generar número de factura
-        import random
-        numero_factura = f"FAC-{datetime.now().strftime('%Y%m%d')}-{random.randint(1000, 9999)}"
-        fecha_emision = datetime.now().isoformat()
-        
-        try:
-            cursor.execute('''
-                INSERT INTO facturas (numero_factura, pago_id, orden_id, usuario_id, monto_total, impuesto, subtotal, items, fecha_emision)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (numero_factura, pago_id, pago[1], pago[2], pago[3], impuesto, subtotal, json.dumps(items), fecha_emision))
+    @con_reintentos
+    def generar_factura(self, pago_id, items, tasa_impuesto=0.12, pago=None):
+        """Genera una factura para un pago aprobado
+
+        pago: dict del pago ya conocido en la misma transacción (evita el SELECT).
+        El impuesto se calcula por línea en centavos (ver dinero.calcular_factura);
+        cada item puede traer su propia tasa_impuesto.
+        """
+        error = validar_items(items) or validar_tasa(tasa_impuesto)
+        if error:
+            return {'success': False, 'mensaje': error}
+        with self.db.conexion(escritura=True) as conn:
+            cursor = conn.cursor()
             
-            factura_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            if pago is not None:
+                if pago.get('estado') != 'aprobado':
+                    return {'success': False, 'mensaje': 'Pago no encontrado o no aprobado'}
+                orden_id, usuario_id = pago['orden_id'], pago['usuario_id']
+                monto_centavos = a_centavos(pago['monto_total'])
+            else:
+                # Verificar que el pago existe y está aprobado
+                cursor.execute('SELECT orden_id, usuario_id, monto_total FROM pagos WHERE id = ? AND estado = ?',
+                               (pago_id, 'aprobado'))
+                fila = cursor.fetchone()
+                if not fila:
+                    return {'success': False, 'mensaje': 'Pago no encontrado o no aprobado'}
+                orden_id, usuario_id, monto_centavos = fila
             
-            return {
-                'success': True,
-                'id': factura_id,
-                'numero_factura': numero_factura,
-                'pago_id': pago_id,
-                'orden_id': pago[1],
-                'usuario_id': pago[2],
-                'subtotal': round(subtotal, 2),
-                'impuesto': round(impuesto, 2),
-                'monto_total': pago[3],
-                'items': items,
-                'fecha_emision': fecha_emision
-            }
-        except sqlite3.IntegrityError:
-            conn.close()
-            return {'success': False, 'mensaje': 'La factura ya existe para este pago'}
+            # Calcular montos (centavos)
+            subtotal, impuesto, lineas = calcular_factura(monto_centavos, items, tasa_impuesto, self.redondeo)
+            
+            # Número de factura: contador del día, único entre procesos
+            numero_factura = self.secuencia.siguiente()
+            fecha_emision = datetime.now().isoformat()
+            
+            try:
+                cursor.execute('''
+                    INSERT INTO facturas (numero_factura, pago_id, orden_id, usuario_id, monto_total, impuesto, subtotal, fecha_emision)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (numero_factura, pago_id, orden_id, usuario_id, monto_centavos, impuesto, subtotal, fecha_emision))
+            except sqlite3.IntegrityError:
+                return {'success': False, 'mensaje': 'La factura ya existe para este pago'}
+            factura_id = cursor.lastrowid
+            cursor.executemany('''
+                INSERT INTO factura_items (factura_id, posicion, nombre, cantidad, precio,
+                                           subtotal, tasa_impuesto, impuesto, fecha_emision)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(factura_id, posicion, item['nombre'], item['cantidad'], a_centavos(item['precio']),
+                   base, tasa, impuesto_linea, fecha_emision)
+                  for posicion, (item, (base, tasa, impuesto_linea)) in enumerate(zip(items, lineas))])
+            montos = {'monto_total': a_monto(monto_centavos), 'impuesto': a_monto(impuesto),
+                      'subtotal': a_monto(subtotal)}
+            if self.cache is not None:
+                self.db.al_confirmar(lambda: self.cache.invalidar(f'factura:{numero_factura}'))
+            if self.eventos is not None:
+                self.eventos.publicar('factura.generada', factura_id, {
+                    'id': factura_id, 'numero_factura': numero_factura, 'pago_id': pago_id,
+                    'orden_id': orden_id, 'usuario_id': usuario_id, **montos,
+                    'fecha_emision': fecha_emision
+                })
+        
+        return {
+            'success': True,
+            'id': factura_id,
+            'numero_factura': numero_factura,
+            'pago_id': pago_id,
+            'orden_id': orden_id,
+            'usuario_id': usuario_id,
+            **montos,
+            'items': items,
+            'fecha_emision': fecha_emision
+        }
     
     def obtener_factura(self, numero_factura):
-        """Obtiene una factura por su número"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM facturas WHERE numero_factura = ?', (numero_factura,))
-        factura = cursor.fetchone()
-        conn.close()
+        """Obtiene una factura por su número (lectura a través de la caché)"""
+        clave = f'factura:{numero_factura}'
+        marca = None
+        if self.cache is not None:
+            factura = self.cache.obtener(clave)
+            if factura is not AUSENTE:
+                return factura
+            marca = self.cache.marca()
+
+        with self.db.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = RegistroFactura.fabrica
+            factura = cursor.execute(
+                f'SELECT {RegistroFactura.SELECT} FROM facturas WHERE numero_factura = ?', (numero_factura,)
+            ).fetchone()
+            if factura:
+                cursor = conn.cursor()
+                cursor.row_factory = RegistroItemFactura.fabrica
+                items = cursor.execute(f'''
+                    SELECT {RegistroItemFactura.SELECT} FROM factura_items
+                    WHERE factura_id = ? ORDER BY posicion
+                ''', (factura.id,)).fetchall()
         
         if factura:
-            return {
-                'id': factura[0],
-                'numero_factura': factura[1],
-                'pago_id': factura[2],
-                'orden_id': factura[3],
-                'usuario_id': factura[4],
-                'monto_total': factura[5],
-                'impuesto': factura[6],
-                'subtotal': factura[7],
-                'items': json.loads(factura[8]),
-                'fecha_emision': factura[9]
-            }
+            factura = {**factura.a_dict(), 'items': [item.a_dict() for item in items]}
+            if self.cache is not None:
+                self.cache.guardar(clave, factura, marca)
+            return factura
         return None
+
+    def etag_factura(self, numero_factura):
+        """ETag sin leer la fila: el índice único de numero_factura cubre el id"""
+        if self.cache is not None:
+            factura = self.cache.obtener(f'factura:{numero_factura}')
+            if factura is not AUSENTE:
+                return etag_de_factura(factura)
+        with self.db.conexion() as conn:
+            fila = conn.execute('SELECT id FROM facturas WHERE numero_factura = ?', (numero_factura,)).fetchone()
+        return calcular_etag('factura', fila[0]) if fila else None
+
+    def etag_listado(self, consulta=''):
+        """Las facturas son inmutables: el listado solo cambia con MAX(id)"""
+        with self.db.conexion() as conn:
+            max_id = conn.execute('SELECT MAX(id) FROM facturas').fetchone()[0]
+        return calcular_etag('facturas', consulta, max_id)
+
+    def listar_facturas(self, limite=None, cursor=None, usuario_id=None, pago_id=None,
+                        desde=None, hasta=None):
+        """Página de facturas (más recientes primero), sin el detalle de items.
+
+        Devuelve (facturas, siguiente_cursor) con RegistroFactura.
+        desde/hasta filtran fecha_emision.
+        """
+        filtros = []
+        if usuario_id is not None:
+            filtros.append(('usuario_id = ?', usuario_id))
+        if pago_id is not None:
+            filtros.append(('pago_id = ?', pago_id))
+        if desde is not None:
+            filtros.append(('fecha_emision >= ?', desde))
+        if hasta is not None:
+            filtros.append(('fecha_emision < ?', hasta))
+
+        with self.db.conexion() as conn:
+            return pagina_keyset(
+                conn, 'facturas', RegistroFactura.SELECT, filtros,
+                cursor=cursor, limite=limite, fabrica=RegistroFactura.fabrica
+            )
@@ -0,0 +1,70 @@
+# database/paginacion.py
+"""Paginación keyset sobre id: el cursor es el último id entregado.
+
+A diferencia de OFFSET, cada página es una búsqueda 'id < cursor' sobre un
+índice, así que la página 1000 cuesta lo mismo que la primera.
+"""
+import base64
+import json
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+
+def codificar_cursor(ultimo_id):
+    crudo = json.dumps({'id': ultimo_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).rstrip(b'=').decode()
+
+
+def decodificar_cursor(token):
+    """Devuelve el id del cursor o lanza ValueError si el token no es válido"""
+    if not token:
+        return None
+    try:
+        relleno = '=' * (-len(token) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(token + relleno))
+        ultimo_id = int(datos['id'])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Cursor inválido") from None
+    return ultimo_id
+
+
+def normalizar_limite(limite):
+    if limite is None:
+        return LIMITE_POR_DEFECTO
+    limite = int(limite)
+    if limite < 1:
+        raise ValueError("El límite debe ser mayor que 0")
+    return min(limite, LIMITE_MAXIMO)
+
+
+def pagina_keyset(conn, tabla, columnas, filtros, cursor=None, limite=None, fabrica=None):
+    """Ejecuta una página 'más recientes primero' sobre tabla.
+
+    filtros: lista de (fragmento_sql, valor) ya validados, p. ej.
+    [('estado = ?', 'aprobado')]. fabrica: row_factory opcional (la primera
+    columna debe ser id). Devuelve (filas, siguiente_cursor).
+    """
+    limite = normalizar_limite(limite)
+    ultimo_id = decodificar_cursor(cursor)
+
+    condiciones = [sql for sql, _ in filtros]
+    parametros = [valor for _, valor in filtros]
+    if ultimo_id is not None:
+        condiciones.append('id < ?')
+        parametros.append(ultimo_id)
+
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    # Se pide una fila de más para saber si existe otra página
+    consulta = conn.cursor()
+    consulta.row_factory = fabrica
+    filas = consulta.execute(
+        f"SELECT {columnas} FROM {tabla} {where} ORDER BY id DESC LIMIT ?",
+        parametros + [limite + 1]
+    ).fetchall()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1][0])
+    return filas, siguiente
@@ -0,0 +1,62 @@
+# database/perfiles.py
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class PerfilAlmacenamiento:
+    """Ajustes PRAGMA que se aplican a cada conexión nueva"""
+    nombre: str
+    journal_mode: str = 'WAL'
+    synchronous: str = 'FULL'
+    cache_size: int = -16000        # negativo = KiB (16 MB)
+    mmap_size: int = 0
+    temp_store: str = 'DEFAULT'
+    busy_timeout_ms: int = 5000
+
+    def aplicar(self, conn):
+        # journal_mode devuelve una fila; hay que consumirla
+        conn.execute(f'PRAGMA journal_mode={self.journal_mode}').fetchone()
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA cache_size={int(self.cache_size)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}').fetchone()
+        conn.execute(f'PRAGMA temp_store={self.temp_store}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+
+
+PERFILES = {
+    # Comportamiento original de SQLite (rollback journal)
+    'compatible': PerfilAlmacenamiento(
+        nombre='compatible',
+        journal_mode='DELETE',
+        synchronous='FULL',
+        cache_size=-2000,
+    ),
+    # WAL con fsync en cada commit: lectores no bloquean al escritor
+    'seguro': PerfilAlmacenamiento(
+        nombre='seguro',
+        journal_mode='WAL',
+        synchronous='FULL',
+    ),
+    # WAL + NORMAL: sin corrupción ante caídas, puede perder los últimos commits
+    'rendimiento': PerfilAlmacenamiento(
+        nombre='rendimiento',
+        journal_mode='WAL',
+        synchronous='NORMAL',
+        cache_size=-64000,
+        mmap_size=256 * 1024 * 1024,
+        temp_store='MEMORY',
+    ),
+}
+
+
+def obtener_perfil(perfil):
+    """Acepta un nombre de PERFILES o una instancia de PerfilAlmacenamiento"""
+    if isinstance(perfil, PerfilAlmacenamiento):
+        return perfil
+    try:
+        return PERFILES[perfil]
+    except KeyError:
+        raise ValueError(
+            f"Perfil de almacenamiento desconocido: {perfil!r} "
+            f"(disponibles: {', '.join(PERFILES)})"
+        ) from None
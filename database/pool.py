@@ -0,0 +1,163 @@
+# database/pool.py
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolAgotadoError(Exception):
+    """No hay conexiones libres y se superó el tiempo de espera"""
+
+
+class PoolConexiones:
+    """Pool acotado de conexiones SQLite con reutilización por hilo.
+
+    Cada hilo conserva la conexión que tomó mientras la use (llamadas
+    anidadas reciben la misma conexión) y la devuelve al pool al salir
+    del bloque más externo.
+    """
+
+    def __init__(self, fabrica, max_conexiones=8, timeout_espera=5.0,
+                 intervalo_verificacion=30.0):
+        self._fabrica = fabrica
+        self.max_conexiones = max_conexiones
+        self.timeout_espera = timeout_espera
+        self.intervalo_verificacion = intervalo_verificacion
+
+        self._libres = deque()  # (conexion, instante_devolucion)
+        self._creadas = 0
+        self._cerrado = False
+        self._cond = threading.Condition(threading.Lock())
+        self._local = threading.local()
+
+        self._metricas = {
+            'checkouts': 0,
+            'reusos_hilo': 0,
+            'esperas': 0,
+            'agotamientos': 0,
+            'conexiones_creadas': 0,
+            'conexiones_descartadas': 0,
+            'conexiones_cerradas': 0,
+        }
+
+    # ---------- API pública ----------
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión al hilo actual (reentrante)"""
+        local = self._local
+        if getattr(local, 'profundidad', 0) > 0:
+            local.profundidad += 1
+            with self._cond:
+                self._metricas['reusos_hilo'] += 1
+            try:
+                yield local.conn
+            finally:
+                local.profundidad -= 1
+            return
+
+        conn = self._tomar()
+        local.conn = conn
+        local.profundidad = 1
+        try:
+            yield conn
+        finally:
+            local.profundidad = 0
+            local.conn = None
+            self._devolver(conn)
+
+    def en_uso_por_hilo(self):
+        """Indica si el hilo actual ya tiene una conexión prestada"""
+        return getattr(self._local, 'profundidad', 0) > 0
+
+    def metricas(self):
+        with self._cond:
+            datos = dict(self._metricas)
+            datos['libres'] = len(self._libres)
+            datos['en_uso'] = self._creadas - len(self._libres)
+            datos['max_conexiones'] = self.max_conexiones
+        return datos
+
+    def cerrar(self):
+        """Cierra las conexiones libres; las prestadas se cierran al devolverse"""
+        with self._cond:
+            self._cerrado = True
+            while self._libres:
+                conn, _ = self._libres.popleft()
+                self._creadas -= 1
+                self._metricas['conexiones_cerradas'] += 1
+                conn.close()
+            self._cond.notify_all()
+
+    # ---------- Internos ----------
+    def _tomar(self):
+        limite = time.monotonic() + self.timeout_espera
+        with self._cond:
+            self._metricas['checkouts'] += 1
+            espero = False
+            while True:
+                if self._cerrado:
+                    raise PoolAgotadoError("El pool de conexiones está cerrado")
+                if self._libres:
+                    conn, devuelta = self._libres.pop()
+                    break
+                if self._creadas < self.max_conexiones:
+                    self._creadas += 1
+                    conn, devuelta = None, None
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._metricas['agotamientos'] += 1
+                    raise PoolAgotadoError(
+                        f"Sin conexiones libres tras {self.timeout_espera}s "
+                        f"(máximo {self.max_conexiones})"
+                    )
+                if not espero:
+                    self._metricas['esperas'] += 1
+                    espero = True
+                self._cond.wait(restante)
+
+        if conn is None:
+            return self._crear()
+        if time.monotonic() - devuelta >= self.intervalo_verificacion and not self._sana(conn):
+            with self._cond:
+                self._metricas['conexiones_descartadas'] += 1
+                self._metricas['conexiones_cerradas'] += 1
+            return self._crear()
+        return conn
+
+    def _devolver(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            if self._cerrado:
+                self._creadas -= 1
+                self._metricas['conexiones_cerradas'] += 1
+                conn.close()
+            else:
+                self._libres.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _crear(self):
+        try:
+            conn = self._fabrica()
+        except Exception:
+            with self._cond:
+                self._creadas -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._metricas['conexiones_creadas'] += 1
+        return conn
+
+    @staticmethod
+    def _sana(conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            return False
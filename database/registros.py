@@ -0,0 +1,143 @@
+# database/registros.py
+"""Registros tipados de las filas de la base.
+
+Cada registro es un namedtuple (sin dict por fila) con su lista explícita de
+columnas: SELECT usa esa lista en lugar de 'SELECT *', fabrica() sirve de
+row_factory de sqlite3 y a_dict() da el dict de la API. Para los listados,
+lista_json() escribe el JSON directamente desde las tuplas con un formateador
+generado por registro, sin pasar por dicts ni por el proveedor JSON de
+Flask (mismo JSON: claves ordenadas y ASCII, como jsonify). La exportación
+NDJSON usa el mismo generador (compilar_json) con el orden de las columnas.
+
+Tipos de columna: 'int', 'real', 'text', 'json' (texto que ya es JSON, se
+decodifica en a_dict() y se copia tal cual en a_json()) y 'centavos' (la
+tupla guarda el INTEGER de la base; a_dict() y a_json() dan unidades); con
+'?' admite NULL.
+"""
+import json
+from collections import namedtuple
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+from database.dinero import CENTAVOS
+
+# Expresión que convierte la columna i al valor del dict (r es la tupla)
+_VALORES = {
+    'int': 'r[{i}]',
+    'real': 'r[{i}]',
+    'text': 'r[{i}]',
+    'json': '_json(r[{i}])',
+    'centavos': f'r[{{i}}] / {CENTAVOS}',
+}
+
+# Expresión que convierte la columna i a texto JSON
+_FORMATOS = {
+    'int': 'r[{i}]',
+    'real': 'repr(r[{i}])',
+    'text': '{texto}(r[{i}])',
+    'json': 'r[{i}]',
+    'centavos': f'repr(r[{{i}}] / {CENTAVOS})',
+}
+
+_GLOBALES = {'_texto': encode_basestring_ascii, '_texto_utf8': encode_basestring, '_json': json.loads}
+
+
+def definir_registro(nombre, columnas):
+    """columnas: ((nombre, tipo), ...) en el orden del SELECT"""
+    campos = tuple(campo for campo, _ in columnas)
+    tipos = dict(columnas)
+    base = namedtuple(nombre, campos)
+    clase = type(nombre, (base,), {
+        '__slots__': (),
+        'COLUMNAS': campos,
+        'SELECT': ', '.join(campos),
+        'a_dict': _compilar_dict(campos, tipos),
+        'a_json': compilar_json(campos, tipos),
+    })
+    clase.fabrica = staticmethod(lambda cursor, fila: tuple.__new__(clase, fila))
+    return clase
+
+
+def es_registro(valor):
+    return hasattr(type(valor), 'a_json')
+
+
+def lista_json(registros):
+    """JSON de una lista de registros (del mismo tipo)"""
+    if not registros:
+        return '[]'
+    return '[' + ','.join(map(type(registros[0]).a_json, registros)) + ']'
+
+
+# ---------- Compilación de los conversores ----------
+def _compilar_dict(campos, tipos):
+    partes = []
+    for i, campo in enumerate(campos):
+        tipo = tipos[campo]
+        valor = _VALORES[tipo.rstrip('?')].format(i=i)
+        if tipo.endswith('?') and valor != f'r[{i}]':
+            valor = f'None if r[{i}] is None else {valor}'
+        partes.append(f'{campo!r}: {valor}')
+    return eval('lambda r: {' + ', '.join(partes) + '}', _GLOBALES)
+
+
+def compilar_json(campos, tipos, ordenar=True, ascii=True, separadores=(',', ':')):
+    """Formateador tupla -> objeto JSON (texto). Por defecto como jsonify
+    (claves ordenadas, ASCII, compacto); con ordenar=False, ascii=False y
+    separadores=(', ', ': ') da lo mismo que json.dumps(dict(zip(campos, r)),
+    ensure_ascii=False)"""
+    coma, dos_puntos = separadores
+    texto = '_texto' if ascii else '_texto_utf8'
+    partes = []
+    for campo in (sorted(campos) if ordenar else campos):
+        i = campos.index(campo)
+        tipo = tipos[campo]
+        valor = _FORMATOS[tipo.rstrip('?')].format(i=i, texto=texto)
+        if tipo.endswith('?'):
+            valor = f'"null" if r[{i}] is None else {valor}'
+        partes.append(f'"{campo}"{dos_puntos}{{{valor}}}')
+    codigo = "lambda r: f'{{" + coma.join(partes) + "}}'"
+    return eval(codigo, _GLOBALES)
+
+
+# ---------- Registros ----------
+RegistroPago = definir_registro('RegistroPago', (
+    ('id', 'int'),
+    ('orden_id', 'text'),
+    ('usuario_id', 'int'),
+    ('monto_total', 'centavos'),
+    ('metodo_pago', 'text'),
+    ('estado', 'text'),
+    ('fecha_creacion', 'text'),
+    ('fecha_actualizacion', 'text'),
+))
+
+# Cabecera de la factura; los items van en RegistroItemFactura
+RegistroFactura = definir_registro('RegistroFactura', (
+    ('id', 'int'),
+    ('numero_factura', 'text'),
+    ('pago_id', 'int'),
+    ('orden_id', 'text'),
+    ('usuario_id', 'int'),
+    ('monto_total', 'centavos'),
+    ('impuesto', 'centavos'),
+    ('subtotal', 'centavos'),
+    ('fecha_emision', 'text'),
+))
+
+RegistroItemFactura = definir_registro('RegistroItemFactura', (
+    ('nombre', 'text'),
+    ('cantidad', 'real'),
+    ('precio', 'centavos'),
+    ('subtotal', 'centavos'),
+    ('tasa_impuesto', 'real'),
+    ('impuesto', 'centavos'),
+))
+
+RegistroTransaccion = definir_registro('RegistroTransaccion', (
+    ('id', 'int'),
+    ('pago_id', 'int'),
+    ('codigo_transaccion', 'text'),
+    ('estado', 'text'),
+    ('mensaje', 'text?'),
+    ('fecha', 'text'),
+))
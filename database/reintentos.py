@@ -0,0 +1,45 @@
+# database/reintentos.py
+import functools
+import random
+import sqlite3
+import time
+
+
+def es_error_bloqueo(exc):
+    """True si el error es 'database is locked' / 'busy' (transitorio)"""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    mensaje = str(exc).lower()
+    return 'locked' in mensaje or 'busy' in mensaje
+
+
+def ejecutar_con_reintentos(db, funcion, *args, **kwargs):
+    """Ejecuta funcion reintentándola si SQLite sigue ocupado tras busy_timeout.
+
+    Solo reintenta en el bloque más externo: si el hilo ya está dentro de
+    una transacción, el error se propaga para que la reintente quien la abrió.
+    Usa backoff exponencial con jitter a partir de los parámetros de db.
+    """
+    if db.pool.en_uso_por_hilo():
+        return funcion(*args, **kwargs)
+
+    intento = 0
+    while True:
+        try:
+            return funcion(*args, **kwargs)
+        except sqlite3.OperationalError as exc:
+            if not es_error_bloqueo(exc) or intento >= db.max_reintentos:
+                raise
+            espera = db.espera_reintento * (2 ** intento)
+            time.sleep(espera + random.uniform(0, espera))
+            intento += 1
+            db.registrar_reintento()
+
+
+def con_reintentos(metodo):
+    """Decorador de ejecutar_con_reintentos para métodos con atributo self.db"""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        return ejecutar_con_reintentos(self.db, metodo, self, *args, **kwargs)
+
+    return envoltura
@@ -0,0 +1,170 @@
+# database/resumenes.py
+"""Resúmenes diarios de ingresos (tablas resumen_pagos_diario y
+resumen_facturas_diario).
+
+Los mantienen triggers de SQLite (migración 9) dentro de la misma
+transacción que inserta el pago, cambia su estado o emite la factura, así
+los cubren todos los caminos de escritura: crear_pago, el lote,
+procesar_pago, el procesador por lotes y generar_factura. Los reportes
+leen solo estas tablas (un rango de su clave primaria); los meses se
+agregan desde los días.
+
+reconstruir() los recalcula desde pagos y facturas:
+    python cli.py reconstruir-resumenes
+
+Los reportes por producto agregan factura_items por rango de fecha_emision
+(idx_factura_items_fecha).
+
+Los importes son centavos enteros (migración 12): las sumas son exactas y
+se pasan a unidades solo al devolverlas.
+"""
+import re
+
+from database.dinero import a_monto
+
+AGRUPACIONES = {
+    'dia': 'dia',
+    'mes': 'substr(dia, 1, 7)',
+}
+
+ORDENES_PRODUCTOS = {
+    'importe': 'importe DESC',
+    'cantidad': 'cantidad DESC',
+}
+
+_FECHA = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def reconstruir_en(conn):
+    """Recalcula los resúmenes dentro de la transacción de conn"""
+    conn.execute('DELETE FROM resumen_pagos_diario')
+    conn.execute('''
+        INSERT INTO resumen_pagos_diario (dia, metodo_pago, estado, cantidad, monto_total)
+        SELECT substr(fecha_creacion, 1, 10), metodo_pago, estado, COUNT(*), SUM(monto_total)
+        FROM pagos
+        GROUP BY 1, 2, 3
+    ''')
+    conn.execute('DELETE FROM resumen_facturas_diario')
+    conn.execute('''
+        INSERT INTO resumen_facturas_diario (dia, metodo_pago, cantidad, monto_total, impuesto, subtotal)
+        SELECT substr(f.fecha_emision, 1, 10), COALESCE(p.metodo_pago, ''), COUNT(*),
+               SUM(f.monto_total), SUM(f.impuesto), SUM(f.subtotal)
+        FROM facturas f LEFT JOIN pagos p ON p.id = f.pago_id
+        GROUP BY 1, 2
+    ''')
+
+
+def reconstruir(db):
+    with db.conexion(escritura=True) as conn:
+        reconstruir_en(conn)
+
+
+def _filtro_fechas(desde, hasta, columna):
+    filtros, parametros = [], []
+    for nombre, valor, operador in (('desde', desde, '>='), ('hasta', hasta, '<')):
+        if valor is None:
+            continue
+        if not _FECHA.match(valor):
+            raise ValueError(f"'{nombre}' debe tener formato AAAA-MM-DD")
+        filtros.append(f'{columna} {operador} ?')
+        parametros.append(valor)
+    return filtros, parametros
+
+
+def productos_mas_vendidos(db, desde=None, hasta=None, orden='importe', limite=10):
+    """Productos facturados en el rango, por importe (base sin impuesto) o cantidad"""
+    if orden not in ORDENES_PRODUCTOS:
+        raise ValueError(f"orden debe ser uno de: {', '.join(ORDENES_PRODUCTOS)}")
+    if limite < 1:
+        raise ValueError("El límite debe ser mayor que 0")
+    filtros, parametros = _filtro_fechas(desde, hasta, 'fecha_emision')
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ''
+    with db.conexion() as conn:
+        filas = conn.execute(f'''
+            SELECT nombre, SUM(cantidad) AS cantidad, SUM(subtotal) AS importe,
+                   COUNT(DISTINCT factura_id)
+            FROM factura_items {where}
+            GROUP BY nombre ORDER BY {ORDENES_PRODUCTOS[orden]}, nombre LIMIT ?
+        ''', parametros + [min(limite, 500)]).fetchall()
+    return [{
+        'nombre': fila[0],
+        'cantidad': fila[1],
+        'importe': a_monto(fila[2]),
+        'facturas': fila[3]
+    } for fila in filas]
+
+
+def items_por_dia(db, desde=None, hasta=None, nombre=None):
+    """Unidades e importe facturados por día (opcionalmente de un producto)"""
+    filtros, parametros = _filtro_fechas(desde, hasta, 'fecha_emision')
+    if nombre is not None:
+        filtros.append('nombre = ?')
+        parametros.append(nombre)
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ''
+    with db.conexion() as conn:
+        filas = conn.execute(f'''
+            SELECT substr(fecha_emision, 1, 10), SUM(cantidad), SUM(subtotal), COUNT(*)
+            FROM factura_items {where}
+            GROUP BY 1 ORDER BY 1
+        ''', parametros).fetchall()
+    return [{
+        'dia': fila[0],
+        'cantidad': fila[1],
+        'importe': a_monto(fila[2]),
+        'lineas': fila[3]
+    } for fila in filas]
+
+
+def consultar_ingresos(db, desde=None, hasta=None, agrupacion='dia', metodo_pago=None, estado=None):
+    """Totales por periodo desde los resúmenes.
+
+    desde/hasta son días AAAA-MM-DD (hasta exclusivo). estado solo filtra
+    los pagos (las facturas no tienen estado). Devuelve
+    {'pagos': [...], 'facturas': [...]} ordenados por periodo.
+    """
+    if agrupacion not in AGRUPACIONES:
+        raise ValueError(f"agrupacion debe ser una de: {', '.join(AGRUPACIONES)}")
+
+    filtros, parametros = _filtro_fechas(desde, hasta, 'dia')
+    filtros.insert(0, 'cantidad > 0')
+    if metodo_pago is not None:
+        filtros.append('metodo_pago = ?')
+        parametros.append(metodo_pago)
+    periodo = AGRUPACIONES[agrupacion]
+
+    filtros_pagos, parametros_pagos = list(filtros), list(parametros)
+    if estado is not None:
+        filtros_pagos.append('estado = ?')
+        parametros_pagos.append(estado)
+
+    with db.conexion() as conn:
+        pagos = conn.execute(f'''
+            SELECT {periodo}, metodo_pago, estado, SUM(cantidad), SUM(monto_total)
+            FROM resumen_pagos_diario
+            WHERE {' AND '.join(filtros_pagos)}
+            GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ''', parametros_pagos).fetchall()
+        facturas = conn.execute(f'''
+            SELECT {periodo}, metodo_pago, SUM(cantidad), SUM(monto_total), SUM(impuesto), SUM(subtotal)
+            FROM resumen_facturas_diario
+            WHERE {' AND '.join(filtros)}
+            GROUP BY 1, 2 ORDER BY 1, 2
+        ''', parametros).fetchall()
+
+    return {
+        'pagos': [{
+            'periodo': fila[0],
+            'metodo_pago': fila[1],
+            'estado': fila[2],
+            'cantidad': fila[3],
+            'monto_total': a_monto(fila[4])
+        } for fila in pagos],
+        'facturas': [{
+            'periodo': fila[0],
+            'metodo_pago': fila[1],
+            'cantidad': fila[2],
+            'monto_total': a_monto(fila[3]),
+            'impuesto': a_monto(fila[4]),
+            'subtotal': a_monto(fila[5])
+        } for fila in facturas],
+    }
@@ -0,0 +1,2 @@
+from .procesador_lotes import ProcesadorLotes
+from .trabajos import ColaTrabajos, TrabajoFallido
\ No newline at end of file
@@ -0,0 +1,65 @@
+# servicios/ejecutor.py
+"""Ejecutor acotado para el trabajo bloqueante (SQLite) de la variante ASGI.
+
+Un ThreadPoolExecutor de 'hilos' hilos: las corrutinas que esperan turno no
+ocupan hilo, así un worker sostiene miles de solicitudes en vuelo con
+'hilos' consultas a la vez como mucho. Con más de 'max_espera' tareas
+esperando, ejecutar() lanza Saturado para responder 503 en lugar de
+acumular latencia sin límite.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Saturado(Exception):
+    """Hay max_espera tareas esperando hilo"""
+
+
+class EjecutorAcotado:
+    def __init__(self, hilos=8, max_espera=2000):
+        if hilos < 1 or max_espera < 0:
+            raise ValueError("hilos debe ser mayor que 0 y max_espera no negativo")
+        self.hilos = hilos
+        self.max_espera = max_espera
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='asgi-db')
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._completadas = 0
+        self._rechazadas = 0
+
+    async def ejecutar(self, funcion, *args, contexto=None):
+        """await funcion(*args) en un hilo del pool; con contexto
+        (contextvars.Context) corre dentro de él"""
+        with self._lock:
+            if self._pendientes >= self.hilos + self.max_espera:
+                self._rechazadas += 1
+                raise Saturado(f"{self._pendientes} tareas en curso o esperando")
+            self._pendientes += 1
+        if contexto is not None:
+            funcion = functools.partial(contexto.run, funcion)
+        futuro = self._pool.submit(funcion, *args)
+        # Se descuenta al terminar en el hilo, aunque quien espera se cancele
+        futuro.add_done_callback(self._terminada)
+        return await asyncio.wrap_future(futuro)
+
+    def _terminada(self, futuro):
+        with self._lock:
+            self._pendientes -= 1
+            self._completadas += 1
+
+    def metricas(self):
+        with self._lock:
+            pendientes = self._pendientes
+            return {
+                'hilos': self.hilos,
+                'max_espera': self.max_espera,
+                'en_curso': min(pendientes, self.hilos),
+                'en_espera': max(0, pendientes - self.hilos),
+                'completadas': self._completadas,
+                'rechazadas': self._rechazadas,
+            }
+
+    def cerrar(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
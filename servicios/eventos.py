@@ -0,0 +1,88 @@
+# servicios/eventos.py
+"""Bus de cambios de pagos y facturas para el stream SSE (/api/eventos).
+
+publicar() escribe el evento en la tabla eventos dentro de la transacción
+del llamador y, tras el commit, despierta a los suscriptores del proceso.
+Los suscriptores leen siempre de la tabla, así que pueden reanudar desde
+cualquier id (Last-Event-ID) y ven también los eventos de otros procesos
+en el siguiente sondeo. La tabla se compacta conservando los últimos
+'retencion' eventos.
+"""
+import json
+import threading
+from datetime import datetime
+
+
+class BusEventos:
+    def __init__(self, db, retencion=10000, compactar_cada=1000):
+        self.db = db
+        self.retencion = retencion
+        self.compactar_cada = compactar_cada
+        self._cond = threading.Condition()
+        self._version = 0
+        self._oyentes = []
+
+    # ---------- Publicación ----------
+    def publicar(self, tipo, entidad_id, datos):
+        self.publicar_varios(tipo, [(entidad_id, datos)])
+
+    def publicar_varios(self, tipo, eventos):
+        """eventos: lista de (entidad_id, datos); un solo executemany"""
+        if not eventos:
+            return
+        fecha = datetime.now().isoformat()
+        with self.db.conexion(escritura=True) as conn:
+            conn.executemany(
+                'INSERT INTO eventos (tipo, entidad_id, datos, fecha) VALUES (?, ?, ?, ?)',
+                [(tipo, entidad_id, json.dumps(datos), fecha) for entidad_id, datos in eventos]
+            )
+            ultimo_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            if ultimo_id // self.compactar_cada != (ultimo_id - len(eventos)) // self.compactar_cada:
+                conn.execute('DELETE FROM eventos WHERE id <= ?', (ultimo_id - self.retencion,))
+        self.db.al_confirmar(self._notificar)
+
+    def _notificar(self):
+        with self._cond:
+            self._version += 1
+            self._cond.notify_all()
+        for oyente in self._oyentes:
+            oyente()
+
+    # ---------- Suscripción ----------
+    def version(self):
+        """Tomar antes de leer_desde() y pasar a esperar() para no perder avisos"""
+        return self._version
+
+    def escuchar(self, oyente):
+        """oyente() se llama tras cada aviso, desde el hilo que confirmó
+        (la variante ASGI despierta así a su event loop)"""
+        self._oyentes.append(oyente)
+
+    def esperar(self, version, timeout):
+        """Bloquea hasta que haya eventos nuevos en el proceso o venza timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._version != version, timeout)
+
+    def ultimo_id(self):
+        with self.db.conexion() as conn:
+            return conn.execute('SELECT MAX(id) FROM eventos').fetchone()[0] or 0
+
+    def leer_desde(self, ultimo_id, limite=500):
+        """Eventos con id > ultimo_id: lista de (id, tipo, datos_json).
+
+        Devuelve None si ultimo_id ya se compactó (el cliente debe recargar).
+        """
+        with self.db.conexion() as conn:
+            filas = conn.execute(
+                'SELECT id, tipo, datos FROM eventos WHERE id > ? ORDER BY id LIMIT ?',
+                (ultimo_id, limite)
+            ).fetchall()
+            if filas and filas[0][0] > ultimo_id + 1 and ultimo_id > 0:
+                minimo = conn.execute('SELECT MIN(id) FROM eventos').fetchone()[0]
+                if minimo > ultimo_id + 1:
+                    return None
+        return filas
+
+
+def formatear_sse(evento_id, tipo, datos_json):
+    return f"id: {evento_id}\nevent: {tipo}\ndata: {datos_json}\n\n"
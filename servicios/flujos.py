@@ -0,0 +1,115 @@
+# servicios/flujos.py
+"""Flujo completo de compra (crear pago -> procesar -> facturar).
+
+Lo usan la ruta síncrona POST /api/pagos/completo y la cola de trabajos,
+por eso devuelve (cuerpo, codigo_http) en lugar de una respuesta Flask.
+
+Los tres pasos corren en una sola transacción (Database.transaccion): una
+conexión, un commit y ningún SELECT del pago recién insertado. Si un paso
+falla se revierte todo, así no quedan pagos aprobados sin factura.
+
+reanudar_flujo() es para los reintentos de la cola: si el worker murió
+después del commit, el pago de la orden ya existe y el reintento devuelve
+lo guardado (o termina los pasos que falten) en lugar de un 409.
+"""
+from database.dinero import a_centavos
+from database.reintentos import ejecutar_con_reintentos
+
+
+class _FlujoInterrumpido(Exception):
+    def __init__(self, cuerpo, codigo):
+        super().__init__(cuerpo.get('error'))
+        self.cuerpo = cuerpo
+        self.codigo = codigo
+
+
+def flujo_completo(pago_model, factura_model, data):
+    db = pago_model.db
+    try:
+        return ejecutar_con_reintentos(db, _flujo_en_transaccion, pago_model, factura_model, data)
+    except _FlujoInterrumpido as exc:
+        return exc.cuerpo, exc.codigo
+
+
+def _flujo_en_transaccion(pago_model, factura_model, data):
+    with pago_model.db.transaccion():
+        # 1) Crear pago
+        pago = pago_model.crear_pago(
+            orden_id=data['orden_id'],
+            usuario_id=data['usuario_id'],
+            monto_total=data['monto_total'],
+            metodo_pago=data['metodo_pago']
+        )
+        if pago is None:
+            raise _FlujoInterrumpido({"error": "Ya existe un pago para esta orden"}, 409)
+
+        # 2) Procesar pago
+        resultado = pago_model.procesar_pago(pago['id'], pago=pago)
+        if not resultado.get('success'):
+            raise _FlujoInterrumpido({"error": "Error al procesar pago"}, 500)
+
+        # 3) Generar factura
+        factura = factura_model.generar_factura(
+            pago['id'], data.get('items', []),
+            pago={**pago, 'estado': resultado['estado']}
+        )
+        if not factura.get('success'):
+            raise _FlujoInterrumpido({"error": "Error al generar factura", "detalle": factura}, 500)
+
+    return {
+        'pago': pago,
+        'transaccion': resultado,
+        'factura': factura
+    }, 201
+
+
+def reanudar_flujo(pago_model, factura_model, data):
+    """(cuerpo, codigo) como flujo_completo a partir del pago ya existente de
+    la orden; None si no existe o es de otra solicitud (otro usuario/monto)"""
+    try:
+        return ejecutar_con_reintentos(pago_model.db, _reanudar_en_transaccion,
+                                       pago_model, factura_model, data)
+    except _FlujoInterrumpido as exc:
+        return exc.cuerpo, exc.codigo
+
+
+def _reanudar_en_transaccion(pago_model, factura_model, data):
+    with pago_model.db.transaccion():
+        pago = pago_model.obtener_por_orden(data['orden_id'])
+        if pago is None or not _es_de_la_solicitud(pago, data):
+            return None
+
+        if pago['estado'] == 'pendiente':
+            resultado = pago_model.procesar_pago(pago['id'], pago=pago)
+            if not resultado.get('success'):
+                raise _FlujoInterrumpido({"error": "Error al procesar pago"}, 500)
+        else:
+            transacciones = pago_model.transacciones_de([pago['id']])[pago['id']]
+            if not transacciones:
+                raise _FlujoInterrumpido({"error": "El pago se está procesando"}, 500)
+            ultima = transacciones[-1]
+            resultado = {'success': True, 'pago_id': pago['id'],
+                         'codigo_transaccion': ultima.codigo_transaccion,
+                         'estado': ultima.estado, 'mensaje': ultima.mensaje}
+
+        facturas, _ = factura_model.listar_facturas(pago_id=pago['id'], limite=1)
+        if facturas:
+            factura = {'success': True, **factura_model.obtener_factura(facturas[0].numero_factura)}
+        else:
+            factura = factura_model.generar_factura(
+                pago['id'], data.get('items', []),
+                pago={**pago, 'estado': resultado['estado']}
+            )
+            if not factura.get('success'):
+                raise _FlujoInterrumpido({"error": "Error al generar factura", "detalle": factura}, 500)
+
+    return {
+        'pago': pago,
+        'transaccion': resultado,
+        'factura': factura
+    }, 201
+
+
+def _es_de_la_solicitud(pago, data):
+    return (pago['usuario_id'] == data['usuario_id'] and pago['metodo_pago'] == data['metodo_pago']
+            and a_centavos(pago['monto_total']) == a_centavos(data['monto_total']))
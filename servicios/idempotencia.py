@@ -0,0 +1,188 @@
+# servicios/idempotencia.py
+"""Idempotency-Key para los POST (tabla idempotencia).
+
+Por cada clave se guarda la huella de la solicitud (método, ruta y cuerpo)
+y la respuesta serializada. Un reintento con la misma clave recibe la
+respuesta guardada con una sola búsqueda por clave primaria; con otra
+huella es un conflicto. Las solicitudes simultáneas con la misma clave se
+colapsan: solo una ejecuta y las demás esperan su respuesta (en el mismo
+proceso con un Event, desde otros procesos sondeando la fila).
+
+La vista corre en la misma transacción de escritura que guarda su
+respuesta: o quedan las dos cosas o ninguna, y mientras corre nadie puede
+reclamar la clave (reclamarla también escribe). Las respuestas 5xx y las
+excepciones revierten la transacción y liberan la clave: el cliente puede
+reintentar. Las filas vencen a los 'ttl' segundos; una 'en_curso' cuyo
+proceso murió se puede reclamar pasado 'lease'.
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database.reintentos import con_reintentos, ejecutar_con_reintentos
+
+
+class ConflictoIdempotencia(Exception):
+    """La clave ya se usó con una solicitud distinta"""
+
+
+class SolicitudEnCurso(Exception):
+    """Otra solicitud con la misma clave sigue ejecutándose"""
+
+
+class _Revertida(Exception):
+    """Respuesta 5xx: se revierte la transacción y no se guarda"""
+
+    def __init__(self, respuesta):
+        super().__init__(respuesta[0])
+        self.respuesta = respuesta
+
+
+class _ReservaPerdida(Exception):
+    """Otra solicitud reclamó la clave (lease vencido) antes de que la vista empezara"""
+
+
+def calcular_huella(metodo, ruta, cuerpo):
+    h = hashlib.blake2b(digest_size=16)
+    for parte in (metodo.encode(), ruta.encode(), cuerpo):
+        h.update(parte)
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class AlmacenIdempotencia:
+    def __init__(self, db, ttl=86400, lease=300, espera=30.0, intervalo_sondeo=0.05,
+                 purgar_cada=1000):
+        self.db = db
+        self.ttl = ttl
+        # Mayor que la solicitud más larga (esperas de lock y reintentos incluidos);
+        # de todos modos solo se puede reclamar cuando la vista ya no tiene la transacción
+        self.lease = lease
+        self.espera = espera  # máximo que espera un duplicado antes de SolicitudEnCurso
+        self.intervalo_sondeo = intervalo_sondeo
+        self.purgar_cada = purgar_cada
+        self._en_vuelo = {}  # clave -> Event de las ejecuciones de este proceso
+        self._lock = threading.Lock()
+        self._reservas = 0
+
+    def ejecutar(self, clave, huella, funcion):
+        """Ejecuta funcion() una sola vez por clave.
+
+        funcion devuelve (codigo, cuerpo_bytes, mimetype, cabeceras). Devuelve
+        esa tupla más un bool 'repetida' (True si es la respuesta guardada).
+        """
+        limite = time.monotonic() + self.espera
+        while True:
+            fila = self._buscar(clave)
+            reserva = self._reservar(clave, huella) if fila is None else None
+            if reserva is not None:
+                try:
+                    return self._ejecutar_reservada(clave, reserva, funcion) + (False,)
+                except _ReservaPerdida:
+                    continue
+            if fila is None:
+                continue  # la reservó otro entre la búsqueda y el INSERT
+            huella_guardada, estado, codigo, cuerpo, tipo, cabeceras = fila
+            if huella_guardada != huella:
+                raise ConflictoIdempotencia(clave)
+            if estado == 'completa':
+                return codigo, cuerpo, tipo, json.loads(cabeceras), True
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise SolicitudEnCurso(clave)
+            with self._lock:
+                en_vuelo = self._en_vuelo.get(clave)
+            if en_vuelo is not None:
+                en_vuelo.wait(restante)
+            else:
+                time.sleep(min(self.intervalo_sondeo, restante))
+
+    # ---------- Internos ----------
+    def _ejecutar_reservada(self, clave, reserva, funcion):
+        en_vuelo = threading.Event()
+        with self._lock:
+            self._en_vuelo[clave] = en_vuelo
+        try:
+            try:
+                # Un bloqueo de SQLite revierte todo y se reintenta desde el principio
+                return ejecutar_con_reintentos(self.db, self._ejecutar_y_guardar, clave, reserva, funcion)
+            except _Revertida as exc:
+                self._liberar(clave, reserva)
+                return exc.respuesta
+            except _ReservaPerdida:
+                raise
+            except BaseException:
+                self._liberar(clave, reserva)
+                raise
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+            en_vuelo.set()
+
+    def _ejecutar_y_guardar(self, clave, reserva, funcion):
+        """La vista y su respuesta en una sola transacción de escritura"""
+        with self.db.transaccion() as conn:
+            # Confirma que la reserva sigue siendo nuestra y renueva el lease
+            if not conn.execute('''
+                UPDATE idempotencia SET expira_en = ?
+                WHERE clave = ? AND estado = 'en_curso' AND fecha_creacion = ?
+                RETURNING clave
+            ''', ((datetime.now() + timedelta(seconds=self.lease)).isoformat(), clave, reserva)).fetchone():
+                raise _ReservaPerdida(clave)
+            codigo, cuerpo, tipo, cabeceras = funcion()
+            if codigo >= 500:
+                raise _Revertida((codigo, cuerpo, tipo, cabeceras))
+            self._guardar(clave, codigo, cuerpo, tipo, cabeceras)
+        return codigo, cuerpo, tipo, cabeceras
+
+    def _buscar(self, clave):
+        """La fila vigente de la clave o None (una búsqueda por PK)"""
+        with self.db.conexion() as conn:
+            return conn.execute('''
+                SELECT huella, estado, codigo, cuerpo, tipo, cabeceras
+                FROM idempotencia WHERE clave = ? AND expira_en > ?
+            ''', (clave, _ahora())).fetchone()
+
+    @con_reintentos
+    def _reservar(self, clave, huella):
+        """Crea la fila 'en_curso' (o reclama una vencida). Devuelve su
+        fecha_creacion, que identifica la reserva, o None si no es nuestra"""
+        ahora = datetime.now()
+        with self.db.conexion(escritura=True) as conn:
+            fila = conn.execute('''
+                INSERT INTO idempotencia (clave, huella, estado, fecha_creacion, expira_en)
+                VALUES (?, ?, 'en_curso', ?, ?)
+                ON CONFLICT (clave) DO UPDATE SET
+                    huella = excluded.huella, estado = 'en_curso', codigo = NULL, cuerpo = NULL,
+                    tipo = NULL, cabeceras = NULL, fecha_creacion = excluded.fecha_creacion,
+                    expira_en = excluded.expira_en
+                WHERE idempotencia.expira_en <= excluded.fecha_creacion
+                RETURNING clave
+            ''', (clave, huella, ahora.isoformat(),
+                  (ahora + timedelta(seconds=self.lease)).isoformat())).fetchone()
+            self._reservas += 1
+            if self._reservas % self.purgar_cada == 0:
+                conn.execute('DELETE FROM idempotencia WHERE expira_en <= ?', (ahora.isoformat(),))
+        return ahora.isoformat() if fila is not None else None
+
+    @con_reintentos
+    def _guardar(self, clave, codigo, cuerpo, tipo, cabeceras):
+        expira_en = (datetime.now() + timedelta(seconds=self.ttl)).isoformat()
+        with self.db.conexion(escritura=True) as conn:
+            conn.execute('''
+                UPDATE idempotencia
+                SET estado = 'completa', codigo = ?, cuerpo = ?, tipo = ?, cabeceras = ?, expira_en = ?
+                WHERE clave = ?
+            ''', (codigo, cuerpo, tipo, json.dumps(cabeceras), expira_en, clave))
+
+    @con_reintentos
+    def _liberar(self, clave, reserva):
+        with self.db.conexion(escritura=True) as conn:
+            conn.execute("DELETE FROM idempotencia WHERE clave = ? AND estado = 'en_curso' "
+                         "AND fecha_creacion = ?", (clave, reserva))
+
+
+def _ahora():
+    return datetime.now().isoformat()
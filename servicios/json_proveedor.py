@@ -0,0 +1,72 @@
+# servicios/json_proveedor.py
+"""Proveedor JSON de la app: orjson si está instalado, si no el de Flask (json).
+
+PAGOS_JSON=auto (por defecto) | orjson | stdlib. Con orjson las respuestas
+son las mismas salvo que los caracteres no ASCII salen en UTF-8 en lugar
+de escapados; fechas, Decimal y demás tipos pasan por el mismo default de
+Flask.
+
+Los listados usan registros_json(): bytes ya codificados desde las filas,
+sin jsonify. Con json, el formateador generado por registro (lista_json);
+con orjson, orjson sobre los dicts compilados, que es más rápido (ver
+benchmarks/bench_json.py).
+"""
+from flask.json.provider import DefaultJSONProvider
+
+from database.registros import lista_json
+
+try:
+    import orjson
+except ImportError:  # opcional: pip install orjson
+    orjson = None
+
+MOTORES = ('auto', 'orjson', 'stdlib')
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """El proveedor de Flask (json) más registros_json para los listados"""
+
+    def registros_json(self, registros):
+        """JSON (bytes) de una lista de registros del mismo tipo"""
+        return lista_json(registros).encode()
+
+
+class ProveedorOrjson(ProveedorJSON):
+    """orjson para dumps, loads, response y registros_json"""
+
+    def _opciones(self, indentar=False):
+        # Las fechas van al default de Flask (http_date), como con json
+        opciones = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return opciones | orjson.OPT_INDENT_2 if indentar else opciones
+
+    def _codificar(self, obj, indentar=False):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._opciones(indentar))
+        except orjson.JSONEncodeError:
+            # Enteros de más de 64 bits y otros casos que orjson no admite
+            formato = {'indent': 2} if indentar else {'separators': (',', ':')}
+            return super().dumps(obj, **formato).encode()
+
+    def dumps(self, obj, **kwargs):
+        return self._codificar(obj, indentar=bool(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def registros_json(self, registros):
+        return orjson.dumps([r.a_dict() for r in registros], option=orjson.OPT_SORT_KEYS)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._codificar(obj, indentar) + b'\n', mimetype=self.mimetype)
+
+
+def crear_proveedor(app, motor='auto'):
+    if motor not in MOTORES:
+        raise ValueError(f"Motor JSON desconocido: {motor} (usar {', '.join(MOTORES)})")
+    if motor == 'orjson' and orjson is None:
+        raise RuntimeError("PAGOS_JSON=orjson pero orjson no está instalado (pip install orjson)")
+    if motor != 'stdlib' and orjson is not None:
+        return ProveedorOrjson(app)
+    return ProveedorJSON(app)
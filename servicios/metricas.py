@@ -0,0 +1,221 @@
+# servicios/metricas.py
+"""Métricas del proceso en formato de texto de Prometheus (/api/metrics).
+
+- pagos_http_solicitudes_total{endpoint, metodo, codigo}
+- pagos_http_duracion_segundos{endpoint, metodo}: histograma por ruta
+  (la regla de Flask, no la URL, para acotar las series)
+- pagos_http_db_segundos{endpoint}: tiempo de SQL dentro de cada solicitud
+- pagos_db_sentencia_duracion_segundos{sentencia}: histograma por sentencia,
+  etiquetada como verbo + tabla ('SELECT pagos', 'INSERT facturas', 'COMMIT')
+- lo que aporten los colectores (pool de conexiones, caché)
+
+Cada observación es un bisect y una suma bajo un lock, pensado para dejarlo
+activo en producción (ver benchmarks/bench_metricas.py). En las respuestas
+en streaming (SSE, exportación) la duración llega hasta la primera línea.
+"""
+import re
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+from flask import g, request
+
+# Límites de los buckets (segundos)
+LIMITES_HTTP = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LIMITES_SQL = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5)
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+_VERBO = re.compile(r'^\s*(\w+)', re.IGNORECASE)
+_TABLA = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+(\w+)', re.IGNORECASE)
+_VERBOS_CON_TABLA = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH'}
+MAX_ETIQUETAS_SQL = 1000
+
+
+class Contador:
+    def __init__(self, nombre, ayuda, etiquetas):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *valores, cantidad=1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + cantidad
+
+    def exponer(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} counter']
+        for valores, total in series:
+            lineas.append(f'{self.nombre}{_etiquetas(self.etiquetas, valores)} {total}')
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre, ayuda, etiquetas, limites):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.limites = limites
+        self._series = {}  # valores -> [conteo por bucket..., +Inf, suma]
+        self._lock = threading.Lock()
+
+    def observar(self, segundos, *valores):
+        bucket = bisect_left(self.limites, segundos)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [0] * (len(self.limites) + 1) + [0.0]
+            serie[bucket] += 1
+            serie[-1] += segundos
+
+    def exponer(self):
+        with self._lock:
+            series = sorted((valores, list(serie)) for valores, serie in self._series.items())
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        for valores, serie in series:
+            acumulado = 0
+            for limite, conteo in zip(self.limites + ('+Inf',), serie):
+                acumulado += conteo
+                etiquetas = _etiquetas(self.etiquetas + ('le',), valores + (str(limite),))
+                lineas.append(f'{self.nombre}_bucket{etiquetas} {acumulado}')
+            etiquetas = _etiquetas(self.etiquetas, valores)
+            lineas.append(f'{self.nombre}_sum{etiquetas} {serie[-1]!r}')
+            lineas.append(f'{self.nombre}_count{etiquetas} {acumulado}')
+        return lineas
+
+
+class Metricas:
+    def __init__(self):
+        self.solicitudes = Contador(
+            'pagos_http_solicitudes_total', 'Solicitudes HTTP atendidas', ('endpoint', 'metodo', 'codigo'))
+        self.duracion_http = Histograma(
+            'pagos_http_duracion_segundos', 'Latencia de las solicitudes HTTP',
+            ('endpoint', 'metodo'), LIMITES_HTTP)
+        self.db_por_solicitud = Histograma(
+            'pagos_http_db_segundos', 'Tiempo de SQL por solicitud HTTP', ('endpoint',), LIMITES_HTTP)
+        self.duracion_sql = Histograma(
+            'pagos_db_sentencia_duracion_segundos', 'Latencia de cada sentencia SQL',
+            ('sentencia',), LIMITES_SQL)
+        self._etiquetas_sql = {}
+        self._colectores = []
+        self._local = threading.local()
+
+    # ---------- SQL (lo llaman las conexiones de database/medicion.py) ----------
+    def observar_sql(self, sql, segundos):
+        etiqueta = self._etiquetas_sql.get(sql)
+        if etiqueta is None:
+            etiqueta = etiqueta_sql(sql)
+            if len(self._etiquetas_sql) < MAX_ETIQUETAS_SQL:
+                self._etiquetas_sql[sql] = etiqueta
+        self.duracion_sql.observar(segundos, etiqueta)
+        self._local.segundos_db = getattr(self._local, 'segundos_db', 0.0) + segundos
+
+    # ---------- HTTP ----------
+    def iniciar_solicitud(self):
+        self._local.segundos_db = 0.0
+        return perf_counter()
+
+    def terminar_solicitud(self, inicio, endpoint, metodo, codigo):
+        self.duracion_http.observar(perf_counter() - inicio, endpoint, metodo)
+        self.db_por_solicitud.observar(getattr(self._local, 'segundos_db', 0.0), endpoint)
+        self.solicitudes.incrementar(endpoint, metodo, str(codigo))
+
+    # ---------- Exposición ----------
+    def registrar_colector(self, colector):
+        """colector() -> [(nombre, tipo 'counter'|'gauge', ayuda, valor)]"""
+        self._colectores.append(colector)
+
+    def exponer(self):
+        lineas = []
+        for metrica in (self.solicitudes, self.duracion_http, self.db_por_solicitud, self.duracion_sql):
+            lineas.extend(metrica.exponer())
+        for colector in self._colectores:
+            for nombre, tipo, ayuda, valor in colector():
+                lineas.extend((f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}', f'{nombre} {valor}'))
+        return '\n'.join(lineas) + '\n'
+
+
+def etiqueta_sql(sql):
+    """'SELECT id FROM pagos WHERE ...' -> 'SELECT pagos'; DDL y control solo el verbo"""
+    verbo = _VERBO.match(sql)
+    verbo = verbo.group(1).upper() if verbo else '?'
+    tabla = _TABLA.search(sql) if verbo in _VERBOS_CON_TABLA else None
+    return f'{verbo} {tabla.group(1)}' if tabla else verbo
+
+
+def instrumentar_blueprint(bp, obtener_metricas):
+    """Mide las solicitudes de las rutas del blueprint.
+
+    obtener_metricas() devuelve las Metricas del proceso, o None si están
+    desactivadas (se consulta en cada solicitud: se crean tras el fork)."""
+    @bp.before_request
+    def _iniciar():
+        metricas = obtener_metricas()
+        if metricas is not None:
+            g.metricas = metricas
+            g.metricas_inicio = metricas.iniciar_solicitud()
+
+    @bp.after_request
+    def _registrar(resp):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is not None:
+            g.metricas.terminar_solicitud(inicio, _endpoint(), request.method, resp.status_code)
+        return resp
+
+    @bp.teardown_request
+    def _registrar_error(exc):
+        # Si after_request no llegó a registrarla (falló antes de la respuesta)
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is not None:
+            g.metricas.terminar_solicitud(inicio, _endpoint(), request.method, 500)
+
+
+def colector_pool(db):
+    """Conexiones abiertas/cerradas, esperas y reintentos del pool de db"""
+    contadores = ('checkouts', 'reusos_hilo', 'esperas', 'agotamientos', 'conexiones_creadas',
+                  'conexiones_descartadas', 'conexiones_cerradas', 'reintentos_escritura')
+    medidores = ('libres', 'en_uso', 'max_conexiones')
+
+    def colectar():
+        datos = db.metricas_pool()
+        return ([(f'pagos_pool_{nombre}_total', 'counter', f'Pool: {nombre}', datos[nombre])
+                 for nombre in contadores] +
+                [(f'pagos_pool_{nombre}', 'gauge', f'Pool: {nombre}', datos[nombre])
+                 for nombre in medidores])
+    return colectar
+
+
+def colector_ejecutor(ejecutor):
+    """Hilos, tareas en curso/esperando y rechazos (503) del ejecutor ASGI"""
+    def colectar():
+        datos = ejecutor.metricas()
+        return ([(f'pagos_asgi_{nombre}_total', 'counter', f'Ejecutor ASGI: {nombre}', datos[nombre])
+                 for nombre in ('completadas', 'rechazadas')] +
+                [(f'pagos_asgi_{nombre}', 'gauge', f'Ejecutor ASGI: {nombre}', datos[nombre])
+                 for nombre in ('hilos', 'en_curso', 'en_espera')])
+    return colectar
+
+
+def colector_cache(cache):
+    def colectar():
+        datos = cache.metricas()
+        return [(f'pagos_cache_{nombre}_total', 'counter', f'Caché: {nombre}', datos[nombre])
+                for nombre in ('aciertos', 'fallos', 'expulsiones', 'invalidaciones')
+                if nombre in datos]
+    return colectar
+
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule is not None else 'sin_ruta'
+
+
+def _etiquetas(nombres, valores):
+    pares = ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores))
+    return '{' + pares + '}' if pares else ''
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,165 @@
+# servicios/procesador_lotes.py
+"""Procesamiento por lotes de pagos pendientes.
+
+Cada vuelta reclama un bloque de pagos 'pendiente' (pasan a 'procesando'
+en un único UPDATE ... RETURNING, así dos procesadores nunca toman el
+mismo pago), los autoriza en un pool de hilos o procesos y escribe los
+estados y las transacciones del bloque en un solo commit. Si un bloque
+falla vuelve a 'pendiente'; si el proceso murió a mitad, sus 'procesando'
+vuelven a 'pendiente' al pasar 'lease' segundos (al inicio de la siguiente
+llamada a procesar_pendientes).
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+from database.models import autorizar_pago
+from database.reintentos import con_reintentos
+from database.secuencias import Secuencia
+
+MODOS = {
+    'hilos': ThreadPoolExecutor,
+    'procesos': ProcessPoolExecutor,
+}
+
+
+class ProcesadorLotes:
+    def __init__(self, db, workers=4, modo='hilos', tamano_lote=200, latencia_pasarela=0.0,
+                 pago_model=None, lease=300):
+        if modo not in MODOS:
+            raise ValueError(f"Modo desconocido: {modo} (usar {', '.join(MODOS)})")
+        if workers < 1:
+            raise ValueError("workers debe ser mayor que 0")
+        if tamano_lote < 1:
+            raise ValueError("tamano_lote debe ser mayor que 0")
+        self.db = db
+        self.workers = workers
+        self.modo = modo
+        self.tamano_lote = tamano_lote
+        self.latencia_pasarela = latencia_pasarela
+        self.pago_model = pago_model  # si se indica, invalida su caché y publica eventos
+        self.lease = lease  # segundos tras los que un 'procesando' se da por abandonado
+        self.secuencia = pago_model.secuencia if pago_model is not None else Secuencia(db, 'TXN')
+
+    def procesar_pendientes(self, limite=None):
+        """Procesa pagos pendientes hasta agotarlos (o hasta 'limite').
+
+        Devuelve un resumen: procesados, por estado, lotes y segundos.
+        """
+        inicio = time.perf_counter()
+        resumen = {'procesados': 0, 'aprobados': 0, 'rechazados': 0, 'lotes': 0}
+        autorizar = partial(_autorizar, latencia_pasarela=self.latencia_pasarela)
+        self._recuperar_abandonados()
+
+        with MODOS[self.modo](max_workers=self.workers) as executor:
+            while limite is None or resumen['procesados'] < limite:
+                tamano = self.tamano_lote
+                if limite is not None:
+                    tamano = min(tamano, limite - resumen['procesados'])
+                reclamados = self._reclamar(tamano)
+                if not reclamados:
+                    break
+
+                try:
+                    chunksize = max(1, len(reclamados) // (self.workers * 4))
+                    resultados = list(executor.map(autorizar, reclamados, chunksize=chunksize))
+                    resultados = self._confirmar(resultados)
+                except BaseException:
+                    self._liberar([fila[0] for fila in reclamados])
+                    raise
+
+                resumen['lotes'] += 1
+                resumen['procesados'] += len(resultados)
+                for _, estado, _ in resultados:
+                    clave = estado + 's'
+                    resumen[clave] = resumen.get(clave, 0) + 1
+
+        resumen['segundos'] = round(time.perf_counter() - inicio, 3)
+        resumen['workers'] = self.workers
+        resumen['modo'] = self.modo
+        return resumen
+
+    # ---------- Internos ----------
+    @con_reintentos
+    def _reclamar(self, tamano):
+        with self.db.conexion(escritura=True) as conn:
+            ahora = datetime.now().isoformat()  # con el lock tomado, como en todos los escritores
+            reclamados = conn.execute('''
+                UPDATE pagos SET estado = 'procesando', fecha_actualizacion = ?
+                WHERE id IN (
+                    SELECT id FROM pagos WHERE estado = 'pendiente' ORDER BY id LIMIT ?
+                )
+                RETURNING id, monto_total, metodo_pago
+            ''', (ahora, tamano)).fetchall()
+            if self.pago_model is not None:
+                self.pago_model.invalidar(*[fila[0] for fila in reclamados])
+        return reclamados
+
+    @con_reintentos
+    def _confirmar(self, resultados):
+        """Escribe estados, transacciones y eventos del bloque; devuelve los
+        resultados que se confirmaron"""
+        with self.db.conexion(escritura=True) as conn:
+            ahora = datetime.now().isoformat()
+            # Solo los que siguen 'procesando': si el lease venció y otro
+            # procesador los reclamó (o ya los confirmó), el resultado de este se descarta
+            vigentes = set()
+            for pago_id, estado, _ in resultados:
+                if conn.execute(
+                    "UPDATE pagos SET estado = ?, fecha_actualizacion = ? "
+                    "WHERE id = ? AND estado = 'procesando' RETURNING id",
+                    (estado, ahora, pago_id)
+                ).fetchone():
+                    vigentes.add(pago_id)
+            resultados = [fila for fila in resultados if fila[0] in vigentes]
+            codigos = self.secuencia.siguientes(len(resultados)) if resultados else []
+            filas = [(pago_id, estado, codigo, mensaje)
+                     for (pago_id, estado, mensaje), codigo in zip(resultados, codigos)]
+            conn.executemany('''
+                INSERT INTO transacciones (pago_id, codigo_transaccion, estado, mensaje, fecha)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(pago_id, codigo, estado, mensaje, ahora)
+                  for pago_id, estado, codigo, mensaje in filas])
+            if self.pago_model is not None and filas:
+                self.pago_model.invalidar(*[pago_id for pago_id, _, _, _ in filas])
+                self.pago_model.publicar('pago.actualizado', [
+                    (pago_id, {'id': pago_id, 'estado': estado, 'fecha_actualizacion': ahora,
+                               'codigo_transaccion': codigo})
+                    for pago_id, estado, codigo, _ in filas
+                ])
+        return resultados
+
+    @con_reintentos
+    def _liberar(self, ids):
+        """Devuelve a 'pendiente' un bloque reclamado que no se pudo completar"""
+        with self.db.conexion(escritura=True) as conn:
+            ahora = datetime.now().isoformat()
+            conn.executemany(
+                "UPDATE pagos SET estado = 'pendiente', fecha_actualizacion = ? "
+                "WHERE id = ? AND estado = 'procesando'",
+                [(ahora, pago_id) for pago_id in ids]
+            )
+            if self.pago_model is not None:
+                self.pago_model.invalidar(*ids)
+
+    @con_reintentos
+    def _recuperar_abandonados(self):
+        """Devuelve a 'pendiente' los 'procesando' cuyo procesador murió (lease vencido)"""
+        with self.db.conexion(escritura=True) as conn:
+            ahora = datetime.now()
+            limite = (ahora - timedelta(seconds=self.lease)).isoformat()
+            recuperados = conn.execute('''
+                UPDATE pagos SET estado = 'pendiente', fecha_actualizacion = ?
+                WHERE estado = 'procesando' AND fecha_actualizacion < ?
+                RETURNING id
+            ''', (ahora.isoformat(), limite)).fetchall()
+            if self.pago_model is not None and recuperados:
+                self.pago_model.invalidar(*[fila[0] for fila in recuperados])
+        return len(recuperados)
+
+
+def _autorizar(fila, latencia_pasarela=0.0):
+    pago_id, monto_centavos, metodo_pago = fila
+    estado, mensaje = autorizar_pago(pago_id, monto_centavos, metodo_pago, latencia_pasarela)
+    return pago_id, estado, mensaje
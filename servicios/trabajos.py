@@ -0,0 +1,197 @@
+# servicios/trabajos.py
+"""Cola de trabajos persistente en SQLite (tabla trabajos).
+
+encolar() inserta el trabajo y despierta a los workers del proceso; los
+workers reclaman trabajos con un UPDATE ... RETURNING atómico, así varios
+procesos pueden compartir la misma cola. Los errores se reintentan con
+backoff hasta max_intentos; TrabajoFallido marca un fallo definitivo.
+Los 'en_curso' de un worker que murió vuelven a la cola al vencer su lease:
+lo comprueba cada proceso al iniciar y cada lease/2 mientras corre.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database.reintentos import con_reintentos
+
+log = logging.getLogger(__name__)
+
+
+class TrabajoFallido(Exception):
+    """Error de negocio: el trabajo falla sin reintentos"""
+
+    def __init__(self, mensaje, resultado=None):
+        super().__init__(mensaje)
+        self.resultado = resultado
+
+
+class ColaTrabajos:
+    def __init__(self, db, concurrencia=2, max_intentos=3, espera_reintento=1.0,
+                 intervalo_sondeo=1.0, lease=300):
+        self.db = db
+        self.concurrencia = concurrencia
+        self.max_intentos = max_intentos
+        self.espera_reintento = espera_reintento
+        self.intervalo_sondeo = intervalo_sondeo
+        self.lease = lease  # segundos tras los que un 'en_curso' se da por abandonado
+
+        self._manejadores = {}
+        self._hilos = []
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._lock_recuperacion = threading.Lock()  # aparte: detener() retiene _lock mientras espera a los hilos
+        self._proxima_recuperacion = 0.0  # time.monotonic() del próximo barrido de abandonados
+
+    def registrar(self, tipo, funcion):
+        """funcion(payload) -> resultado serializable a JSON"""
+        self._manejadores[tipo] = funcion
+
+    # ---------- API pública ----------
+    @con_reintentos
+    def encolar(self, tipo, payload, max_intentos=None):
+        if tipo not in self._manejadores:
+            raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+        ahora = _ahora()
+        with self.db.conexion(escritura=True) as conn:
+            cursor = conn.execute('''
+                INSERT INTO trabajos (tipo, estado, payload, intentos, max_intentos,
+                                      disponible_en, fecha_creacion, fecha_actualizacion)
+                VALUES (?, 'pendiente', ?, 0, ?, ?, ?, ?)
+            ''', (tipo, json.dumps(payload), max_intentos or self.max_intentos, ahora, ahora, ahora))
+            trabajo_id = cursor.lastrowid
+        self._hay_trabajo.set()
+        return trabajo_id
+
+    def obtener(self, trabajo_id):
+        with self.db.conexion() as conn:
+            fila = conn.execute('''
+                SELECT id, tipo, estado, resultado, error, intentos, max_intentos,
+                       fecha_creacion, fecha_actualizacion
+                FROM trabajos WHERE id = ?
+            ''', (trabajo_id,)).fetchone()
+        if not fila:
+            return None
+        return {
+            'id': fila[0],
+            'tipo': fila[1],
+            'estado': fila[2],
+            'resultado': json.loads(fila[3]) if fila[3] else None,
+            'error': fila[4],
+            'intentos': fila[5],
+            'max_intentos': fila[6],
+            'fecha_creacion': fila[7],
+            'fecha_actualizacion': fila[8]
+        }
+
+    def iniciar(self):
+        """Arranca los workers (idempotente); concurrencia=0 no arranca ninguno"""
+        with self._lock:
+            if self._hilos:
+                return
+            self._detener.clear()
+            self._recuperar_abandonados()
+            self._proxima_recuperacion = time.monotonic() + self.lease / 2
+            for n in range(self.concurrencia):
+                hilo = threading.Thread(target=self._bucle, name=f'trabajos-{n}', daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def detener(self, timeout=5.0):
+        with self._lock:
+            self._detener.set()
+            self._hay_trabajo.set()
+            for hilo in self._hilos:
+                hilo.join(timeout)
+            self._hilos = []
+
+    def procesar_uno(self):
+        """Reclama y ejecuta un trabajo; devuelve False si no había ninguno"""
+        trabajo = self._reclamar()
+        if trabajo is None:
+            return False
+        trabajo_id, tipo, payload, intentos, max_intentos = trabajo
+        try:
+            resultado = self._manejadores[tipo](json.loads(payload))
+        except TrabajoFallido as exc:
+            self._finalizar(trabajo_id, 'fallido', resultado=exc.resultado, error=str(exc))
+        except Exception as exc:
+            log.exception("Trabajo %s (%s) falló en el intento %s", trabajo_id, tipo, intentos)
+            if intentos < max_intentos:
+                espera = self.espera_reintento * (2 ** (intentos - 1))
+                self._reprogramar(trabajo_id, espera, repr(exc))
+            else:
+                self._finalizar(trabajo_id, 'fallido', error=repr(exc))
+        else:
+            self._finalizar(trabajo_id, 'completado', resultado=resultado)
+        return True
+
+    # ---------- Internos ----------
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                self._recuperar_si_toca()
+                if self.procesar_uno():
+                    continue
+            except Exception:
+                log.exception("Error en el worker de trabajos")
+            self._hay_trabajo.wait(self.intervalo_sondeo)
+            self._hay_trabajo.clear()
+
+    @con_reintentos
+    def _reclamar(self):
+        ahora = _ahora()
+        with self.db.conexion(escritura=True) as conn:
+            return conn.execute('''
+                UPDATE trabajos
+                SET estado = 'en_curso', intentos = intentos + 1, fecha_actualizacion = ?
+                WHERE id = (
+                    SELECT id FROM trabajos
+                    WHERE estado = 'pendiente' AND disponible_en <= ?
+                    ORDER BY disponible_en, id LIMIT 1
+                )
+                RETURNING id, tipo, payload, intentos, max_intentos
+            ''', (ahora, ahora)).fetchone()
+
+    @con_reintentos
+    def _finalizar(self, trabajo_id, estado, resultado=None, error=None):
+        with self.db.conexion(escritura=True) as conn:
+            conn.execute('''
+                UPDATE trabajos SET estado = ?, resultado = ?, error = ?, fecha_actualizacion = ?
+                WHERE id = ?
+            ''', (estado, json.dumps(resultado) if resultado is not None else None,
+                  error, _ahora(), trabajo_id))
+
+    @con_reintentos
+    def _reprogramar(self, trabajo_id, espera, error):
+        disponible = (datetime.now() + timedelta(seconds=espera)).isoformat()
+        with self.db.conexion(escritura=True) as conn:
+            conn.execute('''
+                UPDATE trabajos SET estado = 'pendiente', error = ?, disponible_en = ?, fecha_actualizacion = ?
+                WHERE id = ?
+            ''', (error, disponible, _ahora(), trabajo_id))
+
+    def _recuperar_si_toca(self):
+        """Barrido periódico: un worker reemplazado arranca antes de que venza
+        el lease de los trabajos que dejó su antecesor"""
+        with self._lock_recuperacion:
+            if time.monotonic() < self._proxima_recuperacion:
+                return
+            self._proxima_recuperacion = time.monotonic() + self.lease / 2
+        self._recuperar_abandonados()
+
+    @con_reintentos
+    def _recuperar_abandonados(self):
+        """Devuelve a la cola los 'en_curso' cuyo worker murió (lease vencido)"""
+        limite = (datetime.now() - timedelta(seconds=self.lease)).isoformat()
+        with self.db.conexion(escritura=True) as conn:
+            conn.execute('''
+                UPDATE trabajos SET estado = 'pendiente', disponible_en = ?
+                WHERE estado = 'en_curso' AND fecha_actualizacion < ?
+            ''', (_ahora(), limite))
+
+
+def _ahora():
+    return datetime.now().isoformat()
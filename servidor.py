@@ -0,0 +1,208 @@
+# servidor.py
+"""Servidor de producción: pre-fork con varios procesos y un pool de hilos en cada uno.
+
+    python servidor.py [--puerto 8000] [--workers N] [--hilos 4] [--sse 16] [--log-accesos]
+
+El maestro aplica las migraciones una vez, abre el socket y hace fork de
+los workers; cada worker crea sus propios servicios (pool de conexiones,
+caché, cola de trabajos) después del fork y atiende hasta --hilos
+solicitudes a la vez. Mientras todos sus hilos están ocupados no acepta
+más conexiones: quedan en el backlog del socket para otro worker. Si un
+worker muere, el maestro lo reemplaza; SIGTERM o Ctrl+C los detiene a todos.
+
+Ajuste: --workers por núcleo (las escrituras de SQLite se serializan igual,
+más procesos ayudan a las lecturas y a la serialización JSON), --hilos
+para tapar la espera de E/S; hilos + PAGOS_TRABAJOS_CONCURRENCIA no debería
+superar PAGOS_DB_CONEXIONES. Las métricas son por worker. La caché de
+lecturas también lo sería y no ve las escrituras de los demás workers
+(cuerpos 'pendiente' y ETags viejos, 304 falsos): con más de un worker se
+desactiva.
+
+Los streams SSE (/api/eventos) no terminan: no cuentan en --hilos sino en
+su propio límite --sse por worker; pasado ese límite responden 503. Cada
+stream retiene un hilo, así que para muchos suscriptores conviene asgi.py,
+que los atiende desde el event loop (--sse 0 los rechaza todos).
+
+Con gunicorn en lugar de este servidor:
+    python cli.py migrar && PAGOS_MIGRAR=0 PAGOS_CACHE_MAX=0 gunicorn -w 4 -k gthread --threads 4 'app:crear_app()'
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from dataclasses import replace
+from urllib.parse import urlsplit
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from app import crear_app
+from configuracion import Configuracion
+from controllers import pagos_controller
+from controllers.pagos_asgi import RUTA_EVENTOS
+from database.models import Database
+
+ESPERA_REINICIO = 1.0  # segundos entre reinicios de un worker que muere al arrancar
+
+
+class ServidorHilos(BaseWSGIServer):
+    """BaseWSGIServer que atiende cada conexión en un hilo, con --hilos como
+    máximo; los streams SSE pasan a su propio límite de --sse"""
+
+    def __init__(self, *args, hilos=4, sse=16, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._libres = threading.BoundedSemaphore(hilos)
+        self._libres_sse = threading.BoundedSemaphore(sse) if sse > 0 else None
+        self._hilo = threading.local()  # semáforo que ocupa la conexión de cada hilo
+
+    def process_request(self, request, client_address):
+        self._libres.acquire()  # sin hilos libres, la conexión espera en el backlog
+        threading.Thread(target=self._atender, args=(request, client_address), daemon=True).start()
+
+    def _atender(self, request, client_address):
+        self._hilo.semaforo = self._libres
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._hilo.semaforo.release()
+
+    def pasar_a_sse(self):
+        """Mueve la conexión del hilo actual al límite de SSE y libera su
+        hilo de --hilos; False si no quedan streams libres"""
+        if self._libres_sse is None or not self._libres_sse.acquire(blocking=False):
+            return False
+        self._hilo.semaforo.release()
+        self._hilo.semaforo = self._libres_sse
+        return True
+
+
+class _Manejador(WSGIRequestHandler):
+    def run_wsgi(self):
+        if self.command == 'GET' and urlsplit(self.path).path == RUTA_EVENTOS \
+                and not self.server.pasar_a_sse():
+            self._rechazar_sse()
+            return
+        super().run_wsgi()
+
+    def _rechazar_sse(self):
+        cuerpo = b'{"error": "Sin streams SSE libres en este worker, reintentar"}'
+        self.send_response(503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.send_header('Retry-After', '3')
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+class _ManejadorSilencioso(_Manejador):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+# ---------- Worker ----------
+def _worker(sock, config, args):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # lo detiene el maestro con SIGTERM
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    app = crear_app(config)
+    pagos_controller.iniciar_servicios()
+    manejador = _Manejador if args.log_accesos else _ManejadorSilencioso
+    servidor = ServidorHilos(args.host, args.puerto, app, handler=manejador, fd=sock.fileno(),
+                             hilos=args.hilos, sse=args.sse)
+    try:
+        servidor.serve_forever()
+    finally:
+        pagos_controller._cola.detener()
+        pagos_controller._db.cerrar()
+
+
+def _lanzar(sock, config, args):
+    pid = os.fork()
+    if pid:
+        return pid
+    codigo = 0
+    try:
+        _worker(sock, config, args)
+    except SystemExit as exc:
+        codigo = exc.code or 0
+    except BaseException:
+        logging.exception("Worker %s terminó con error", os.getpid())
+        codigo = 1
+    finally:
+        os._exit(codigo)
+
+
+# ---------- Maestro ----------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--puerto', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--hilos', type=int, default=4, help="solicitudes simultáneas por worker")
+    parser.add_argument('--sse', type=int, default=16,
+                        help="streams /api/eventos simultáneos por worker, aparte de --hilos (0: ninguno)")
+    parser.add_argument('--backlog', type=int, default=1024)
+    parser.add_argument('--log-accesos', action='store_true')
+    args = parser.parse_args(argv)
+
+    config = Configuracion.desde_entorno()
+    if config.migrar:
+        Database(config.db, perfil=config.perfil).cerrar()  # una sola vez, antes del fork
+    config = replace(config, migrar=False, debug=False)
+    if args.workers > 1 and config.cache_max > 0:
+        logging.info("Caché de lecturas desactivada: con %d workers cada uno tendría la suya", args.workers)
+        config = replace(config, cache_max=0)
+    if args.hilos + config.trabajos_concurrencia > config.max_conexiones:
+        logging.warning("hilos (%d) + trabajos (%d) superan el pool de %d conexiones por worker",
+                        args.hilos, config.trabajos_concurrencia, config.max_conexiones)
+
+    sock = socket.create_server((args.host, args.puerto), backlog=args.backlog)
+    logging.info("🚀 %d workers x %d hilos en http://%s:%d (pid %d)",
+                 args.workers, args.hilos, args.host, args.puerto, os.getpid())
+
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    signal.signal(signal.SIGINT, lambda *_: detener.set())
+
+    workers = {}  # pid -> momento de arranque
+    for _ in range(args.workers):
+        workers[_lanzar(sock, config, args)] = time.monotonic()
+
+    while not detener.is_set():
+        try:
+            pid, estado = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if not pid:
+            detener.wait(0.5)
+            continue
+        arranque = workers.pop(pid, None)
+        if arranque is None:
+            continue
+        logging.warning("Worker %d terminó (estado %d); lanzando otro", pid, estado)
+        if time.monotonic() - arranque < ESPERA_REINICIO:
+            detener.wait(ESPERA_REINICIO)
+        if not detener.is_set():
+            workers[_lanzar(sock, config, args)] = time.monotonic()
+
+    logging.info("Deteniendo %d workers...", len(workers))
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+
+if __name__ == '__main__':
+    main()
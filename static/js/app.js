@@ -10,9 +10,16 @@ const state = {
     products: [],
     cart: [],
     pagos: [],
-    facturas: []
+    facturas: [],
+    pagosCargados: false,
+    facturasCargadas: false,
+    // Deltas SSE que llegan mientras se pide un listado: se aplican al recibirlo
+    enCarga: { pagos: null, facturas: null },
+    eventos: null
 };
 
+const MAX_FILAS_LISTADO = 50;
+
 // ==========================================
 // INICIALIZACIÓN
 // ==========================================
@@ -21,6 +28,7 @@ document.addEventListener('DOMContentLoaded', () => {
     initApp();
     setupEventListeners();
     loadInitialData();
+    connectEventos();
 });
 
 function initApp() {
@@ -158,10 +166,10 @@ function switchTab(tabName) {
             renderCart();
             break;
         case 'pagos':
-            loadPagos();
+            state.pagosCargados ? renderPagos() : loadPagos();
             break;
         case 'facturas':
-            loadFacturas();
+            state.facturasCargadas ? renderFacturas() : loadFacturas();
             break;
         case 'admin':
             renderAdminProducts();
@@ -504,8 +512,8 @@ async function processPayment(e) {
             showToast('¡Pago procesado exitosamente!', 'success');
             showToast(`Factura: ${data.factura.numero_factura}`, 'info');
 
-            // Recargar lista de pagos
-            loadPagos();
+            // Sin stream de eventos, recargar la lista de pagos
+            if (!state.eventos) loadPagos();
         } else {
             showToast(data.error || 'Error al procesar el pago', 'error');
         }
@@ -516,107 +524,194 @@ async function processPayment(e) {
 }
 
 async function loadPagos() {
+    state.enCarga.pagos = state.enCarga.pagos || [];
     try {
         const response = await fetch(`${API_URL}/pagos`);
-        const pagos = await response.json();
-
-        const container = document.getElementById('pagosList');
+        state.pagos = await response.json();
+        state.pagosCargados = true;
+        aplicarPendientes('pagos');
+        renderPagos();
+    } catch (error) {
+        console.error('Error:', error);
+        showToast('Error al cargar los pagos', 'error');
+    } finally {
+        state.enCarga.pagos = null;
+    }
+}
 
-        if (!Array.isArray(pagos) || pagos.length === 0) {
-            container.innerHTML = `
-                <div class="empty-state">
-                    <div class="empty-state-icon">💳</div>
-                    <p>No hay pagos registrados</p>
-                </div>
-            `;
-            return;
-        }
+function renderPagos() {
+    const pagos = state.pagos;
+    const container = document.getElementById('pagosList');
 
+    if (!Array.isArray(pagos) || pagos.length === 0) {
         container.innerHTML = `
-            <table>
-                <thead>
-                    <tr>
-                        <th>ID</th>
-                        <th>Orden</th>
-                        <th>Usuario</th>
-                        <th>Monto</th>
-                        <th>Método</th>
-                        <th>Estado</th>
-                        <th>Fecha</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    ${pagos.map(pago => `
-                        <tr>
-                            <td>#${pago.id}</td>
-                            <td>${pago.orden_id}</td>
-                            <td>Usuario ${pago.usuario_id}</td>
-                            <td>$${pago.monto_total.toFixed(2)}</td>
-                            <td>${formatMetodoPago(pago.metodo_pago)}</td>
-                            <td><span class="badge badge-${pago.estado}">${pago.estado}</span></td>
-                            <td>${formatDate(pago.fecha_creacion)}</td>
-                        </tr>
-                    `).join('')}
-                </tbody>
-            </table>
+            <div class="empty-state">
+                <div class="empty-state-icon">💳</div>
+                <p>No hay pagos registrados</p>
+            </div>
         `;
-    } catch (error) {
-        console.error('Error:', error);
-        showToast('Error al cargar los pagos', 'error');
+        return;
     }
+
+    container.innerHTML = `
+        <table>
+            <thead>
+                <tr>
+                    <th>ID</th>
+                    <th>Orden</th>
+                    <th>Usuario</th>
+                    <th>Monto</th>
+                    <th>Método</th>
+                    <th>Estado</th>
+                    <th>Fecha</th>
+                </tr>
+            </thead>
+            <tbody>
+                ${pagos.map(pago => `
+                    <tr>
+                        <td>#${pago.id}</td>
+                        <td>${pago.orden_id}</td>
+                        <td>Usuario ${pago.usuario_id}</td>
+                        <td>$${pago.monto_total.toFixed(2)}</td>
+                        <td>${formatMetodoPago(pago.metodo_pago)}</td>
+                        <td><span class="badge badge-${pago.estado}">${pago.estado}</span></td>
+                        <td>${formatDate(pago.fecha_creacion)}</td>
+                    </tr>
+                `).join('')}
+            </tbody>
+        </table>
+    `;
 }
 
 async function loadFacturas() {
+    state.enCarga.facturas = state.enCarga.facturas || [];
     try {
         const response = await fetch(`${API_URL}/facturas`);
-        const facturas = await response.json();
-
-        const container = document.getElementById('facturasList');
+        state.facturas = await response.json();
+        state.facturasCargadas = true;
+        aplicarPendientes('facturas');
+        renderFacturas();
+    } catch (error) {
+        console.error('Error:', error);
+        showToast('Error al cargar las facturas', 'error');
+    } finally {
+        state.enCarga.facturas = null;
+    }
+}
 
-        if (!Array.isArray(facturas) || facturas.length === 0) {
-            container.innerHTML = `
-                <div class="empty-state">
-                    <div class="empty-state-icon">📄</div>
-                    <p>No hay facturas generadas</p>
-                </div>
-            `;
-            return;
-        }
+function renderFacturas() {
+    const facturas = state.facturas;
+    const container = document.getElementById('facturasList');
 
+    if (!Array.isArray(facturas) || facturas.length === 0) {
         container.innerHTML = `
-            <table>
-                <thead>
+            <div class="empty-state">
+                <div class="empty-state-icon">📄</div>
+                <p>No hay facturas generadas</p>
+            </div>
+        `;
+        return;
+    }
+
+    container.innerHTML = `
+        <table>
+            <thead>
+                <tr>
+                    <th>Número</th>
+                    <th>Orden</th>
+                    <th>Usuario</th>
+                    <th>Subtotal</th>
+                    <th>Impuesto</th>
+                    <th>Total</th>
+                    <th>Fecha</th>
+                </tr>
+            </thead>
+            <tbody>
+                ${facturas.map(factura => `
                     <tr>
-                        <th>Número</th>
-                        <th>Orden</th>
-                        <th>Usuario</th>
-                        <th>Subtotal</th>
-                        <th>Impuesto</th>
-                        <th>Total</th>
-                        <th>Fecha</th>
+                        <td><strong>${factura.numero_factura}</strong></td>
+                        <td>${factura.orden_id}</td>
+                        <td>Usuario ${factura.usuario_id}</td>
+                        <td>$${factura.subtotal.toFixed(2)}</td>
+                        <td>$${factura.impuesto.toFixed(2)}</td>
+                        <td><strong>$${factura.monto_total.toFixed(2)}</strong></td>
+                        <td>${formatDate(factura.fecha_emision)}</td>
                     </tr>
-                </thead>
-                <tbody>
-                    ${facturas.map(factura => `
-                        <tr>
-                            <td><strong>${factura.numero_factura}</strong></td>
-                            <td>${factura.orden_id}</td>
-                            <td>Usuario ${factura.usuario_id}</td>
-                            <td>$${factura.subtotal.toFixed(2)}</td>
-                            <td>$${factura.impuesto.toFixed(2)}</td>
-                            <td><strong>$${factura.monto_total.toFixed(2)}</strong></td>
-                            <td>${formatDate(factura.fecha_emision)}</td>
-                        </tr>
-                    `).join('')}
-                </tbody>
-            </table>
-        `;
-    } catch (error) {
-        console.error('Error:', error);
-        showToast('Error al cargar las facturas', 'error');
+                `).join('')}
+            </tbody>
+        </table>
+    `;
+}
+
+// ==========================================
+// EVENTOS EN TIEMPO REAL (SSE)
+// ==========================================
+
+function connectEventos() {
+    if (!window.EventSource) return;
+
+    // EventSource reenvía Last-Event-ID al reconectar: no se pierden cambios
+    const eventos = new EventSource(`${API_URL}/eventos`);
+    state.eventos = eventos;
+
+    eventos.addEventListener('pago.creado', (e) => {
+        upsertFila('pagos', JSON.parse(e.data));
+    });
+    eventos.addEventListener('pago.actualizado', (e) => {
+        upsertFila('pagos', JSON.parse(e.data));
+    });
+    eventos.addEventListener('factura.generada', (e) => {
+        upsertFila('facturas', JSON.parse(e.data));
+    });
+    eventos.addEventListener('resync', () => {
+        // Nos perdimos eventos compactados: volver a pedir los listados
+        state.pagosCargados = false;
+        state.facturasCargadas = false;
+        if (isTabActive('pagos')) loadPagos();
+        if (isTabActive('facturas')) loadFacturas();
+    });
+}
+
+function upsertFila(lista, delta) {
+    const pendientes = state.enCarga[lista];
+    if (pendientes) {
+        // El listado está en camino: el delta puede ser posterior a la respuesta
+        pendientes.push(delta);
+        return;
+    }
+    const cargada = lista === 'pagos' ? state.pagosCargados : state.facturasCargadas;
+    if (!cargada) return;  // se pedirá completa al abrir la tab
+
+    aplicarDelta(lista, delta);
+    if (isTabActive(lista)) {
+        lista === 'pagos' ? renderPagos() : renderFacturas();
+    }
+}
+
+function aplicarPendientes(lista) {
+    // En orden de llegada: los ya incluidos en la respuesta dejan la fila igual
+    const pendientes = state.enCarga[lista] || [];
+    state.enCarga[lista] = null;
+    pendientes.forEach(delta => aplicarDelta(lista, delta));
+}
+
+function aplicarDelta(lista, delta) {
+    const filas = state[lista];
+    if (!Array.isArray(filas)) return;
+    const existente = filas.find(f => f.id === delta.id);
+    if (existente) {
+        Object.assign(existente, delta);
+    } else if (delta.orden_id !== undefined) {
+        filas.unshift(delta);
+        filas.length = Math.min(filas.length, MAX_FILAS_LISTADO);
     }
 }
 
+function isTabActive(tabName) {
+    const tab = document.getElementById(`tab-${tabName}`);
+    return tab !== null && tab.classList.contains('active');
+}
+
 // ==========================================
 // ADMINISTRACIÓN DE PRODUCTOS
 // ==========================================